@@ -0,0 +1,83 @@
+"""Normalize task tags into tags and task_tags tables
+
+Revision ID: 4b554788c652
+Revises: e7b87954e330
+Create Date: 2026-10-16 09:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4b554788c652'
+down_revision = 'e7b87954e330'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+
+
+def upgrade() -> None:
+    op.create_table(
+        'tags',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column(
+            'name',
+            sa.String(length=255).with_variant(sa.String(length=255, collation='utf8mb4_bin'), 'mysql'),
+            nullable=False
+        ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_tags_id'), 'tags', ['id'], unique=False)
+    op.create_index(op.f('ix_tags_name'), 'tags', ['name'], unique=True)
+    op.create_table(
+        'task_tags',
+        sa.Column('task_id', sa.Integer(), nullable=False),
+        sa.Column('tag_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['tag_id'], ['tags.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['task_id'], ['tasks.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('task_id', 'tag_id')
+    )
+    op.create_index('ix_task_tags_tag_id_task_id', 'task_tags', ['tag_id', 'task_id'], unique=False)
+
+    # Migrar las etiquetas existentes (texto separado por comas) por lotes
+    bind = op.get_bind()
+    tags_table = sa.table('tags', sa.column('id', sa.Integer), sa.column('name', sa.String))
+    task_tags_table = sa.table('task_tags', sa.column('task_id', sa.Integer), sa.column('tag_id', sa.Integer))
+    tag_ids = {}
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.text(
+                "SELECT id, tags FROM tasks WHERE id > :last_id AND tags IS NOT NULL "
+                "ORDER BY id LIMIT :limit"
+            ),
+            {"last_id": last_id, "limit": BATCH_SIZE}
+        ).fetchall()
+        if not rows:
+            break
+        links = []
+        for task_id, tags in rows:
+            names = []
+            for name in tags.split(','):
+                name = name.strip()
+                if name and name not in names:
+                    names.append(name)
+            for name in names:
+                if name not in tag_ids:
+                    tag_ids[name] = bind.execute(
+                        tags_table.insert().values(name=name)
+                    ).lastrowid
+                links.append({"task_id": task_id, "tag_id": tag_ids[name]})
+        if links:
+            bind.execute(task_tags_table.insert(), links)
+        last_id = rows[-1][0]
+
+
+def downgrade() -> None:
+    op.drop_index('ix_task_tags_tag_id_task_id', table_name='task_tags')
+    op.drop_table('task_tags')
+    op.drop_index(op.f('ix_tags_name'), table_name='tags')
+    op.drop_index(op.f('ix_tags_id'), table_name='tags')
+    op.drop_table('tags')
@@ -0,0 +1,41 @@
+"""Add task tombstones and tasks.updated_at index for delta sync
+
+Revision ID: f1541ff7525a
+Revises: 4b554788c652
+Create Date: 2026-10-16 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f1541ff7525a'
+down_revision = '4b554788c652'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(op.f('ix_tasks_updated_at'), 'tasks', ['updated_at'], unique=False)
+    op.create_table(
+        'task_tombstones',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('task_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('reason', sa.String(length=20), nullable=False),
+        sa.Column('deleted_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_task_tombstones_id'), 'task_tombstones', ['id'], unique=False)
+    op.create_index(op.f('ix_task_tombstones_deleted_at'), 'task_tombstones', ['deleted_at'], unique=False)
+    op.create_index('ix_task_tombstones_user_id_deleted_at', 'task_tombstones', ['user_id', 'deleted_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_task_tombstones_user_id_deleted_at', table_name='task_tombstones')
+    op.drop_index(op.f('ix_task_tombstones_deleted_at'), table_name='task_tombstones')
+    op.drop_index(op.f('ix_task_tombstones_id'), table_name='task_tombstones')
+    op.drop_table('task_tombstones')
+    op.drop_index(op.f('ix_tasks_updated_at'), table_name='tasks')
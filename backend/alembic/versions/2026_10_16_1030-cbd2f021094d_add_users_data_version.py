@@ -0,0 +1,24 @@
+"""Add users.data_version for conditional reads
+
+Revision ID: cbd2f021094d
+Revises: f1541ff7525a
+Create Date: 2026-10-16 10:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'cbd2f021094d'
+down_revision = 'f1541ff7525a'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('data_version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('users', 'data_version')
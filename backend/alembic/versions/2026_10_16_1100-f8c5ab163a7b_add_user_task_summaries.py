@@ -0,0 +1,69 @@
+"""Add per-user task summary tables
+
+Revision ID: f8c5ab163a7b
+Revises: cbd2f021094d
+Create Date: 2026-10-16 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f8c5ab163a7b'
+down_revision = 'cbd2f021094d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'user_task_summaries',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('total', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('completed', sa.Integer(), server_default='0', nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_id')
+    )
+    op.create_table(
+        'user_category_counts',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('category', sa.String(length=100), nullable=False),
+        sa.Column('count', sa.Integer(), server_default='0', nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_id', 'category')
+    )
+    op.create_table(
+        'user_tag_counts',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('tag_id', sa.Integer(), nullable=False),
+        sa.Column('count', sa.Integer(), server_default='0', nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['tag_id'], ['tags.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_id', 'tag_id')
+    )
+
+    # Rellenar con los datos existentes
+    op.execute("""
+        INSERT INTO user_task_summaries (user_id, total, completed)
+        SELECT owner_id, COUNT(*), SUM(CASE WHEN completed THEN 1 ELSE 0 END)
+        FROM tasks GROUP BY owner_id
+    """)
+    op.execute("""
+        INSERT INTO user_category_counts (user_id, category, count)
+        SELECT owner_id, category, COUNT(*)
+        FROM tasks WHERE category IS NOT NULL AND category <> ''
+        GROUP BY owner_id, category
+    """)
+    op.execute("""
+        INSERT INTO user_tag_counts (user_id, tag_id, count)
+        SELECT tasks.owner_id, task_tags.tag_id, COUNT(*)
+        FROM tasks JOIN task_tags ON task_tags.task_id = tasks.id
+        GROUP BY tasks.owner_id, task_tags.tag_id
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('user_tag_counts')
+    op.drop_table('user_category_counts')
+    op.drop_table('user_task_summaries')
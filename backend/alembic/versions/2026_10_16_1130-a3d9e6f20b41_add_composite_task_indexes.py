@@ -0,0 +1,29 @@
+"""Add composite indexes on tasks by owner and reverse index on task_shared_with
+
+Revision ID: a3d9e6f20b41
+Revises: f8c5ab163a7b
+Create Date: 2026-10-16 11:30:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3d9e6f20b41'
+down_revision = 'f8c5ab163a7b'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_tasks_owner_id_completed_due_date', 'tasks', ['owner_id', 'completed', 'due_date'], unique=False)
+    op.create_index('ix_tasks_owner_id_category', 'tasks', ['owner_id', 'category'], unique=False)
+    op.create_index('ix_tasks_owner_id_updated_at', 'tasks', ['owner_id', 'updated_at'], unique=False)
+    op.create_index('ix_task_shared_with_user_id_task_id', 'task_shared_with', ['user_id', 'task_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_task_shared_with_user_id_task_id', table_name='task_shared_with')
+    op.drop_index('ix_tasks_owner_id_updated_at', table_name='tasks')
+    op.drop_index('ix_tasks_owner_id_category', table_name='tasks')
+    op.drop_index('ix_tasks_owner_id_completed_due_date', table_name='tasks')
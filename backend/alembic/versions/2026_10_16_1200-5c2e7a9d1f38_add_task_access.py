@@ -0,0 +1,45 @@
+"""Add task_access visibility table and backfill it from tasks and task_shared_with
+
+Revision ID: 5c2e7a9d1f38
+Revises: a3d9e6f20b41
+Create Date: 2026-10-16 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5c2e7a9d1f38'
+down_revision = 'a3d9e6f20b41'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'task_access',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('task_id', sa.Integer(), nullable=False),
+        sa.Column('role', sa.String(length=10), nullable=False),
+        sa.ForeignKeyConstraint(['task_id'], ['tasks.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_id', 'task_id')
+    )
+    op.create_index('ix_task_access_task_id', 'task_access', ['task_id'], unique=False)
+
+    # Propietarios y usuarios compartidos (compartir con el propietario no añade fila)
+    op.execute(
+        "INSERT INTO task_access (user_id, task_id, role) "
+        "SELECT owner_id, id, 'owner' FROM tasks"
+    )
+    op.execute(
+        "INSERT INTO task_access (user_id, task_id, role) "
+        "SELECT s.user_id, s.task_id, 'shared' FROM task_shared_with s "
+        "JOIN tasks t ON t.id = s.task_id WHERE s.user_id <> t.owner_id"
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_task_access_task_id', table_name='task_access')
+    op.drop_table('task_access')
@@ -0,0 +1,37 @@
+"""Lowercase users.email
+
+Revision ID: 3f6a8d2c7b19
+Revises: 9e4b1c7d2a65
+Create Date: 2026-10-17 09:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '3f6a8d2c7b19'
+down_revision = '9e4b1c7d2a65'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Los emails nuevos se guardan en minúsculas. Los que solo se distinguen por
+    # mayúsculas de otro (posible en SQLite) se dejan como están: el login los
+    # sigue encontrando por el email exacto. La tabla derivada es necesaria en MySQL
+    op.execute(
+        """
+        UPDATE users SET email = LOWER(email)
+        WHERE LOWER(email) NOT IN (
+            SELECT email_lower FROM (
+                SELECT LOWER(email) AS email_lower FROM users
+                GROUP BY LOWER(email) HAVING COUNT(*) > 1
+            ) AS duplicated
+        )
+        """
+    )
+
+
+def downgrade() -> None:
+    # Las mayúsculas originales no se conservan
+    pass
@@ -1,11 +1,20 @@
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import NamedTuple, Optional
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
-from app.database import get_db
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+from app.database import get_db, get_async_db
 from app import models, schemas
 
 # Configuración de JWT
@@ -19,6 +28,112 @@ pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 # OAuth2 scheme
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
+class CurrentUser(NamedTuple):
+    """Identidad del usuario autenticado que reciben las rutas (no es una fila de la BD)"""
+    id: int
+    email: str
+
+# Caché de usuarios autenticados
+AUTH_CACHE_TTL_SECONDS = int(os.getenv("AUTH_CACHE_TTL_SECONDS", "60"))
+AUTH_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "1024"))
+
+class AuthenticatedUserCache:
+    """Caché LRU con TTL: token ya verificado -> (id, email) del usuario.
+    
+    Evita decodificar el JWT y consultar la tabla users en cada petición. Una entrada
+    nunca vive más que el propio token y se invalida al modificar o eliminar el usuario.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: int):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # token -> (expira, user_id, email)
+        self._tokens_by_user = {}  # user_id -> set de tokens
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl_seconds > 0
+
+    def get(self, token: str):
+        """Devuelve (user_id, email) o None si no está en caché o ha expirado"""
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None or entry[0] <= time.time():
+                if entry is not None:
+                    self._remove(token)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(token)
+            self.hits += 1
+            return entry[1], entry[2]
+
+    def set(self, token: str, user_id: int, email: str, token_expires_at: Optional[float] = None):
+        """Guarda la identidad asociada a un token verificado"""
+        if not self.enabled:
+            return
+        expires_at = time.time() + self.ttl_seconds
+        if token_expires_at is not None:
+            expires_at = min(expires_at, token_expires_at)
+        with self._lock:
+            if token in self._entries:
+                self._remove(token)
+            self._entries[token] = (expires_at, user_id, email)
+            self._tokens_by_user.setdefault(user_id, set()).add(token)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate_user(self, user_id: int):
+        """Elimina todas las entradas de un usuario"""
+        with self._lock:
+            for token in list(self._tokens_by_user.get(user_id, ())):
+                self._remove(token)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tokens_by_user.clear()
+
+    def stats(self) -> dict:
+        """Contadores de aciertos y fallos de la caché"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+            }
+
+    def _remove(self, token: str):
+        entry = self._entries.pop(token, None)
+        if entry is not None:
+            tokens = self._tokens_by_user.get(entry[1])
+            if tokens is not None:
+                tokens.discard(token)
+                if not tokens:
+                    del self._tokens_by_user[entry[1]]
+
+user_cache = AuthenticatedUserCache(AUTH_CACHE_MAX_ENTRIES, AUTH_CACHE_TTL_SECONDS)
+
+@event.listens_for(models.User, "after_update")
+def _invalidate_updated_user(mapper, connection, target):
+    """Invalida la caché cuando cambian las columnas del usuario.
+    
+    Compartir una tarea también marca al usuario como modificado (colección
+    shared_tasks) sin tocar sus datos: en ese caso la entrada sigue siendo válida.
+    """
+    if object_session(target).is_modified(target, include_collections=False):
+        user_cache.invalidate_user(target.id)
+
+@event.listens_for(models.User, "after_delete")
+def _invalidate_deleted_user(mapper, connection, target):
+    """Invalida la caché cuando se elimina el usuario"""
+    user_cache.invalidate_user(target.id)
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verifica una contraseña contra su hash"""
     return pwd_context.verify(plain_password, hashed_password)
@@ -27,6 +142,71 @@ def get_password_hash(password: str) -> str:
     """Genera el hash de una contraseña"""
     return pwd_context.hash(password)
 
+# Pool de procesos para bcrypt
+# bcrypt consume CPU durante decenas de milisegundos; en procesos aparte no bloquea
+# los hilos que atienden el resto de endpoints ni compite por el GIL.
+AUTH_HASH_WORKERS = int(os.getenv("AUTH_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+AUTH_HASH_MAX_PENDING = int(os.getenv("AUTH_HASH_MAX_PENDING", "64"))
+
+class HashingOverloaded(Exception):
+    """Se supera el número máximo de operaciones de hash pendientes"""
+
+class PasswordHasher:
+    """Ejecuta verify/hash de contraseñas en un pool de procesos de tamaño limitado.
+    
+    Si hay más de `max_pending` operaciones en cola se lanza HashingOverloaded para
+    descartar la petición en lugar de acumular latencia. Con `workers=0` se usa el
+    pool de hilos (útil en entornos donde no se pueden crear procesos).
+    """
+
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.pending = 0
+        self.rejected = 0
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._executor
+
+    async def run(self, func, *args):
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise HashingOverloaded()
+            self.pending += 1
+        try:
+            if self.workers <= 0:
+                return await run_in_threadpool(func, *args)
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), func, *args)
+        finally:
+            with self._lock:
+                self.pending -= 1
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+password_hasher = PasswordHasher(AUTH_HASH_WORKERS, AUTH_HASH_MAX_PENDING)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verifica una contraseña en el pool de hashing"""
+    return await password_hasher.run(verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    """Genera el hash de una contraseña en el pool de hashing"""
+    return await password_hasher.run(get_password_hash, password)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Crea un token JWT"""
     to_encode = data.copy()
@@ -40,32 +220,83 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
 
 def authenticate_user(db: Session, email: str, password: str):
     """Autentica un usuario verificando email y contraseña"""
-    user = db.query(models.User).filter(models.User.email == email).first()
+    user = get_user_by_email(db, email)
     if not user:
         return False
     if not verify_password(password, user.hashed_password):
         return False
     return user
 
-async def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
-):
-    """Obtiene el usuario actual a partir del token JWT"""
-    credentials_exception = HTTPException(
+def get_user_by_email(db: Session, email: str):
+    """Busca un usuario por email sin distinguir mayúsculas (se guardan en minúsculas).
+
+    Si no lo encuentra, prueba con el email tal cual: cuentas antiguas que la migración
+    no pudo pasar a minúsculas porque otra ya tenía ese email.
+    """
+    user = db.query(models.User).filter(models.User.email == email.lower()).first()
+    if user is None and email != email.lower():
+        user = db.query(models.User).filter(models.User.email == email).first()
+    return user
+
+async def authenticate_user_async(db: Session, email: str, password: str):
+    """Igual que authenticate_user, con bcrypt en el pool de hashing"""
+    user = await run_in_threadpool(get_user_by_email, db, email)
+    if not user:
+        return False
+    if not await verify_password_async(password, user.hashed_password):
+        return False
+    return user
+
+def _credentials_exception():
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+def _decode_token(token: str):
+    """Valida el JWT y devuelve (email, expiración)"""
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         email: str = payload.get("sub")
         if email is None:
-            raise credentials_exception
+            raise _credentials_exception()
         token_data = schemas.TokenData(email=email)
     except JWTError:
-        raise credentials_exception
-    user = db.query(models.User).filter(models.User.email == token_data.email).first()
+        raise _credentials_exception()
+    return token_data.email, payload.get("exp")
+
+def get_current_user(
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_db)
+) -> CurrentUser:
+    """Obtiene la identidad (CurrentUser) del usuario actual a partir del token JWT.
+    
+    Es síncrona para que FastAPI la ejecute en el pool de hilos y la consulta a la
+    BD no bloquee el event loop.
+    """
+    cached = user_cache.get(token)
+    if cached is not None:
+        # Identidad ya verificada: no hace falta decodificar ni consultar la BD
+        return CurrentUser(*cached)
+    email, expires_at = _decode_token(token)
+    user = get_user_by_email(db, email)
     if user is None:
-        raise credentials_exception
-    return user
+        raise _credentials_exception()
+    user_cache.set(token, user.id, user.email, expires_at)
+    return CurrentUser(user.id, user.email)
+
+async def get_current_user_async(
+    token: str = Depends(oauth2_scheme),
+    db = Depends(get_async_db)
+) -> CurrentUser:
+    """Obtiene el usuario actual a partir del token JWT usando la sesión asíncrona"""
+    cached = user_cache.get(token)
+    if cached is not None:
+        return CurrentUser(*cached)
+    email, expires_at = _decode_token(token)
+    user = await db.run_sync(get_user_by_email, email)
+    if user is None:
+        raise _credentials_exception()
+    user_cache.set(token, user.id, user.email, expires_at)
+    return CurrentUser(user.id, user.email)
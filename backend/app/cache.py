@@ -0,0 +1,145 @@
+"""Caché de resultados de los listados de tareas (y del directorio de usuarios).
+
+Las claves incluyen el usuario y su versión de datos (users.data_version), que se
+incrementa con cada escritura que afecta a sus tareas. Así no hace falta borrar
+entradas al escribir: las de versiones anteriores dejan de consultarse y el LRU
+las expulsa. Los valores son el cuerpo JSON ya serializado (bytes).
+
+Otro almacén (p. ej. Redis o memcached) puede usarse implementando ResultCache y
+registrándolo con register_backend.
+"""
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+import hashlib
+import json
+import os
+import threading
+import time
+
+RESULT_CACHE_BACKEND = os.getenv("RESULT_CACHE_BACKEND", "memory")
+RESULT_CACHE_MAX_ENTRIES = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "2048"))
+RESULT_CACHE_MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+class ResultCache(ABC):
+    """Interfaz de un almacén de resultados"""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self._counter_lock = threading.Lock()
+
+    @abstractmethod
+    def _get(self, key: str) -> Optional[bytes]:
+        """Devuelve el valor guardado o None"""
+
+    @abstractmethod
+    def _set(self, key: str, value: bytes):
+        """Guarda un valor"""
+
+    def get(self, key: str) -> Optional[bytes]:
+        value = self._get(key)
+        with self._counter_lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, key: str, value: bytes):
+        self._set(key, value)
+
+    def stats(self) -> dict:
+        """Aciertos, fallos y tasa de aciertos"""
+        total = self.hits + self.misses
+        return {
+            "backend": type(self).__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+class NullResultCache(ResultCache):
+    """Caché desactivada"""
+
+    def _get(self, key: str) -> Optional[bytes]:
+        return None
+
+    def _set(self, key: str, value: bytes):
+        pass
+
+class InMemoryResultCache(ResultCache):
+    """LRU en memoria del proceso, limitada en número de entradas y en bytes"""
+
+    def __init__(self, max_entries: int = RESULT_CACHE_MAX_ENTRIES, max_bytes: int = RESULT_CACHE_MAX_BYTES):
+        super().__init__()
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.size_bytes = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def _set(self, key: str, value: bytes):
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size_bytes -= len(previous)
+            self._entries[key] = value
+            self.size_bytes += len(value)
+            while len(self._entries) > self.max_entries or self.size_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size_bytes -= len(evicted)
+                self.evictions += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(
+                super().stats(),
+                entries=len(self._entries),
+                size_bytes=self.size_bytes,
+                evictions=self.evictions,
+            )
+
+_backends: Dict[str, Callable[[], ResultCache]] = {
+    "memory": InMemoryResultCache,
+    "none": NullResultCache,
+}
+
+def register_backend(name: str, factory: Callable[[], ResultCache]):
+    """Registra un almacén alternativo seleccionable con RESULT_CACHE_BACKEND"""
+    _backends[name] = factory
+
+def create_result_cache(backend: str = RESULT_CACHE_BACKEND) -> ResultCache:
+    if backend not in _backends:
+        raise ValueError(f"Unknown result cache backend '{backend}'")
+    return _backends[backend]()
+
+def task_list_key(user_id: int, version: int, filters, **page) -> str:
+    """Clave de un listado: usuario + versión + filtros normalizados + página"""
+    normalized = filters.model_dump(mode="json") if filters is not None else {}
+    if normalized.get("tags"):
+        normalized["tags"] = sorted(set(tag.strip() for tag in normalized["tags"] if tag.strip()))
+    payload = json.dumps([normalized, page], sort_keys=True, separators=(",", ":"))
+    digest = hashlib.sha1(payload.encode()).hexdigest()
+    return f"tasks:{user_id}:{version}:{digest}"
+
+def user_directory_key(limit: int, ttl_seconds: int, now: Optional[float] = None) -> str:
+    """Clave de la primera página del directorio de usuarios.
+    
+    Incluye el intervalo de `ttl_seconds` actual: al pasar al siguiente la entrada
+    deja de consultarse, igual que las de versiones anteriores de los listados.
+    """
+    window = int((time.time() if now is None else now) // ttl_seconds)
+    return f"users:{limit}:{window}"
+
+result_cache = create_result_cache()
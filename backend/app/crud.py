@@ -1,14 +1,22 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import or_, and_
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import or_, and_, delete, insert, select, func
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from pydantic import ValidationError
 from typing import List, Optional
-from datetime import datetime
-from app import models, schemas
-from app.auth import get_password_hash
+from datetime import datetime, timedelta
+import base64
+import binascii
+import json
+import os
+from app import importer, models, reminders, replicas, schemas, search, stream, summary
+from app.auth import get_password_hash, get_user_by_email as _find_user_by_email
+from app.cache import result_cache, user_directory_key
 
 # Funciones CRUD para User
-def create_user(db: Session, user: schemas.UserCreate):
-    """Crea un nuevo usuario"""
-    hashed_password = get_password_hash(user.password)
+def create_user(db: Session, user: schemas.UserCreate, hashed_password: Optional[str] = None):
+    """Crea un nuevo usuario (si no se indica el hash, se calcula aquí)"""
+    if hashed_password is None:
+        hashed_password = get_password_hash(user.password)
     db_user = models.User(
         email=user.email,
         hashed_password=hashed_password
@@ -19,8 +27,8 @@ def create_user(db: Session, user: schemas.UserCreate):
     return db_user
 
 def get_user_by_email(db: Session, email: str):
-    """Obtiene un usuario por su email"""
-    return db.query(models.User).filter(models.User.email == email).first()
+    """Obtiene un usuario por su email (sin distinguir mayúsculas)"""
+    return _find_user_by_email(db, email)
 
 def get_user_by_id(db: Session, user_id: int):
     """Obtiene un usuario por su ID"""
@@ -30,16 +38,177 @@ def get_users_by_ids(db: Session, user_ids: List[int]):
     """Obtiene múltiples usuarios por sus IDs"""
     return db.query(models.User).filter(models.User.id.in_(user_ids)).all()
 
+# Directorio de usuarios (para compartir tareas)
+USER_DIRECTORY_CACHE_SECONDS = int(os.getenv("USER_DIRECTORY_CACHE_SECONDS", "30"))
+
+def encode_user_cursor(email: str) -> str:
+    """Codifica el último email de la página como cursor opaco"""
+    return base64.urlsafe_b64encode(email.encode()).decode().rstrip('=')
+
+def decode_user_cursor(cursor: str) -> str:
+    """Decodifica un cursor del directorio. Lanza ValueError si es inválido"""
+    try:
+        return base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        raise ValueError("Invalid cursor")
+
+def _prefix_upper_bound(prefix: str) -> Optional[str]:
+    """Menor cadena mayor que todas las que empiezan por `prefix` (por código de carácter).
+
+    Los caracteres finales que no se pueden incrementar (U+10FFFF) se descartan y se
+    saltan los sustitutos (U+D800-U+DFFF), que no se pueden codificar en UTF-8.
+    None si no hay tal cadena: basta con el límite inferior.
+    """
+    for i in range(len(prefix) - 1, -1, -1):
+        code = ord(prefix[i]) + 1
+        if 0xD800 <= code <= 0xDFFF:
+            code = 0xE000
+        if code <= 0x10FFFF:
+            return prefix[:i] + chr(code)
+    return None
+
+def _user_directory_rows(db: Session, prefix: str, after: Optional[str], limit: int) -> List[list]:
+    """[id, email] ordenados por email; el prefijo filtra por rango sobre el índice de email"""
+    stmt = select(models.User.id, models.User.email).order_by(models.User.email).limit(limit)
+    if prefix:
+        # Los emails se guardan en minúsculas
+        prefix = prefix.lower()
+        if db.get_bind().dialect.name == "sqlite":
+            # Collation BINARY: el rango por código de carácter es exacto y SQLite no
+            # usa el índice para LIKE ... ESCAPE
+            stmt = stmt.where(models.User.email >= prefix)
+            upper = _prefix_upper_bound(prefix)
+            if upper is not None:
+                stmt = stmt.where(models.User.email < upper)
+        else:
+            # LIKE compara con la collation de la columna (en MySQL utf8mb4_0900_ai_ci un
+            # rango calculado a mano no); se escapan los comodines del usuario
+            escaped = prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            stmt = stmt.where(models.User.email.like(escaped + "%", escape="\\"))
+    if after is not None:
+        stmt = stmt.where(models.User.email > after)
+    return [[row.id, row.email] for row in db.execute(stmt)]
+
+def search_users(db: Session, user_id: int, prefix: str = "", limit: int = 20, cursor: Optional[str] = None):
+    """Página de usuarios cuyo email empieza por `prefix`, sin el propio usuario.
+    
+    La primera página sin prefijo es igual para todos y se guarda en la caché de
+    resultados USER_DIRECTORY_CACHE_SECONDS segundos. Devuelve (usuarios, next_cursor).
+    """
+    after = decode_user_cursor(cursor) if cursor else None
+    # Una fila extra para saber si hay más páginas y otra por si incluye al propio usuario
+    fetch = limit + 2
+    if not prefix and after is None and USER_DIRECTORY_CACHE_SECONDS > 0:
+        key = user_directory_key(fetch, USER_DIRECTORY_CACHE_SECONDS)
+        cached = result_cache.get(key)
+        if cached is not None:
+            rows = json.loads(cached)
+        else:
+            rows = _user_directory_rows(db, prefix, after, fetch)
+            result_cache.set(key, json.dumps(rows).encode())
+    else:
+        rows = _user_directory_rows(db, prefix, after, fetch)
+    
+    users = [{"id": user_id_, "email": email} for user_id_, email in rows if user_id_ != user_id]
+    next_cursor = None
+    if len(users) > limit:
+        users = users[:limit]
+        next_cursor = encode_user_cursor(users[-1]["email"])
+    return users, next_cursor
+
+# Versión de datos por usuario
+def touch_users(db: Session, user_ids: List[int]):
+    """Incrementa la versión de datos de los usuarios afectados por una escritura.
+    
+    La versión cambia en la misma transacción que la escritura y permite responder
+    lecturas condicionales (ETag) sin consultar la tabla de tareas.
+    """
+    ids = sorted(set(user_ids))  # Orden fijo para evitar interbloqueos
+    if ids:
+        db.query(models.User).filter(models.User.id.in_(ids)).update(
+            {models.User.data_version: models.User.data_version + 1},
+            synchronize_session=False
+        )
+        # Tras el commit sus lecturas van a la primaria (read-your-writes)
+        replicas.track_writes(db, ids)
+
+def get_user_version(db: Session, user_id: int) -> int:
+    """Obtiene la versión de datos del usuario"""
+    return db.query(models.User.data_version).filter(models.User.id == user_id).scalar() or 0
+
+# Tabla de visibilidad (task_access)
+ACCESS_OWNER = "owner"
+ACCESS_SHARED = "shared"
+
+def grant_access(db: Session, task_id: int, owner_id: int, shared_ids: List[int] = (), include_owner: bool = False):
+    """Da acceso a la tarea a los usuarios compartidos (y al propietario si se indica).
+    
+    Compartir una tarea con su propietario no añade otra fila: ya tiene la de "owner".
+    """
+    rows = [{"user_id": owner_id, "task_id": task_id, "role": ACCESS_OWNER}] if include_owner else []
+    rows += [
+        {"user_id": user_id, "task_id": task_id, "role": ACCESS_SHARED}
+        for user_id in sorted(set(shared_ids) - {owner_id})
+    ]
+    if rows:
+        db.execute(insert(models.TaskAccess.__table__), rows)
+
+def revoke_access(db: Session, task_id: int, user_ids: Optional[List[int]] = None):
+    """Quita el acceso compartido de esos usuarios, o todas las filas de la tarea si no se indican"""
+    stmt = delete(models.TaskAccess.__table__).where(models.TaskAccess.task_id == task_id)
+    if user_ids is not None:
+        if not user_ids:
+            return
+        stmt = stmt.where(
+            models.TaskAccess.user_id.in_(user_ids),
+            models.TaskAccess.role == ACCESS_SHARED
+        )
+    db.execute(stmt)
+
+# Funciones para etiquetas
+def normalize_tags(tags: Optional[List[str]]) -> List[str]:
+    """Limpia espacios, descarta vacías y elimina duplicados conservando el orden"""
+    result = []
+    for tag in tags or []:
+        tag = tag.strip()
+        if tag and tag not in result:
+            result.append(tag)
+    return result
+
+def get_or_create_tags(db: Session, names: List[str]) -> List[models.Tag]:
+    """Obtiene las etiquetas por nombre, creando las que no existan"""
+    if not names:
+        return []
+    existing = {
+        tag.name: tag
+        for tag in db.query(models.Tag).filter(models.Tag.name.in_(names)).all()
+    }
+    for name in names:
+        if name in existing:
+            continue
+        # Savepoint por si otra petición crea la misma etiqueta a la vez
+        try:
+            with db.begin_nested():
+                tag = models.Tag(name=name)
+                db.add(tag)
+        except IntegrityError:
+            tag = db.query(models.Tag).filter(models.Tag.name == name).one()
+        existing[name] = tag
+    return [existing[name] for name in names]
+
+def set_task_tags(db: Session, db_task: models.Task, tags: Optional[List[str]]):
+    """Actualiza las etiquetas normalizadas de una tarea y su copia en texto"""
+    names = normalize_tags(tags)
+    db_task.tags = ','.join(names) if names else None
+    db_task.tag_items = get_or_create_tags(db, names)
+
 # Funciones CRUD para Task
-def create_task(db: Session, task: schemas.TaskCreate, owner_id: int):
-    """Crea una nueva tarea"""
+def _apply_task_create(db: Session, task: schemas.TaskCreate, owner_id: int) -> models.Task:
+    """Crea la tarea en la sesión (flush, sin commit)"""
     task_data = task.dict(exclude={'shared_with_user_ids', 'tags'})
     
-    # Convertir tags de lista a string separado por comas
-    if task.tags:
-        task_data['tags'] = ','.join(task.tags)
-    
     db_task = models.Task(**task_data, owner_id=owner_id)
+    set_task_tags(db, db_task, task.tags)
     db.add(db_task)
     db.flush()  # Para obtener el ID antes de commit
     
@@ -48,22 +217,36 @@ def create_task(db: Session, task: schemas.TaskCreate, owner_id: int):
         shared_users = get_users_by_ids(db, task.shared_with_user_ids)
         db_task.shared_with_users.extend(shared_users)
     
+    grant_access(db, db_task.id, owner_id, [u.id for u in db_task.shared_with_users], include_owner=True)
+    summary.apply_change(db, None, summary.snapshot(db_task))
+    touch_users(db, [owner_id] + [u.id for u in db_task.shared_with_users])
+    if db_task.reminder_date is not None:
+        reminders.track_task(db, db_task)
+    stream.task_changed(db, db_task, [owner_id] + [u.id for u in db_task.shared_with_users])
+    return db_task
+
+def create_task(db: Session, task: schemas.TaskCreate, owner_id: int):
+    """Crea una nueva tarea"""
+    db_task = _apply_task_create(db, task, owner_id)
     db.commit()
     db.refresh(db_task)
     return db_task
 
-def get_tasks(db: Session, owner_id: int, skip: int = 0, limit: int = 100, 
-              filters: Optional[schemas.TaskFilter] = None):
-    """Obtiene todas las tareas de un usuario con filtros opcionales"""
-    query = db.query(models.Task)
+def _build_tasks_query(db: Session, owner_id: int, filters: Optional[schemas.TaskFilter] = None,
+                       rank_search: bool = False):
+    """Construye la consulta de tareas del usuario aplicando los filtros.
+    
+    Si `rank_search` es True y hay término de búsqueda, se ordena por relevancia.
+    """
+    # Cargar los usuarios compartidos de todas las tareas en una sola consulta
+    query = db.query(models.Task).options(selectinload(models.Task.shared_with_users))
     
     # Incluir tareas propias y compartidas
     if filters and filters.include_shared:
-        query = query.filter(
-            or_(
-                models.Task.owner_id == owner_id,
-                models.Task.shared_with_users.any(models.User.id == owner_id)
-            )
+        # Join por la clave primaria de task_access (propias y compartidas) en lugar de un OR
+        query = query.join(
+            models.TaskAccess,
+            and_(models.TaskAccess.task_id == models.Task.id, models.TaskAccess.user_id == owner_id)
         )
     else:
         query = query.filter(models.Task.owner_id == owner_id)
@@ -71,24 +254,30 @@ def get_tasks(db: Session, owner_id: int, skip: int = 0, limit: int = 100,
     # Aplicar filtros
     if filters:
         if filters.search:
-            search_term = f"%{filters.search}%"
-            query = query.filter(
-                or_(
-                    models.Task.title.like(search_term),
-                    models.Task.description.like(search_term)
-                )
+            query = search.apply_search(
+                query, db.get_bind().dialect.name, filters.search, rank=rank_search
             )
         
         if filters.category:
             query = query.filter(models.Task.category == filters.category)
         
-        if filters.tags:
-            # Buscar tareas que contengan cualquiera de los tags
-            tag_conditions = []
-            for tag in filters.tags:
-                tag_conditions.append(models.Task.tags.like(f"%{tag}%"))
-            if tag_conditions:
-                query = query.filter(or_(*tag_conditions))
+        tag_names = normalize_tags(filters.tags)
+        if tag_names:
+            # Tareas con cualquiera (any) o con todas (all) las etiquetas. La subconsulta
+            # se correlaciona con cada tarea del usuario (task_tags por su clave primaria)
+            # en lugar de recorrer las etiquetas de todos los usuarios
+            tagged = select(models.task_tags.c.tag_id).join(
+                models.Tag, models.Tag.id == models.task_tags.c.tag_id
+            ).where(
+                models.task_tags.c.task_id == models.Task.id,
+                models.Tag.name.in_(tag_names)
+            )
+            if filters.tags_match == "all":
+                query = query.filter(
+                    tagged.with_only_columns(func.count()).scalar_subquery() == len(tag_names)
+                )
+            else:
+                query = query.filter(tagged.exists())
         
         if filters.completed is not None:
             query = query.filter(models.Task.completed == filters.completed)
@@ -99,94 +288,533 @@ def get_tasks(db: Session, owner_id: int, skip: int = 0, limit: int = 100,
         if filters.due_date_to:
             query = query.filter(models.Task.due_date <= filters.due_date_to)
     
+    return query
+
+def get_tasks(db: Session, owner_id: int, skip: int = 0, limit: int = 100, 
+              filters: Optional[schemas.TaskFilter] = None):
+    """Obtiene todas las tareas de un usuario con filtros opcionales"""
+    query = _build_tasks_query(db, owner_id, filters, rank_search=True)
     return query.offset(skip).limit(limit).all()
 
+# Tamaño máximo de página de GET /tasks
+TASK_PAGE_MAX_LIMIT = 1000
+
+# Paginación por cursor (keyset)
+CURSOR_ORDERINGS = ("updated_at", "due_date")
+
+def encode_cursor(order_by: str, task: models.Task) -> str:
+    """Codifica la posición de una tarea como cursor opaco"""
+    value = getattr(task, order_by)
+    payload = [order_by, value.isoformat() if value else None, task.id]
+    raw = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(cursor: str, order_by: str):
+    """Decodifica un cursor y devuelve (valor, id). Lanza ValueError si es inválido"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        cursor_order, value, task_id = json.loads(raw)
+        value = datetime.fromisoformat(value) if value is not None else None
+        task_id = int(task_id)
+    except (ValueError, TypeError, binascii.Error):
+        raise ValueError("Invalid cursor")
+    if cursor_order != order_by:
+        raise ValueError("Cursor does not match ordering")
+    return value, task_id
+
+def get_tasks_page(db: Session, owner_id: int, limit: int = 100,
+                   filters: Optional[schemas.TaskFilter] = None,
+                   cursor: Optional[str] = None, order_by: str = "updated_at"):
+    """Obtiene una página de tareas usando paginación por cursor (keyset).
+    
+    - updated_at: de la más reciente a la más antigua, desempate por id descendente
+    - due_date: de la más próxima a la más lejana, sin fecha al final, desempate por id
+    
+    Devuelve (tareas, next_cursor). next_cursor es None en la última página.
+    """
+    if order_by not in CURSOR_ORDERINGS:
+        raise ValueError("Invalid ordering")
+    query = _build_tasks_query(db, owner_id, filters)
+    
+    if order_by == "updated_at":
+        if cursor:
+            value, last_id = decode_cursor(cursor, order_by)
+            if value is None:
+                raise ValueError("Invalid cursor")
+            query = query.filter(
+                or_(
+                    models.Task.updated_at < value,
+                    and_(models.Task.updated_at == value, models.Task.id < last_id)
+                )
+            )
+        query = query.order_by(models.Task.updated_at.desc(), models.Task.id.desc())
+    else:
+        if cursor:
+            value, last_id = decode_cursor(cursor, order_by)
+            if value is None:
+                query = query.filter(
+                    models.Task.due_date.is_(None),
+                    models.Task.id > last_id
+                )
+            else:
+                query = query.filter(
+                    or_(
+                        models.Task.due_date > value,
+                        and_(models.Task.due_date == value, models.Task.id > last_id),
+                        models.Task.due_date.is_(None)
+                    )
+                )
+        query = query.order_by(
+            models.Task.due_date.is_(None), models.Task.due_date, models.Task.id
+        )
+    
+    # Se pide una fila extra para saber si hay más páginas
+    tasks = query.limit(limit + 1).all()
+    next_cursor = None
+    if len(tasks) > limit:
+        tasks = tasks[:limit]
+        if tasks:
+            next_cursor = encode_cursor(order_by, tasks[-1])
+    return tasks, next_cursor
+
+# Exportación
+EXPORT_BATCH_SIZE = 1000
+
+def iter_tasks_for_export(db: Session, owner_id: int, batch_size: int = EXPORT_BATCH_SIZE):
+    """Recorre las tareas del usuario con un cursor del servidor.
+    
+    Una sola consulta (tareas LEFT JOIN usuarios compartidos, ordenada por id) leída
+    por lotes de `batch_size` filas, así la memoria no crece con el número de tareas.
+    Genera tuplas (fila, ids de usuarios compartidos).
+    """
+    shared = models.task_shared_with
+    stmt = select(
+        models.Task.id,
+        models.Task.title,
+        models.Task.description,
+        models.Task.completed,
+        models.Task.category,
+        models.Task.tags,
+        models.Task.due_date,
+        models.Task.reminder_date,
+        models.Task.owner_id,
+        models.Task.created_at,
+        models.Task.updated_at,
+        shared.c.user_id.label("shared_user_id")
+    ).outerjoin(
+        shared, shared.c.task_id == models.Task.id
+    ).where(
+        models.Task.owner_id == owner_id
+    ).order_by(models.Task.id, shared.c.user_id)
+    
+    result = db.execute(stmt.execution_options(yield_per=batch_size))
+    current = None
+    shared_ids = []
+    for row in result:
+        if current is None or row.id != current.id:
+            if current is not None:
+                yield current, shared_ids
+            current = row
+            shared_ids = []
+        if row.shared_user_id is not None:
+            shared_ids.append(row.shared_user_id)
+    if current is not None:
+        yield current, shared_ids
+
+def _can_access(task: models.Task, user_id: int) -> bool:
+    """Indica si el usuario es el propietario o tiene acceso compartido"""
+    return task.owner_id == user_id or any(u.id == user_id for u in task.shared_with_users)
+
+def _single_task_query(db: Session, task_id: int, user_id: int, owner_only: bool = False, with_tags: bool = False):
+    """Consulta de una tarea con la comprobación de acceso en SQL.
+    
+    Con `owner_only` solo la encuentra el propietario; si no, cualquier usuario con
+    fila en task_access. Los usuarios compartidos (y las etiquetas si se piden) se
+    cargan con una consulta más, así el número de consultas es fijo.
+    """
+    options = [selectinload(models.Task.shared_with_users)]
+    if with_tags:
+        options.append(selectinload(models.Task.tag_items))
+    query = db.query(models.Task).options(*options).filter(models.Task.id == task_id)
+    if owner_only:
+        return query.filter(models.Task.owner_id == user_id)
+    return query.join(
+        models.TaskAccess,
+        and_(models.TaskAccess.task_id == models.Task.id, models.TaskAccess.user_id == user_id)
+    )
+
 def get_task(db: Session, task_id: int, user_id: int):
     """Obtiene una tarea específica (propia o compartida)"""
-    task = db.query(models.Task).filter(models.Task.id == task_id).first()
-    if not task:
-        return None
-    # Verificar si el usuario es el propietario o tiene acceso compartido
-    if task.owner_id == user_id or any(u.id == user_id for u in task.shared_with_users):
-        return task
-    return None
+    return _single_task_query(db, task_id, user_id).first()
 
 def get_task_by_owner(db: Session, task_id: int, owner_id: int):
     """Obtiene una tarea específica solo si el usuario es el propietario"""
-    return db.query(models.Task).filter(
-        models.Task.id == task_id,
-        models.Task.owner_id == owner_id
-    ).first()
+    return _single_task_query(db, task_id, owner_id, owner_only=True).first()
 
-def update_task(db: Session, task_id: int, task_update: schemas.TaskUpdate, user_id: int):
-    """Actualiza una tarea"""
-    db_task = get_task(db, task_id, user_id)
-    if not db_task:
-        return None
-    
-    update_data = task_update.dict(exclude_unset=True, exclude={'shared_with_user_ids', 'tags'})
-    
-    # Manejar tags
-    if 'tags' in task_update.dict(exclude_unset=True):
-        if task_update.tags:
-            update_data['tags'] = ','.join(task_update.tags)
-        else:
-            update_data['tags'] = None
+def _apply_task_update(db: Session, db_task: models.Task, task_update: schemas.TaskUpdate, user_id: int):
+    """Aplica los cambios a la tarea en la sesión (sin commit)"""
+    affected_ids = [db_task.owner_id] + [u.id for u in db_task.shared_with_users]
+    before = summary.snapshot(db_task)
+    update_data = task_update.dict(exclude_unset=True)
+    removed_ids = []
     
     # Actualizar campos
     for field, value in update_data.items():
-        setattr(db_task, field, value)
+        if field not in ('shared_with_user_ids', 'tags'):
+            setattr(db_task, field, value)
+    
+    # Manejar tags
+    if 'tags' in update_data:
+        set_task_tags(db, db_task, task_update.tags)
     
     # Actualizar usuarios compartidos (solo si es el propietario)
-    if db_task.owner_id == user_id and 'shared_with_user_ids' in task_update.dict(exclude_unset=True):
+    if db_task.owner_id == user_id and 'shared_with_user_ids' in update_data:
         if task_update.shared_with_user_ids is not None:
             shared_users = get_users_by_ids(db, task_update.shared_with_user_ids)
+            new_ids = {u.id for u in shared_users}
+            removed_ids = [u.id for u in db_task.shared_with_users if u.id not in new_ids]
+            old_ids = {u.id for u in db_task.shared_with_users}
+            added_ids = [u.id for u in shared_users if u.id not in old_ids]
             db_task.shared_with_users = shared_users
+            _add_tombstones(db, db_task.id, removed_ids, "unshared")
+            revoke_access(db, db_task.id, removed_ids)
+            grant_access(db, db_task.id, db_task.owner_id, added_ids)
+            if added_ids or removed_ids:
+                # Para que los nuevos usuarios la reciban en /tasks/changes
+                db_task.updated_at = func.now()
     
+    summary.apply_change(db, before, summary.snapshot(db_task))
+    touch_users(db, affected_ids + [u.id for u in db_task.shared_with_users])
+    if 'reminder_date' in update_data or 'completed' in update_data:
+        reminders.track_task(db, db_task)
+    stream.task_changed(db, db_task, [db_task.owner_id] + [u.id for u in db_task.shared_with_users], removed_ids)
+
+def update_task(db: Session, task_id: int, task_update: schemas.TaskUpdate, user_id: int):
+    """Actualiza una tarea"""
+    db_task = _single_task_query(db, task_id, user_id, with_tags=True).first()
+    if not db_task:
+        return None
+    _apply_task_update(db, db_task, task_update, user_id)
+    # updated_at vuelve en el propio UPDATE (eager_defaults): no hace falta refresh
     db.commit()
-    db.refresh(db_task)
     return db_task
 
+def _add_tombstones(db: Session, task_id: int, user_ids: List[int], reason: str):
+    """Registra que la tarea deja de ser visible para esos usuarios (una sola sentencia)"""
+    if user_ids:
+        db.execute(insert(models.TaskTombstone.__table__), [
+            {"task_id": task_id, "user_id": user_id, "reason": reason} for user_id in user_ids
+        ])
+
+def _apply_task_delete(db: Session, db_task: models.Task):
+    """Elimina la tarea en la sesión (sin commit)"""
+    user_ids = [db_task.owner_id] + [u.id for u in db_task.shared_with_users]
+    _add_tombstones(db, db_task.id, user_ids, "deleted")
+    revoke_access(db, db_task.id)
+    summary.apply_change(db, summary.snapshot(db_task), None)
+    touch_users(db, user_ids)
+    if db_task.reminder_date is not None:
+        reminders.track(db, db_task.id, None)
+    stream.task_deleted(db, db_task.id, user_ids)
+    db.delete(db_task)
+
 def delete_task(db: Session, task_id: int, owner_id: int):
     """Elimina una tarea (solo el propietario puede eliminar)"""
-    db_task = get_task_by_owner(db, task_id, owner_id)
+    db_task = _single_task_query(db, task_id, owner_id, owner_only=True, with_tags=True).first()
     if not db_task:
         return False
-    db.delete(db_task)
+    _apply_task_delete(db, db_task)
     db.commit()
     return True
 
+# Operaciones por lotes
+def _batch_result(index: int, operation: schemas.TaskBatchOperation, status_code: int,
+                  task_id: Optional[int] = None, error: Optional[str] = None) -> dict:
+    return {
+        "index": index,
+        "op": operation.op,
+        "client_id": operation.client_id,
+        "status": status_code,
+        "task_id": task_id,
+        "error": error,
+    }
+
+def apply_task_batch(db: Session, user_id: int, operations: List[schemas.TaskBatchOperation]):
+    """Aplica una lista de creaciones, actualizaciones y borrados en una sola transacción.
+    
+    Cada operación se ejecuta en su propio savepoint: si falla, solo se deshace esa
+    operación y el resto se confirma con un único commit. Las tareas afectadas se
+    cargan antes (una consulta) y después (otra consulta) en bloque.
+    
+    Devuelve (resultados, tareas por id) con un resultado por operación, en orden.
+    """
+    referenced_ids = {op.task_id for op in operations if op.task_id is not None}
+    tasks_by_id = {}
+    if referenced_ids:
+        tasks_by_id = {
+            task.id: task
+            for task in db.query(models.Task).options(
+                selectinload(models.Task.shared_with_users), selectinload(models.Task.tag_items)
+            ).filter(models.Task.id.in_(referenced_ids)).all()
+        }
+    
+    results = []
+    for index, operation in enumerate(operations):
+        try:
+            if operation.op == "create":
+                task_data = schemas.TaskCreate.model_validate(operation.data or {})
+            elif operation.op == "update":
+                task_data = schemas.TaskUpdate.model_validate(operation.data or {})
+        except ValidationError as e:
+            results.append(_batch_result(index, operation, 422, operation.task_id, str(e)))
+            continue
+        
+        db_task = tasks_by_id.get(operation.task_id) if operation.op != "create" else None
+        if operation.op != "create":
+            allowed = db_task is not None and (
+                db_task.owner_id == user_id if operation.op == "delete" else _can_access(db_task, user_id)
+            )
+            if not allowed:
+                results.append(_batch_result(index, operation, 404, operation.task_id, "Task not found"))
+                continue
+        
+        try:
+            with db.begin_nested():
+                if operation.op == "create":
+                    db_task = _apply_task_create(db, task_data, user_id)
+                    tasks_by_id[db_task.id] = db_task
+                    results.append(_batch_result(index, operation, 201, db_task.id))
+                elif operation.op == "update":
+                    _apply_task_update(db, db_task, task_data, user_id)
+                    db.flush()
+                    results.append(_batch_result(index, operation, 200, db_task.id))
+                else:
+                    _apply_task_delete(db, db_task)
+                    db.flush()
+                    del tasks_by_id[db_task.id]
+                    results.append(_batch_result(index, operation, 204, db_task.id))
+        except SQLAlchemyError as e:
+            results.append(_batch_result(index, operation, 409, operation.task_id, str(getattr(e, "orig", None) or e)))
+    db.commit()
+    
+    # Recargar en bloque las tareas creadas o actualizadas
+    changed_ids = [r["task_id"] for r in results if r["status"] in (200, 201)]
+    tasks = {}
+    if changed_ids:
+        tasks = {
+            task.id: task
+            for task in db.query(models.Task).options(
+                selectinload(models.Task.shared_with_users)
+            ).filter(models.Task.id.in_(changed_ids)).populate_existing().all()
+        }
+    return results, tasks
+
+def _apply_task_share(db: Session, db_task: models.Task, user_ids: List[int]):
+    """Añade usuarios compartidos a la tarea en la sesión (sin commit)"""
+    shared_users = get_users_by_ids(db, user_ids)
+    current_ids = {u.id for u in db_task.shared_with_users}
+    new_users = [u for u in shared_users if u.id not in current_ids]
+    if new_users:
+        db_task.shared_with_users.extend(new_users)
+        grant_access(db, db_task.id, db_task.owner_id, [u.id for u in new_users])
+        # Para que los nuevos usuarios la reciban en /tasks/changes
+        db_task.updated_at = func.now()
+        touch_users(db, [db_task.owner_id] + [u.id for u in db_task.shared_with_users])
+        stream.task_changed(db, db_task, [db_task.owner_id] + [u.id for u in db_task.shared_with_users])
+
 def share_task(db: Session, task_id: int, owner_id: int, user_ids: List[int]):
     """Comparte una tarea con otros usuarios"""
     db_task = get_task_by_owner(db, task_id, owner_id)
     if not db_task:
         return None
-    
-    shared_users = get_users_by_ids(db, user_ids)
-    db_task.shared_with_users.extend(shared_users)
+    _apply_task_share(db, db_task, user_ids)
     db.commit()
-    db.refresh(db_task)
     return db_task
 
+# Sincronización delta
+TOMBSTONE_RETENTION_DAYS = int(os.getenv("TOMBSTONE_RETENTION_DAYS", "30"))
+# Margen para no perder escrituras que se confirman después de leer la hora del servidor
+SYNC_OVERLAP_SECONDS = 5
+
+class SyncTokenExpired(Exception):
+    """El token es más antiguo que la retención de tombstones: hace falta una sincronización completa"""
+
+def encode_sync_token(timestamp: datetime) -> str:
+    """Codifica la hora del servidor como token de sincronización opaco"""
+    return base64.urlsafe_b64encode(timestamp.isoformat().encode()).decode().rstrip('=')
+
+def decode_sync_token(token: str) -> datetime:
+    """Decodifica un token de sincronización. Lanza ValueError si es inválido"""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        since_at = datetime.fromisoformat(raw.decode())
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        raise ValueError("Invalid sync token")
+    # Los tokens se emiten sin zona horaria (hora del servidor); uno con zona no se
+    # puede comparar con ella
+    if since_at.tzinfo is not None:
+        raise ValueError("Invalid sync token")
+    return since_at
+
+def _server_now(db: Session) -> datetime:
+    """Hora del servidor de base de datos (el reloj que escribe updated_at y deleted_at)"""
+    server_now = db.scalar(select(func.now()))
+    if isinstance(server_now, str):  # SQLite devuelve texto
+        server_now = datetime.fromisoformat(server_now)
+    return server_now
+
+def get_changes(db: Session, user_id: int, since: Optional[str] = None):
+    """Obtiene las tareas visibles creadas o modificadas desde `since` y los tombstones
+    de las que dejaron de serlo (borradas o ya no compartidas).
+    
+    Sin `since` devuelve todas las tareas visibles (sincronización completa).
+    Devuelve (tareas, tombstones, nuevo token).
+    """
+    server_now = _server_now(db)
+    query = _build_tasks_query(db, user_id, schemas.TaskFilter(include_shared=True))
+    tombstones = []
+    if since is not None:
+        since_at = decode_sync_token(since)
+        if since_at < server_now - timedelta(days=TOMBSTONE_RETENTION_DAYS):
+            raise SyncTokenExpired()
+        window_start = since_at - timedelta(seconds=SYNC_OVERLAP_SECONDS)
+        query = query.filter(models.Task.updated_at >= window_start)
+        tombstones = db.query(models.TaskTombstone).filter(
+            models.TaskTombstone.user_id == user_id,
+            models.TaskTombstone.deleted_at >= window_start
+        ).order_by(models.TaskTombstone.deleted_at).all()
+    tasks = query.order_by(models.Task.updated_at, models.Task.id).all()
+    
+    # Si la tarea volvió a ser visible después del tombstone, gana la tarea
+    visible_since = {task.id: task.updated_at for task in tasks}
+    tombstones = [
+        t for t in tombstones
+        if t.task_id not in visible_since or t.deleted_at > visible_since[t.task_id]
+    ]
+    return tasks, tombstones, encode_sync_token(server_now)
+
+def prune_tombstones(db: Session, retention_days: int = TOMBSTONE_RETENTION_DAYS) -> int:
+    """Elimina los tombstones más antiguos que la retención"""
+    # Con el reloj de la base de datos, el mismo que fija deleted_at
+    cutoff = _server_now(db) - timedelta(days=retention_days)
+    deleted = db.query(models.TaskTombstone).filter(
+        models.TaskTombstone.deleted_at < cutoff
+    ).delete(synchronize_session=False)
+    db.commit()
+    return deleted
+
+# Importación masiva
+IMPORT_CHUNK_SIZE = 1000
+IMPORT_MAX_ERRORS = 1000
+
+def _validation_message(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in err['loc'])}: {err['msg']}" if err['loc'] else err['msg']
+        for err in error.errors()
+    )
+
+def _insert_task_rows(db: Session, rows: List[dict]) -> List[int]:
+    """Inserta las filas de tareas y devuelve sus ids en el mismo orden"""
+    table = models.Task.__table__
+    if db.get_bind().dialect.insert_executemany_returning_sort_by_parameter_order:
+        result = db.execute(insert(table).returning(table.c.id, sort_by_parameter_order=True), rows)
+        return list(result.scalars())
+    # MySQL no admite RETURNING en inserciones múltiples: una sentencia por fila
+    return [db.execute(insert(table).values(**row)).inserted_primary_key[0] for row in rows]
+
+def _import_chunk(db: Session, owner_id: int, tasks: List[schemas.TaskCreate]):
+    """Inserta un bloque de tareas validadas (sin commit)"""
+    tag_names = [normalize_tags(task.tags) for task in tasks]
+    tags_by_name = {
+        tag.name: tag.id
+        for tag in get_or_create_tags(db, list(dict.fromkeys(name for names in tag_names for name in names)))
+    }
+    rows = [
+        dict(task.dict(exclude={'shared_with_user_ids', 'tags'}),
+             tags=','.join(names) if names else None, owner_id=owner_id)
+        for task, names in zip(tasks, tag_names)
+    ]
+    task_ids = _insert_task_rows(db, rows)
+    links = [
+        {"task_id": task_id, "tag_id": tags_by_name[name]}
+        for task_id, names in zip(task_ids, tag_names)
+        for name in names
+    ]
+    if links:
+        db.execute(insert(models.task_tags), links)
+    db.execute(insert(models.TaskAccess.__table__), [
+        {"user_id": owner_id, "task_id": task_id, "role": ACCESS_OWNER} for task_id in task_ids
+    ])
+    summary.apply_created(db, [
+        summary.TaskSnapshot(owner_id, bool(row["completed"]), row["category"] or None,
+                             frozenset(tags_by_name[name] for name in names))
+        for row, names in zip(rows, tag_names)
+    ])
+    for task_id, row in zip(task_ids, rows):
+        if row["reminder_date"] is not None and not row["completed"]:
+            reminders.track(db, task_id, row["reminder_date"])
+
+def import_tasks(db: Session, owner_id: int, rows, chunk_size: int = IMPORT_CHUNK_SIZE) -> dict:
+    """Valida e inserta tareas en bloques dentro de una única transacción.
+
+    `rows` son tuplas (línea, datos) de app.importer. Las filas inválidas se saltan
+    y se informan con su línea; las tareas se importan para el usuario, sin compartir.
+    Si el documento está mal formado (ImportFormatError) no se hace commit.
+    """
+    imported = 0
+    failed = 0
+    errors = []
+    chunk = []
+
+    def fail(line: int, message: str):
+        nonlocal failed
+        failed += 1
+        if len(errors) < IMPORT_MAX_ERRORS:
+            errors.append({"line": line, "error": message})
+
+    try:
+        for line, data in rows:
+            if isinstance(data, importer.ImportRowError):
+                fail(line, str(data))
+                continue
+            if not isinstance(data, dict):
+                fail(line, "expected an object")
+                continue
+            data.pop("shared_with_user_ids", None)
+            try:
+                chunk.append(schemas.TaskCreate(**data))
+            except ValidationError as e:
+                fail(line, _validation_message(e))
+                continue
+            if len(chunk) >= chunk_size:
+                _import_chunk(db, owner_id, chunk)
+                imported += len(chunk)
+                chunk = []
+        if chunk:
+            _import_chunk(db, owner_id, chunk)
+            imported += len(chunk)
+        if imported:
+            touch_users(db, [owner_id])
+            stream.resync(db, [owner_id])
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return {
+        "imported": imported,
+        "failed": failed,
+        "errors": errors,
+        "errors_truncated": failed > len(errors),
+    }
+
 def get_categories(db: Session, user_id: int):
-    """Obtiene todas las categorías únicas del usuario"""
-    categories = db.query(models.Task.category).filter(
-        models.Task.owner_id == user_id,
-        models.Task.category.isnot(None)
-    ).distinct().all()
-    return [cat[0] for cat in categories if cat[0]]
+    """Obtiene todas las categorías únicas del usuario (desde el resumen)"""
+    return summary.get_categories(db, user_id)
 
 def get_all_tags(db: Session, user_id: int):
-    """Obtiene todas las etiquetas únicas del usuario"""
-    tasks = db.query(models.Task.tags).filter(
-        models.Task.owner_id == user_id,
-        models.Task.tags.isnot(None)
-    ).all()
-    
-    all_tags = set()
-    for task in tasks:
-        if task[0]:
-            tags = [tag.strip() for tag in task[0].split(',')]
-            all_tags.update(tags)
-    
-    return sorted(list(all_tags))
+    """Obtiene todas las etiquetas únicas del usuario (desde el resumen)"""
+    return summary.get_tags(db, user_id)
+
+def get_task_summary(db: Session, user_id: int):
+    """Obtiene los totales de tareas del usuario"""
+    return summary.get_summary(db, user_id)
@@ -0,0 +1,86 @@
+"""Versiones asíncronas de las funciones de app.crud.
+
+Cada función ejecuta la lógica de crud.py sobre una AsyncSession mediante
+AsyncSession.run_sync, de modo que las consultas no se duplican y ambas pilas
+se comportan igual. Las tareas devueltas traen cargados los usuarios compartidos,
+porque fuera de run_sync no se puede hacer lazy loading.
+"""
+from typing import List, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from app import crud, models, schemas
+
+def _load_shared(task: Optional[models.Task]):
+    """Carga task.shared_with_users dentro de run_sync"""
+    if task is not None:
+        task.shared_with_users
+    return task
+
+# Funciones CRUD para User
+async def create_user(db: AsyncSession, user: schemas.UserCreate, hashed_password: Optional[str] = None):
+    """Crea un nuevo usuario"""
+    return await db.run_sync(crud.create_user, user, hashed_password)
+
+async def get_user_by_email(db: AsyncSession, email: str):
+    """Obtiene un usuario por su email"""
+    return await db.run_sync(crud.get_user_by_email, email)
+
+async def get_user_by_id(db: AsyncSession, user_id: int):
+    """Obtiene un usuario por su ID"""
+    return await db.run_sync(crud.get_user_by_id, user_id)
+
+async def get_users_by_ids(db: AsyncSession, user_ids: List[int]):
+    """Obtiene múltiples usuarios por sus IDs"""
+    return await db.run_sync(crud.get_users_by_ids, user_ids)
+
+# Funciones CRUD para Task
+async def create_task(db: AsyncSession, task: schemas.TaskCreate, owner_id: int):
+    """Crea una nueva tarea"""
+    return await db.run_sync(lambda s: _load_shared(crud.create_task(s, task, owner_id)))
+
+async def get_tasks(db: AsyncSession, owner_id: int, skip: int = 0, limit: int = 100,
+                    filters: Optional[schemas.TaskFilter] = None):
+    """Obtiene todas las tareas de un usuario con filtros opcionales"""
+    return await db.run_sync(crud.get_tasks, owner_id, skip, limit, filters)
+
+async def get_tasks_page(db: AsyncSession, owner_id: int, limit: int = 100,
+                         filters: Optional[schemas.TaskFilter] = None,
+                         cursor: Optional[str] = None, order_by: str = "updated_at"):
+    """Obtiene una página de tareas usando paginación por cursor (keyset)"""
+    return await db.run_sync(crud.get_tasks_page, owner_id, limit, filters, cursor, order_by)
+
+async def get_task(db: AsyncSession, task_id: int, user_id: int):
+    """Obtiene una tarea específica (propia o compartida)"""
+    return await db.run_sync(crud.get_task, task_id, user_id)
+
+async def update_task(db: AsyncSession, task_id: int, task_update: schemas.TaskUpdate, user_id: int):
+    """Actualiza una tarea"""
+    return await db.run_sync(lambda s: _load_shared(crud.update_task(s, task_id, task_update, user_id)))
+
+async def delete_task(db: AsyncSession, task_id: int, owner_id: int):
+    """Elimina una tarea (solo el propietario puede eliminar)"""
+    return await db.run_sync(crud.delete_task, task_id, owner_id)
+
+async def share_task(db: AsyncSession, task_id: int, owner_id: int, user_ids: List[int]):
+    """Comparte una tarea con otros usuarios"""
+    return await db.run_sync(lambda s: _load_shared(crud.share_task(s, task_id, owner_id, user_ids)))
+
+async def get_user_version(db: AsyncSession, user_id: int):
+    """Obtiene la versión de datos del usuario"""
+    return await db.run_sync(crud.get_user_version, user_id)
+
+async def get_categories(db: AsyncSession, user_id: int):
+    """Obtiene todas las categorías únicas del usuario"""
+    return await db.run_sync(crud.get_categories, user_id)
+
+async def get_all_tags(db: AsyncSession, user_id: int):
+    """Obtiene todas las etiquetas únicas del usuario"""
+    return await db.run_sync(crud.get_all_tags, user_id)
+
+async def get_task_summary(db: AsyncSession, user_id: int):
+    """Obtiene los totales de tareas del usuario"""
+    return await db.run_sync(crud.get_task_summary, user_id)
+
+async def search_users(db: AsyncSession, user_id: int, prefix: str = "", limit: int = 20,
+                       cursor: Optional[str] = None):
+    """Versión asíncrona de crud.search_users"""
+    return await db.run_sync(crud.search_users, user_id, prefix, limit, cursor)
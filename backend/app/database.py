@@ -1,7 +1,12 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import now
 import os
+import time
+from app import metrics
+from app.pool import engine_options, instrument_engine
 
 # URL de conexión a MySQL
 DATABASE_URL = os.getenv(
@@ -9,11 +14,69 @@ DATABASE_URL = os.getenv(
     "mysql+pymysql://root:rootpassword@db:3306/todo_db"
 )
 
-engine = create_engine(DATABASE_URL, pool_pre_ping=True)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+def track_queries(engine):
+    """Mide cada consulta para /metrics (número y tiempo de BD por petición)"""
+    sync_engine = getattr(engine, "sync_engine", engine)
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        context._query_start_time = time.perf_counter()
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        metrics.record_query(time.perf_counter() - context._query_start_time)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _handle_error(exception_context):
+        # Las consultas que fallan no pasan por after_cursor_execute
+        start = getattr(exception_context.execution_context, "_query_start_time", None)
+        if start is not None:
+            metrics.record_query(time.perf_counter() - start)
+
+# Tamaño del pool, reciclado y pre-ping configurables por entorno (ver app/pool.py)
+engine = create_engine(DATABASE_URL, **engine_options(DATABASE_URL, "primary"))
+instrument_engine(engine, "primary")
+if metrics.METRICS_ENABLED:
+    track_queries(engine)
+# Igual que la sesión asíncrona: tras el commit los objetos conservan sus valores y
+# las rutas los serializan sin volver a consultarlos
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
+
+# Pila asíncrona opcional (DB_ASYNC=true): aiomysql para MySQL, aiosqlite para SQLite
+DB_ASYNC = os.getenv("DB_ASYNC", "false").lower() in ("1", "true", "yes")
+
+def to_async_url(url: str) -> str:
+    """Convierte una URL de conexión síncrona en su equivalente con driver asíncrono"""
+    scheme, _, rest = url.partition("://")
+    dialect = scheme.split("+")[0]
+    drivers = {"mysql": "mysql+aiomysql", "sqlite": "sqlite+aiosqlite"}
+    if dialect not in drivers:
+        raise ValueError(f"No hay driver asíncrono configurado para '{dialect}'")
+    return f"{drivers[dialect]}://{rest}"
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or (to_async_url(DATABASE_URL) if DB_ASYNC else None)
+
+async_engine = None
+AsyncSessionLocal = None
+if DB_ASYNC:
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+    async_engine = create_async_engine(ASYNC_DATABASE_URL, **engine_options(ASYNC_DATABASE_URL, "async"))
+    instrument_engine(async_engine, "async")
+    if metrics.METRICS_ENABLED:
+        track_queries(async_engine)
+    AsyncSessionLocal = async_sessionmaker(
+        async_engine, autoflush=False, expire_on_commit=False
+    )
 
 Base = declarative_base()
 
+@compiles(now, "sqlite")
+def _sqlite_now(element, compiler, **kw):
+    """En SQLite, NOW() se guarda con el mismo formato que usa SQLAlchemy para
+    los DateTime, así las comparaciones entre columnas y parámetros son coherentes"""
+    return "strftime('%Y-%m-%d %H:%M:%f000', 'now')"
+
 def get_db():
     """Dependencia para obtener la sesión de base de datos"""
     db = SessionLocal()
@@ -21,3 +84,8 @@ def get_db():
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    """Dependencia para obtener la sesión asíncrona de base de datos"""
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,225 @@
+"""Lectura incremental de los ficheros de importación (JSON, NDJSON y CSV).
+
+Los formatos son los mismos que generan las exportaciones. El cuerpo se recibe como
+un iterador de bloques de bytes (opcionalmente comprimido con gzip) y cada parser
+devuelve tuplas (línea, datos) a medida que las lee, sin cargar el fichero entero.
+Las filas que no se pueden leer se devuelven como (línea, ImportRowError).
+"""
+from typing import Iterator, Optional, Tuple
+import codecs
+import csv
+import json
+import zlib
+
+IMPORT_FORMATS = ("json", "ndjson", "csv")
+
+# Tamaño máximo de una tarea en JSON antes de considerar el documento inválido
+MAX_ROW_BYTES = 1024 * 1024
+
+CONTENT_TYPES = {
+    "application/json": "json",
+    "application/x-ndjson": "ndjson",
+    "application/ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+    "text/csv": "csv",
+}
+
+# Cabeceras de la exportación CSV (y sus equivalentes en inglés)
+CSV_FIELDS = {
+    "título": "title", "title": "title",
+    "descripción": "description", "description": "description",
+    "completada": "completed", "completed": "completed",
+    "categoría": "category", "category": "category",
+    "etiquetas": "tags", "tags": "tags",
+    "fecha vencimiento": "due_date", "due_date": "due_date",
+    "fecha recordatorio": "reminder_date", "reminder_date": "reminder_date",
+}
+
+TRUE_VALUES = {"sí", "si", "true", "1", "yes", "y"}
+FALSE_VALUES = {"no", "false", "0", "n", ""}
+
+class ImportFormatError(ValueError):
+    """El documento no se puede seguir leyendo (estructura inválida)"""
+
+    def __init__(self, line: int, message: str):
+        super().__init__(f"line {line}: {message}")
+        self.line = line
+
+class ImportRowError(ValueError):
+    """Una fila concreta no es válida; el resto del fichero se sigue leyendo"""
+
+def detect_format(format: Optional[str], content_type: Optional[str]) -> Optional[str]:
+    """Formato indicado en la query o deducido del Content-Type"""
+    if format:
+        return format if format in IMPORT_FORMATS else None
+    media_type = (content_type or "").split(";")[0].strip().lower()
+    return CONTENT_TYPES.get(media_type)
+
+def gunzip(chunks: Iterator[bytes]) -> Iterator[bytes]:
+    """Descomprime al vuelo un cuerpo gzip"""
+    decompressor = zlib.decompressobj(wbits=31)
+    for chunk in chunks:
+        data = decompressor.decompress(chunk)
+        if data:
+            yield data
+    data = decompressor.flush()
+    if data:
+        yield data
+
+def _decoded(chunks: Iterator[bytes]) -> Iterator[str]:
+    """Decodifica UTF-8 (con o sin BOM) sin partir caracteres entre bloques"""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    for chunk in chunks:
+        text = decoder.decode(chunk)
+        if text:
+            yield text
+    text = decoder.decode(b"", final=True)
+    if text:
+        yield text
+
+def _lines(chunks: Iterator[bytes]) -> Iterator[str]:
+    """Líneas de texto (con su salto de línea)"""
+    pending = ""
+    for text in _decoded(chunks):
+        pending += text
+        lines = pending.splitlines(keepends=True)
+        pending = lines.pop() if lines and not lines[-1].endswith(("\n", "\r")) else ""
+        yield from lines
+    if pending:
+        yield pending
+
+def parse_ndjson(chunks: Iterator[bytes]) -> Iterator[Tuple[int, object]]:
+    """Una tarea JSON por línea; las líneas vacías se ignoran"""
+    for line_number, line in enumerate(_lines(chunks), start=1):
+        if not line.strip():
+            continue
+        try:
+            yield line_number, json.loads(line)
+        except ValueError as e:
+            yield line_number, ImportRowError(f"invalid JSON: {e}")
+
+def parse_json(chunks: Iterator[bytes]) -> Iterator[Tuple[int, object]]:
+    """Array JSON de tareas, leído objeto a objeto.
+
+    La línea de cada tarea es la línea del documento en la que empieza.
+    """
+    decoder = json.JSONDecoder()
+    texts = _decoded(chunks)
+    buffer = ""
+    position = 0
+    line = 1
+    exhausted = False
+    started = False
+
+    def fill() -> bool:
+        nonlocal buffer, position, exhausted
+        if exhausted:
+            return False
+        text = next(texts, None)
+        if text is None:
+            exhausted = True
+            return False
+        buffer = buffer[position:] + text
+        position = 0
+        return True
+
+    def skip_whitespace():
+        nonlocal position, line
+        while True:
+            while position < len(buffer) and buffer[position] in " \t\r\n":
+                if buffer[position] == "\n":
+                    line += 1
+                position += 1
+            if position < len(buffer) or not fill():
+                return
+
+    skip_whitespace()
+    if position >= len(buffer) or buffer[position] != "[":
+        raise ImportFormatError(line, "expected a JSON array of tasks")
+    position += 1
+    while True:
+        skip_whitespace()
+        if position >= len(buffer):
+            raise ImportFormatError(line, "unexpected end of document")
+        if buffer[position] == "]":
+            return
+        if started:
+            if buffer[position] != ",":
+                raise ImportFormatError(line, "expected ',' or ']'")
+            position += 1
+            skip_whitespace()
+        started = True
+        while True:
+            try:
+                item, end = decoder.raw_decode(buffer, position)
+            except ValueError as e:
+                if len(buffer) - position > MAX_ROW_BYTES or not fill():
+                    raise ImportFormatError(line, f"invalid JSON: {e.msg}")
+                continue
+            # Un número al final del bloque puede continuar en el siguiente
+            if end == len(buffer) and not isinstance(item, (dict, list)) and fill():
+                continue
+            break
+        item_line = line
+        line += buffer.count("\n", position, end)
+        position = end
+        yield item_line, item
+
+def _csv_bool(value: str) -> bool:
+    normalized = value.strip().lower()
+    if normalized in TRUE_VALUES:
+        return True
+    if normalized in FALSE_VALUES:
+        return False
+    raise ImportRowError(f"invalid boolean '{value}'")
+
+def parse_csv(chunks: Iterator[bytes]) -> Iterator[Tuple[int, object]]:
+    """CSV con cabecera (la de la exportación o los nombres de los campos).
+
+    Las columnas desconocidas (ID, fechas de creación...) se ignoran.
+    """
+    reader = csv.reader(_lines(chunks))
+    try:
+        header = next(reader)
+    except StopIteration:
+        return
+    except csv.Error as e:
+        raise ImportFormatError(1, f"invalid CSV: {e}")
+    fields = [CSV_FIELDS.get(name.strip().lower()) for name in header]
+    if "title" not in fields:
+        raise ImportFormatError(1, "CSV header must include a title column")
+    while True:
+        # Un registro puede ocupar varias líneas (campos entre comillas): se informa la primera
+        line_number = reader.line_num + 1
+        try:
+            values = next(reader)
+        except StopIteration:
+            return
+        except csv.Error as e:
+            raise ImportFormatError(line_number, f"invalid CSV: {e}")
+        if not any(value.strip() for value in values):
+            continue
+        if len(values) != len(header):
+            yield line_number, ImportRowError(f"expected {len(header)} columns, got {len(values)}")
+            continue
+        row = {}
+        try:
+            for field, value in zip(fields, values):
+                if field is None:
+                    continue
+                if field == "completed":
+                    row[field] = _csv_bool(value)
+                elif field == "tags":
+                    row[field] = value.split(",") if value.strip() else []
+                else:
+                    row[field] = value if value != "" or field == "title" else None
+        except ImportRowError as e:
+            yield line_number, e
+            continue
+        yield line_number, row
+
+PARSERS = {"json": parse_json, "ndjson": parse_ndjson, "csv": parse_csv}
+
+def parse(format: str, chunks: Iterator[bytes]) -> Iterator[Tuple[int, object]]:
+    """Filas (línea, datos o ImportRowError) del documento en el formato indicado"""
+    return PARSERS[format](chunks)
@@ -1,18 +1,48 @@
-from fastapi import FastAPI, Request, status
+from contextlib import asynccontextmanager
+import os
+from fastapi import Depends, FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from fastapi.exceptions import RequestValidationError
 from starlette.exceptions import HTTPException as StarletteHTTPException
-from app.database import engine, Base
+from fastapi import APIRouter
+from app.database import engine, Base, DB_ASYNC, SessionLocal
+from app import crud, metrics, reminders, replicas
+from app.auth import get_current_user, password_hasher
+from app.pool import get_pool_stats
 from app.routers import auth, tasks
+from app.search import ensure_search_index
+from app.serialization import FastJSONResponse
 
 # Crear las tablas en la base de datos
 Base.metadata.create_all(bind=engine)
+# Tabla FTS5 de la búsqueda de tareas (solo SQLite; en MySQL el índice es de las migraciones)
+ensure_search_index(engine)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Inicializa y libera los recursos de la aplicación"""
+    db = SessionLocal()
+    try:
+        crud.prune_tombstones(db)
+    finally:
+        db.close()
+    # Recordatorios: hilo de fondo que escribe los vencidos en notification_outbox
+    reminders.start_scheduler()
+    # Réplicas de lectura: comprobaciones periódicas en un hilo de fondo
+    replicas.replica_set.start()
+    yield
+    replicas.replica_set.stop()
+    reminders.stop_scheduler()
+    password_hasher.shutdown()
 
 app = FastAPI(
     title="Todo API",
     description="API para gestión de tareas con FastAPI y MySQL",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    # Con FAST_JSON=1 las respuestas se serializan con orjson
+    default_response_class=FastJSONResponse
 )
 
 # Configurar CORS - DEBE estar antes de los routers
@@ -30,6 +60,9 @@ app.add_middleware(
     expose_headers=["*"],  # Exponer todos los headers
 )
 
+# Latencia por ruta, tiempo de BD por petición y peticiones en curso (GET /metrics)
+app.add_middleware(metrics.MetricsMiddleware)
+
 # Manejador de excepciones para errores no manejados (asegura headers CORS)
 @app.exception_handler(StarletteHTTPException)
 async def http_exception_handler(request: Request, exc: StarletteHTTPException):
@@ -67,9 +100,61 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
         headers=headers
     )
 
+def include_router_with_overrides(app: FastAPI, router: APIRouter, override: APIRouter):
+    """Incluye las rutas de `router` en su orden original, sustituyendo las que también
+    define `override`. Mantener el orden evita que una ruta con parámetros
+    (p. ej. /tasks/{task_id}) tape a una ruta fija declarada antes (/tasks/changes)."""
+    replacements = {
+        (route.path, method): route
+        for route in override.routes
+        for method in route.methods
+    }
+    merged = APIRouter()
+    used = set()
+    for route in router.routes:
+        replacement = next(
+            (replacements[(route.path, method)] for method in route.methods
+             if (route.path, method) in replacements),
+            None
+        )
+        if replacement is not None:
+            used.add(id(replacement))
+        merged.routes.append(replacement or route)
+    merged.routes.extend(route for route in override.routes if id(route) not in used)
+    app.include_router(merged)
+
 # Incluir routers
-app.include_router(auth.router)
-app.include_router(tasks.router)
+if DB_ASYNC:
+    # Pila asíncrona; las rutas sin versión asíncrona siguen en los routers síncronos
+    from app.routers import auth_async, tasks_async
+    include_router_with_overrides(app, auth.router, auth_async.router)
+    include_router_with_overrides(app, tasks.router, tasks_async.router)
+else:
+    app.include_router(auth.router)
+    app.include_router(tasks.router)
+
+@app.get("/metrics", include_in_schema=False)
+def read_metrics():
+    """Métricas en formato de texto de Prometheus"""
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+# Diagnóstico interno (pools y réplicas, con errores que pueden incluir hosts):
+# solo con STATS_ENABLED y con sesión iniciada
+STATS_ENABLED = os.getenv("STATS_ENABLED", "false").lower() in ("1", "true", "yes")
+stats_router = APIRouter(dependencies=[Depends(get_current_user)], include_in_schema=False)
+
+@stats_router.get("/pool/stats")
+def read_pool_stats():
+    """Estadísticas en vivo de los pools de conexiones"""
+    return get_pool_stats()
+
+@stats_router.get("/replicas/stats")
+def read_replica_stats():
+    """Estado de las réplicas de lectura y usuarios fijados a la primaria"""
+    return replicas.replica_set.stats()
+
+if STATS_ENABLED:
+    app.include_router(stats_router)
 
 @app.get("/")
 def root():
@@ -0,0 +1,234 @@
+"""Métricas de la API en formato de texto de Prometheus (GET /metrics).
+
+- Latencia por ruta (histograma) y número de peticiones por ruta y código
+- Consultas a la BD y tiempo de BD por petición (histogramas por ruta), a partir de
+  los eventos before/after_cursor_execute registrados en database.py
+- Peticiones en curso
+- Recordatorios disparados y su retraso respecto a reminder_date
+- Sesiones de lectura por destino (réplica, primaria) y fallos de las réplicas
+- Estado de los pools de conexiones (app/pool.py)
+
+Las rutas se etiquetan con su plantilla (/tasks/{task_id}), no con la URL, para que
+el número de series no crezca con los ids. Cada petición cuesta unas pocas lecturas
+del reloj y un lock por histograma, así que puede dejarse activo en producción
+(METRICS_ENABLED=false lo desactiva).
+"""
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Dict, Optional, Sequence, Tuple
+import os
+import threading
+import time
+from app.pool import get_pool_stats
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 10.0)
+DB_QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50, 100)
+DB_TIME_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+def _format_number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+class Histogram:
+    """Histograma con etiquetas; los buckets se acumulan al exportar"""
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str], buckets: Sequence[float]):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels: Tuple[str, ...], value: float):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # [contador por bucket (+Inf al final), suma, total]
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = [(labels, list(counts), total, count) for labels, (counts, total, count) in self._series.items()]
+        for labels, counts, total, count in sorted(series):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = 'le="' + _format_number(bound) + '"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, labels, le)} {cumulative}")
+            label_text = _format_labels(self.label_names, labels)
+            lines.append(f"{self.name}_sum{label_text} {_format_number(total)}")
+            lines.append(f"{self.name}_count{label_text} {count}")
+        return lines
+
+class Counter:
+    """Contador con etiquetas"""
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: Tuple[str, ...] = (), amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = sorted(self._values.items())
+        for labels, value in values:
+            lines.append(f"{self.name}{_format_labels(self.label_names, labels)} {_format_number(value)}")
+        return lines
+
+class Gauge:
+    """Valor instantáneo sin etiquetas"""
+
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def add(self, amount: float):
+        with self._lock:
+            self.value += amount
+
+    def render(self) -> list:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge",
+                f"{self.name} {_format_number(self.value)}"]
+
+REQUEST_LABELS = ("method", "route")
+
+request_duration = Histogram(
+    "http_request_duration_seconds", "Request latency by route", REQUEST_LABELS, LATENCY_BUCKETS)
+requests_total = Counter(
+    "http_requests_total", "Requests by route and status code", REQUEST_LABELS + ("status",))
+requests_in_flight = Gauge(
+    "http_requests_in_flight", "Requests currently being processed")
+request_db_queries = Histogram(
+    "http_request_db_queries", "Database queries per request by route", REQUEST_LABELS, DB_QUERY_BUCKETS)
+request_db_seconds = Histogram(
+    "http_request_db_seconds", "Database time per request by route", REQUEST_LABELS, DB_TIME_BUCKETS)
+db_queries_total = Counter("db_queries_total", "Database queries executed")
+db_query_seconds_total = Counter("db_query_seconds_total", "Time spent in database queries")
+# Programador de recordatorios (app/reminders.py)
+reminders_fired_total = Counter("reminders_fired_total", "Reminders written to the notification outbox")
+reminder_lag_seconds = Histogram(
+    "reminder_lag_seconds", "Delay between reminder_date and firing", (), LATENCY_BUCKETS)
+# Réplicas de lectura (app/replicas.py): pinned = primaria tras una escritura del usuario
+db_read_sessions_total = Counter(
+    "db_read_sessions_total", "Read-only sessions by target (replica, primary, pinned)", ("target",))
+db_replica_check_failures_total = Counter(
+    "db_replica_check_failures_total", "Failed replica health checks", ("replica",))
+
+class RequestStats:
+    """Consultas y tiempo de BD de la petición en curso"""
+    __slots__ = ("queries", "db_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+
+# El contexto se copia al threadpool de las rutas síncronas y al greenlet de run_sync;
+# al ser un objeto mutable, las consultas hechas allí se suman a la misma petición
+current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request", default=None)
+
+def record_query(seconds: float):
+    """Registra una consulta (llamado desde after_cursor_execute)"""
+    db_queries_total.inc()
+    db_query_seconds_total.inc(amount=seconds)
+    stats = current_request.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_seconds += seconds
+
+class MetricsMiddleware:
+    """Middleware ASGI que mide cada petición HTTP"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        stats = RequestStats()
+        token = current_request.set(stats)
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        requests_in_flight.add(1)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            requests_in_flight.add(-1)
+            current_request.reset(token)
+            route = scope.get("route")
+            labels = (scope["method"], getattr(route, "path", None) or "unmatched")
+            request_duration.observe(labels, elapsed)
+            requests_total.inc(labels + (str(status_code),))
+            request_db_queries.observe(labels, stats.queries)
+            request_db_seconds.observe(labels, stats.db_seconds)
+
+POOL_GAUGES = ("checked_out", "checked_in", "overflow", "size")
+POOL_COUNTERS = ("connects", "checkouts", "timeouts", "invalidations", "ping_failures")
+
+def _render_pools() -> list:
+    lines = []
+    pools = get_pool_stats()
+    for key in POOL_GAUGES:
+        name = f"db_pool_{key}"
+        lines += [f"# HELP {name} Connection pool {key.replace('_', ' ')}", f"# TYPE {name} gauge"]
+        lines += [f'{name}{{pool="{pool}"}} {stats[key]}' for pool, stats in pools.items() if key in stats]
+    for key in POOL_COUNTERS:
+        name = f"db_pool_{key}_total"
+        lines += [f"# HELP {name} Connection pool {key.replace('_', ' ')}", f"# TYPE {name} counter"]
+        lines += [f'{name}{{pool="{pool}"}} {stats[key]}' for pool, stats in pools.items()]
+    name = "db_pool_wait_seconds_total"
+    lines += [f"# HELP {name} Time spent waiting for a pooled connection", f"# TYPE {name} counter"]
+    lines += [f'{name}{{pool="{pool}"}} {_format_number(stats["wait_seconds_total"])}'
+              for pool, stats in pools.items()]
+    return lines
+
+def render() -> str:
+    """Todas las métricas en formato de texto de Prometheus"""
+    lines = []
+    for metric in (request_duration, requests_total, requests_in_flight, request_db_queries,
+                   request_db_seconds, db_queries_total, db_query_seconds_total,
+                   reminders_fired_total, reminder_lag_seconds, db_read_sessions_total,
+                   db_replica_check_failures_total):
+        lines += metric.render()
+    lines += _render_pools()
+    return "\n".join(lines) + "\n"
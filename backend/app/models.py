@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, Text, Table
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, Text, Table, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from datetime import datetime
@@ -9,7 +9,19 @@ task_shared_with = Table(
     'task_shared_with',
     Base.metadata,
     Column('task_id', Integer, ForeignKey('tasks.id'), primary_key=True),
-    Column('user_id', Integer, ForeignKey('users.id'), primary_key=True)
+    Column('user_id', Integer, ForeignKey('users.id'), primary_key=True),
+    # Índice inverso para buscar las tareas compartidas con un usuario
+    Index('ix_task_shared_with_user_id_task_id', 'user_id', 'task_id')
+)
+
+# Tabla de asociación entre tareas y etiquetas (many-to-many)
+task_tags = Table(
+    'task_tags',
+    Base.metadata,
+    Column('task_id', Integer, ForeignKey('tasks.id', ondelete='CASCADE'), primary_key=True),
+    Column('tag_id', Integer, ForeignKey('tags.id', ondelete='CASCADE'), primary_key=True),
+    # Índice inverso para buscar tareas por etiqueta
+    Index('ix_task_tags_tag_id_task_id', 'tag_id', 'task_id')
 )
 
 class User(Base):
@@ -18,6 +30,8 @@ class User(Base):
     id = Column(Integer, primary_key=True, index=True)
     email = Column(String(255), unique=True, index=True, nullable=False)
     hashed_password = Column(String(255), nullable=False)
+    # Se incrementa con cada escritura que afecta a las tareas visibles del usuario
+    data_version = Column(Integer, default=0, server_default="0", nullable=False)
 
     # Relación con las tareas
     tasks = relationship("Task", back_populates="owner", cascade="all, delete-orphan")
@@ -26,20 +40,119 @@ class User(Base):
 
 class Task(Base):
     __tablename__ = "tasks"
+    # Todas las consultas filtran primero por propietario (ver crud._build_tasks_query)
+    __table_args__ = (
+        Index('ix_tasks_owner_id_completed_due_date', 'owner_id', 'completed', 'due_date'),
+        Index('ix_tasks_owner_id_category', 'owner_id', 'category'),
+        Index('ix_tasks_owner_id_updated_at', 'owner_id', 'updated_at'),
+        # Carga por ventanas del programador de recordatorios (app/reminders.py)
+        Index('ix_tasks_reminder_date', 'reminder_date'),
+        # Búsqueda (app/search.py). Solo MySQL: create_all lo incluye en el CREATE TABLE
+        # y en BDs existentes lo crea la migración e7b87954e330
+        Index('ft_tasks_title_description', 'title', 'description', mysql_prefix='FULLTEXT').ddl_if(dialect='mysql'),
+    )
+    # Los valores generados por la BD (updated_at) se leen en el mismo INSERT/UPDATE
+    # (RETURNING) en lugar de con un refresh posterior
+    __mapper_args__ = {"eager_defaults": True}
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(255), nullable=False)
     description = Column(String(1000), nullable=True)
     completed = Column(Boolean, default=False, nullable=False)
     category = Column(String(100), nullable=True, index=True)
-    tags = Column(String(500), nullable=True)  # Almacenado como string separado por comas
+    tags = Column(String(500), nullable=True)  # Copia separada por comas de tag_items, para la respuesta
     due_date = Column(DateTime, nullable=True, index=True)
     reminder_date = Column(DateTime, nullable=True)
     owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     created_at = Column(DateTime, default=func.now(), nullable=False)
-    updated_at = Column(DateTime, default=func.now(), onupdate=func.now(), nullable=False)
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now(), nullable=False, index=True)
 
     # Relación con el usuario propietario
     owner = relationship("User", back_populates="tasks")
     # Relación con usuarios con los que se comparte la tarea
     shared_with_users = relationship("User", secondary=task_shared_with, back_populates="shared_tasks")
+    # Etiquetas normalizadas (usadas para filtrar y listar)
+    tag_items = relationship("Tag", secondary=task_tags, back_populates="tasks")
+
+class Tag(Base):
+    __tablename__ = "tags"
+
+    id = Column(Integer, primary_key=True, index=True)
+    # Colación binaria en MySQL: las etiquetas distinguen mayúsculas igual que en SQLite
+    name = Column(
+        String(255).with_variant(String(255, collation="utf8mb4_bin"), "mysql"),
+        unique=True, index=True, nullable=False
+    )
+
+    tasks = relationship("Task", secondary=task_tags, back_populates="tag_items")
+
+class TaskTombstone(Base):
+    """Registro de una tarea que dejó de ser visible para un usuario (sincronización delta)"""
+    __tablename__ = "task_tombstones"
+    __table_args__ = (
+        Index('ix_task_tombstones_user_id_deleted_at', 'user_id', 'deleted_at'),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    task_id = Column(Integer, nullable=False)  # Sin clave foránea: la tarea puede no existir
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    reason = Column(String(20), nullable=False)  # "deleted" o "unshared"
+    deleted_at = Column(DateTime, default=func.now(), nullable=False, index=True)
+
+class TaskAccess(Base):
+    """Tareas visibles para cada usuario (propias y compartidas).
+
+    Se mantiene en la misma transacción que task_shared_with (ver crud.grant_access)
+    para que el listado sea un join por clave primaria en lugar de un OR.
+    """
+    __tablename__ = "task_access"
+    __table_args__ = (
+        Index('ix_task_access_task_id', 'task_id'),
+    )
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    task_id = Column(Integer, ForeignKey("tasks.id", ondelete="CASCADE"), primary_key=True)
+    role = Column(String(10), nullable=False)  # "owner" o "shared"
+
+class NotificationOutbox(Base):
+    """Avisos pendientes de entregar (recordatorios disparados por app/reminders.py).
+
+    Los consumidores leen las filas sin delivered_at y las marcan al entregarlas.
+    """
+    __tablename__ = "notification_outbox"
+    __table_args__ = (
+        # Un aviso por recordatorio aunque lo disparen varios procesos
+        UniqueConstraint('task_id', 'remind_at', name='uq_notification_outbox_task_id_remind_at'),
+        Index('ix_notification_outbox_user_id_delivered_at', 'user_id', 'delivered_at'),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    task_id = Column(Integer, nullable=False)  # Sin clave foránea: el aviso sobrevive a la tarea
+    kind = Column(String(20), nullable=False)  # "reminder"
+    title = Column(String(255), nullable=False)
+    remind_at = Column(DateTime, nullable=False)
+    fired_at = Column(DateTime, default=func.now(), nullable=False)
+    delivered_at = Column(DateTime, nullable=True)
+
+# Resumen por usuario mantenido de forma incremental con cada escritura (ver app/summary.py)
+class UserTaskSummary(Base):
+    __tablename__ = "user_task_summaries"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    total = Column(Integer, default=0, server_default="0", nullable=False)
+    completed = Column(Integer, default=0, server_default="0", nullable=False)
+
+class UserCategoryCount(Base):
+    __tablename__ = "user_category_counts"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    category = Column(String(100), primary_key=True)
+    count = Column(Integer, default=0, server_default="0", nullable=False)
+
+class UserTagCount(Base):
+    __tablename__ = "user_tag_counts"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    tag_id = Column(Integer, ForeignKey("tags.id", ondelete="CASCADE"), primary_key=True)
+    count = Column(Integer, default=0, server_default="0", nullable=False)
@@ -0,0 +1,195 @@
+"""Configuración del pool de conexiones y estadísticas en vivo.
+
+El tamaño, el desbordamiento, el reciclado, el tiempo de espera y la estrategia de
+pre-ping se leen del entorno (ver README). Las estadísticas se recogen con los
+eventos del pool (connect, checkout, checkin, invalidate) y, para la espera al pedir
+una conexión, con una subclase del QueuePool que cronometra las peticiones que llegan
+sin conexiones libres.
+
+Estrategias de pre-ping (DB_POOL_PRE_PING):
+- always: SELECT 1 en cada checkout (pool_pre_ping de SQLAlchemy)
+- idle: solo si la conexión lleva más de DB_POOL_PING_IDLE_SECONDS sin usarse
+- never: sin comprobación (conviene fijar DB_POOL_RECYCLE por debajo del
+  wait_timeout del servidor)
+"""
+from typing import Dict, Optional
+import os
+import threading
+import time
+from sqlalchemy import event, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "-1"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "always").lower()
+DB_POOL_PING_IDLE_SECONDS = float(os.getenv("DB_POOL_PING_IDLE_SECONDS", "30"))
+
+PRE_PING_STRATEGIES = ("always", "idle", "never")
+if DB_POOL_PRE_PING not in PRE_PING_STRATEGIES:
+    raise ValueError(f"DB_POOL_PRE_PING must be one of {', '.join(PRE_PING_STRATEGIES)}")
+
+class PoolStats:
+    """Contadores de un pool, actualizados desde sus eventos"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.engine = None
+        # Valor pasado a create_engine (None si el pool no es un QueuePool)
+        self.max_overflow = None
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.invalidations = 0
+        self.ping_failures = 0
+        self.timeouts = 0
+        self.waits = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.peak_checked_out = 0
+        self._lock = threading.Lock()
+
+    def record_wait(self, seconds: float):
+        with self._lock:
+            self.waits += 1
+            self.wait_seconds_total += seconds
+            if seconds > self.wait_seconds_max:
+                self.wait_seconds_max = seconds
+
+    def record_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def snapshot(self) -> dict:
+        """Estado actual del pool y contadores acumulados"""
+        pool = self.engine.pool if self.engine is not None else None
+        with self._lock:
+            result = {
+                "pool": type(pool).__name__ if pool is not None else None,
+                "connects": self.connects,
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "invalidations": self.invalidations,
+                "ping_failures": self.ping_failures,
+                "timeouts": self.timeouts,
+                "waits": self.waits,
+                "wait_seconds_total": round(self.wait_seconds_total, 6),
+                "wait_seconds_max": round(self.wait_seconds_max, 6),
+                "wait_seconds_avg": round(self.wait_seconds_total / self.waits, 6) if self.waits else 0.0,
+                "peak_checked_out": self.peak_checked_out,
+            }
+        if isinstance(pool, QueuePool):
+            result.update(
+                size=pool.size(),
+                max_overflow=self.max_overflow,
+                checked_out=pool.checkedout(),
+                checked_in=pool.checkedin(),
+                overflow=max(pool.overflow(), 0),
+            )
+        return result
+
+# Estadísticas por engine ("primary", "async", ...)
+pool_stats: Dict[str, PoolStats] = {}
+
+def _timed_pool_class(base, stats: PoolStats):
+    """Subclase del pool que mide cuánto tarda cada petición de conexión que llega sin
+    conexiones libres (espera en la cola o apertura de una conexión de desbordamiento).
+    Las que toman una conexión libre no cuentan como espera."""
+
+    def _do_get(self):
+        waited = self.checkedin() == 0
+        start = time.perf_counter()
+        try:
+            return base._do_get(self)
+        except exc.TimeoutError:
+            stats.record_timeout()
+            raise
+        finally:
+            if waited:
+                stats.record_wait(time.perf_counter() - start)
+
+    return type(f"Timed{base.__name__}", (base,), {"_do_get": _do_get})
+
+def engine_options(url: str, name: str) -> dict:
+    """Argumentos de create_engine según la configuración del entorno.
+
+    El tamaño del pool solo se aplica a los dialectos que usan un QueuePool (MySQL,
+    SQLite en fichero); SQLite en memoria y aiosqlite mantienen su pool por defecto.
+    """
+    stats = pool_stats.setdefault(name, PoolStats(name))
+    options = {"pool_pre_ping": DB_POOL_PRE_PING == "always"}
+    parsed = make_url(url)
+    pool_class = parsed.get_dialect().get_pool_class(parsed)
+    if issubclass(pool_class, QueuePool):
+        options.update(
+            poolclass=_timed_pool_class(pool_class, stats),
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+        )
+        stats.max_overflow = options["max_overflow"]
+    return options
+
+def _ping(dbapi_connection) -> bool:
+    """SELECT 1 sobre la conexión DBAPI; False si está caída"""
+    try:
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute("SELECT 1")
+        finally:
+            cursor.close()
+        return True
+    except Exception:
+        return False
+
+def instrument_engine(engine, name: str) -> PoolStats:
+    """Registra los eventos de estadísticas (y el pre-ping por inactividad) en el pool"""
+    sync_engine = getattr(engine, "sync_engine", engine)
+    stats = pool_stats.setdefault(name, PoolStats(name))
+    stats.engine = sync_engine
+
+    @event.listens_for(sync_engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        with stats._lock:
+            stats.connects += 1
+
+    @event.listens_for(sync_engine, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        if DB_POOL_PRE_PING == "idle":
+            checked_in_at = connection_record.info.get("checked_in_at")
+            if (checked_in_at is not None
+                    and time.monotonic() - checked_in_at > DB_POOL_PING_IDLE_SECONDS
+                    and not _ping(dbapi_connection)):
+                with stats._lock:
+                    stats.ping_failures += 1
+                # El pool descarta la conexión y lo reintenta con otra
+                raise exc.DisconnectionError()
+        pool = sync_engine.pool
+        with stats._lock:
+            stats.checkouts += 1
+            checked_out = pool.checkedout() if isinstance(pool, QueuePool) else stats.checkouts - stats.checkins
+            if checked_out > stats.peak_checked_out:
+                stats.peak_checked_out = checked_out
+
+    @event.listens_for(sync_engine, "checkin")
+    def _on_checkin(dbapi_connection, connection_record):
+        if connection_record is not None:
+            connection_record.info["checked_in_at"] = time.monotonic()
+        with stats._lock:
+            stats.checkins += 1
+
+    @event.listens_for(sync_engine, "invalidate")
+    def _on_invalidate(dbapi_connection, connection_record, exception):
+        with stats._lock:
+            stats.invalidations += 1
+
+    return stats
+
+def get_pool_stats(name: Optional[str] = None) -> dict:
+    """Estadísticas de todos los pools (o de uno)"""
+    if name is not None:
+        return pool_stats[name].snapshot()
+    return {pool_name: stats.snapshot() for pool_name, stats in pool_stats.items()}
@@ -0,0 +1,49 @@
+"""Contador de consultas SQL.
+
+Permite comprobar el número de consultas que ejecuta un endpoint o una función
+para detectar problemas N+1:
+
+    with assert_max_queries(3):
+        client.get("/tasks", headers=headers)
+"""
+from contextlib import contextmanager
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+class QueryCounter:
+    """Registra las sentencias SQL ejecutadas mientras está activo.
+
+    Sin engine cuenta en todos (primaria, engine asíncrono y réplicas de lectura),
+    así el número no depende de a qué BD vaya cada sesión.
+    """
+
+    def __init__(self, engine=None):
+        # Con un AsyncEngine se escucha su engine síncrono subyacente
+        self.engine = getattr(engine, "sync_engine", engine) or Engine
+        self.statements = []
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self._before_cursor_execute)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        event.remove(self.engine, "before_cursor_execute", self._before_cursor_execute)
+        return False
+
+@contextmanager
+def assert_max_queries(max_queries: int, engine=None):
+    """Falla con AssertionError si el bloque ejecuta más de `max_queries` consultas"""
+    with QueryCounter(engine) as counter:
+        yield counter
+    if counter.count > max_queries:
+        statements = "\n".join(f"  {i + 1}. {sql}" for i, sql in enumerate(counter.statements))
+        raise AssertionError(
+            f"Se esperaban como máximo {max_queries} consultas, se ejecutaron {counter.count}:\n{statements}"
+        )
@@ -0,0 +1,307 @@
+"""Programador de recordatorios en proceso (tasks.reminder_date).
+
+Solo se mantienen en memoria los recordatorios de la próxima ventana
+(REMINDER_WINDOW_SECONDS), cargados en bloques por el índice de reminder_date, en un
+montículo ordenado por fecha. Las escrituras de crud.py registran el cambio en la
+sesión (track) y se aplican al montículo tras el commit, sin volver a consultar.
+
+Al vencer, cada recordatorio se escribe en notification_outbox con un INSERT ...
+SELECT que vuelve a comprobar la tarea en la BD (sigue pendiente y con esa fecha),
+así las entradas obsoletas del montículo no generan avisos. La clave única
+(task_id, remind_at) evita duplicados si hay varios procesos o tras un reinicio.
+Tras un reinicio se recuperan los recordatorios vencidos de los últimos
+REMINDER_CATCHUP_SECONDS.
+"""
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Callable, List, Optional, Tuple
+import heapq
+import logging
+import os
+import threading
+from sqlalchemy import DateTime, String, and_, event, literal, or_, select
+from sqlalchemy.orm import Session
+from app import metrics, models
+
+logger = logging.getLogger(__name__)
+
+REMINDERS_ENABLED = os.getenv("REMINDERS_ENABLED", "true").lower() in ("1", "true", "yes")
+REMINDER_WINDOW_SECONDS = int(os.getenv("REMINDER_WINDOW_SECONDS", "300"))
+REMINDER_BATCH_SIZE = int(os.getenv("REMINDER_BATCH_SIZE", "1000"))
+REMINDER_CATCHUP_SECONDS = int(os.getenv("REMINDER_CATCHUP_SECONDS", "3600"))
+# Espera antes de reintentar si la BD falla
+REMINDER_RETRY_SECONDS = 5
+
+_CHANGES_KEY = "reminder_changes"
+_SAVEPOINTS_KEY = "reminder_savepoints"
+
+def track(db: Session, task_id: int, remind_at: Optional[datetime]):
+    """Registra en la sesión el recordatorio vigente de la tarea (None si ya no tiene).
+
+    `remind_at` es el valor guardado en la BD (UTC sin zona, ver schemas.naive_utc).
+    Se entrega al programador cuando la sesión hace commit; los registrados dentro
+    de un savepoint que se deshace se descartan.
+    """
+    db.info.setdefault(_CHANGES_KEY, []).append((task_id, remind_at))
+
+def track_task(db: Session, task: models.Task):
+    """Como track, a partir del estado de la tarea (las completadas no avisan)"""
+    track(db, task.id, None if task.completed else task.reminder_date)
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session):
+    session.info.pop(_SAVEPOINTS_KEY, None)
+    changes = session.info.pop(_CHANGES_KEY, None)
+    if changes and scheduler is not None:
+        scheduler.notify(changes)
+
+@event.listens_for(Session, "after_rollback")
+def _after_rollback(session):
+    session.info.pop(_CHANGES_KEY, None)
+    session.info.pop(_SAVEPOINTS_KEY, None)
+
+@event.listens_for(Session, "after_transaction_create")
+def _after_transaction_create(session, transaction):
+    if transaction.nested:
+        session.info.setdefault(_SAVEPOINTS_KEY, {})[id(transaction)] = len(session.info.get(_CHANGES_KEY, ()))
+
+@event.listens_for(Session, "after_soft_rollback")
+def _after_soft_rollback(session, previous_transaction):
+    # Operación de un lote deshecha (savepoint): sus cambios no llegan al programador
+    if previous_transaction.nested:
+        mark = session.info.get(_SAVEPOINTS_KEY, {}).pop(id(previous_transaction), None)
+        if mark is not None and _CHANGES_KEY in session.info:
+            del session.info[_CHANGES_KEY][mark:]
+
+def _insert_ignore(db: Session, table):
+    """INSERT que ignora las filas que ya existen (clave única)"""
+    dialect = db.get_bind().dialect.name
+    if dialect == "mysql":
+        from sqlalchemy.dialects.mysql import insert as dialect_insert
+        return dialect_insert(table).prefix_with("IGNORE")
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    return dialect_insert(table)
+
+class ReminderScheduler:
+    """Montículo (remind_at, task_id) con los recordatorios de la ventana cargada.
+
+    `_scheduled` guarda el recordatorio vigente de cada tarea: los cambios no borran
+    del montículo, las entradas que ya no coinciden se descartan al salir.
+    """
+
+    def __init__(self, session_factory: Callable[[], Session],
+                 window_seconds: int = REMINDER_WINDOW_SECONDS,
+                 batch_size: int = REMINDER_BATCH_SIZE,
+                 catchup_seconds: int = REMINDER_CATCHUP_SECONDS,
+                 clock: Callable[[], datetime] = datetime.utcnow):
+        self.session_factory = session_factory
+        self.window = timedelta(seconds=window_seconds)
+        self.batch_size = batch_size
+        self.catchup = timedelta(seconds=catchup_seconds)
+        self.clock = clock
+        self.stats = Counter()
+        self._heap: List[Tuple[datetime, int]] = []
+        self._scheduled = {}
+        # Los recordatorios hasta esta fecha ya están en memoria
+        self._loaded_until: Optional[datetime] = None
+        # Tareas cambiadas mientras se carga una ventana (su fila puede estar obsoleta)
+        self._touched: Optional[set] = None
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __len__(self) -> int:
+        return len(self._scheduled)
+
+    def notify(self, changes: List[Tuple[int, Optional[datetime]]]):
+        """Aplica los cambios confirmados de las tareas [(task_id, remind_at o None)]"""
+        wake = False
+        with self._lock:
+            for task_id, remind_at in changes:
+                self.stats["notified"] += 1
+                if self._touched is not None:
+                    self._touched.add(task_id)
+                # Los posteriores a la ventana se cargarán con ella
+                if remind_at is None or self._loaded_until is None or remind_at > self._loaded_until:
+                    self._scheduled.pop(task_id, None)
+                    continue
+                if self._scheduled.get(task_id) == remind_at:
+                    continue
+                self._scheduled[task_id] = remind_at
+                heapq.heappush(self._heap, (remind_at, task_id))
+                wake = wake or self._heap[0] == (remind_at, task_id)
+            # Compacta el montículo si acumula muchas entradas obsoletas
+            if len(self._heap) > 2 * len(self._scheduled) + 1024:
+                self._heap = [(remind_at, task_id) for task_id, remind_at in self._scheduled.items()]
+                heapq.heapify(self._heap)
+        if wake:
+            self._wakeup.set()
+
+    def _load(self, db: Session, start: datetime, until: datetime) -> int:
+        """Carga los recordatorios pendientes en (start, until] por bloques, por el índice"""
+        with self._lock:
+            self._loaded_until = until
+            self._touched = set()
+        task = models.Task
+        loaded = 0
+        last = None
+        try:
+            while True:
+                stmt = select(task.id, task.reminder_date).where(
+                    task.reminder_date <= until,
+                    task.completed == False,  # noqa: E712
+                )
+                if last is None:
+                    stmt = stmt.where(task.reminder_date > start)
+                else:
+                    # Paginación por clave (reminder_date, id) dentro del rango del índice
+                    stmt = stmt.where(task.reminder_date >= last[0], or_(
+                        task.reminder_date > last[0], and_(task.reminder_date == last[0], task.id > last[1])
+                    ))
+                rows = db.execute(
+                    stmt.order_by(task.reminder_date, task.id).limit(self.batch_size)
+                ).all()
+                with self._lock:
+                    for task_id, remind_at in rows:
+                        if task_id in self._touched:
+                            continue
+                        self._scheduled[task_id] = remind_at
+                        heapq.heappush(self._heap, (remind_at, task_id))
+                loaded += len(rows)
+                if len(rows) < self.batch_size:
+                    break
+                last = (rows[-1][1], rows[-1][0])
+        finally:
+            with self._lock:
+                self._touched = None
+            db.rollback()  # Termina la transacción de lectura
+        self.stats["loaded"] += loaded
+        self.stats["windows"] += 1
+        return loaded
+
+    def _pop_due(self, now: datetime) -> List[Tuple[int, datetime]]:
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                remind_at, task_id = heapq.heappop(self._heap)
+                if self._scheduled.get(task_id) == remind_at:
+                    del self._scheduled[task_id]
+                    due.append((task_id, remind_at))
+        return due
+
+    def _requeue(self, due: List[Tuple[int, datetime]]):
+        with self._lock:
+            for task_id, remind_at in due:
+                if task_id not in self._scheduled:
+                    self._scheduled[task_id] = remind_at
+                    heapq.heappush(self._heap, (remind_at, task_id))
+
+    def _fire(self, db: Session, due: List[Tuple[int, datetime]], now: datetime) -> int:
+        """Escribe en el outbox los recordatorios que siguen vigentes en la BD"""
+        task = models.Task
+        outbox = models.NotificationOutbox.__table__
+        fired = 0
+        for start in range(0, len(due), self.batch_size):
+            task_ids = [task_id for task_id, _ in due[start:start + self.batch_size]]
+            stmt = _insert_ignore(db, outbox).from_select(
+                ["user_id", "task_id", "kind", "title", "remind_at", "fired_at"],
+                select(
+                    task.owner_id, task.id, literal("reminder", String), task.title,
+                    task.reminder_date, literal(now, DateTime)
+                ).where(
+                    task.id.in_(task_ids),
+                    task.completed == False,  # noqa: E712
+                    task.reminder_date <= now,
+                    task.reminder_date > now - self.catchup,
+                )
+            )
+            if db.get_bind().dialect.name != "mysql":
+                stmt = stmt.on_conflict_do_nothing()
+            fired += db.execute(stmt).rowcount
+        db.commit()
+        for _, remind_at in due:
+            metrics.reminder_lag_seconds.observe((), max((now - remind_at).total_seconds(), 0))
+        metrics.reminders_fired_total.inc(amount=fired)
+        self.stats["due"] += len(due)
+        self.stats["fired"] += fired
+        return fired
+
+    def run_pending(self, now: Optional[datetime] = None) -> int:
+        """Carga la siguiente ventana si hace falta y dispara lo vencido.
+
+        Devuelve el número de avisos escritos en el outbox.
+        """
+        now = now or self.clock()
+        db = self.session_factory()
+        try:
+            if self._loaded_until is None:
+                self._load(db, now - self.catchup, now + self.window)
+            elif self._loaded_until - now < self.window / 2:
+                self._load(db, self._loaded_until, now + self.window)
+            due = self._pop_due(now)
+            if not due:
+                return 0
+            try:
+                return self._fire(db, due, now)
+            except Exception:
+                db.rollback()
+                self._requeue(due)
+                raise
+        finally:
+            db.close()
+
+    def seconds_until_next(self, now: Optional[datetime] = None) -> float:
+        """Espera hasta el próximo recordatorio o la próxima carga de ventana"""
+        now = now or self.clock()
+        wake_at = self._loaded_until - self.window / 2 if self._loaded_until else now
+        with self._lock:
+            if self._heap:
+                wake_at = min(wake_at, self._heap[0][0])
+        return min(max((wake_at - now).total_seconds(), 0), self.window.total_seconds() / 2)
+
+    def _run(self):
+        while not self._stop.is_set():
+            # Se limpia antes de trabajar para no perder avisos de notify
+            self._wakeup.clear()
+            try:
+                self.run_pending()
+                timeout = self.seconds_until_next()
+            except Exception:
+                logger.exception("Error en el programador de recordatorios")
+                timeout = REMINDER_RETRY_SECONDS
+            self._wakeup.wait(timeout)
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="reminder-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5):
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+# Programador del proceso (None si no se ha arrancado)
+scheduler: Optional[ReminderScheduler] = None
+
+def start_scheduler() -> Optional[ReminderScheduler]:
+    """Arranca el programador en un hilo de fondo (si REMINDERS_ENABLED)"""
+    global scheduler
+    if not REMINDERS_ENABLED or scheduler is not None:
+        return scheduler
+    from app.database import SessionLocal
+    scheduler = ReminderScheduler(SessionLocal)
+    scheduler.start()
+    return scheduler
+
+def stop_scheduler():
+    global scheduler
+    if scheduler is not None:
+        scheduler.stop()
+        scheduler = None
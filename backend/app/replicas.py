@@ -0,0 +1,222 @@
+"""Réplicas de lectura (DATABASE_REPLICA_URLS) y enrutado de sesiones.
+
+Las rutas de solo lectura (listados, categorías, etiquetas, resumen, exportaciones y
+directorio de usuarios) piden su sesión con get_read_db, que la abre contra una
+réplica sana (por turnos) o contra la primaria si no hay ninguna. Las escrituras
+siguen usando get_db.
+
+Para que cada usuario lea sus propias escrituras aunque la réplica vaya con retraso,
+crud.touch_users registra en la sesión los usuarios afectados y, tras el commit,
+quedan fijados a la primaria DB_REPLICA_PIN_SECONDS segundos (debe superar el
+retraso de replicación). Las fijaciones se guardan en memoria de cada proceso.
+
+Un hilo comprueba cada DB_REPLICA_CHECK_SECONDS que cada réplica responde; si una
+falla (también si una consulta pierde la conexión) deja de recibir lecturas hasta
+que vuelva a responder.
+"""
+from itertools import count
+from typing import Dict, Iterable, List, Optional
+import logging
+import os
+import threading
+import time
+from fastapi import Depends
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import Session
+from app import metrics
+from app.auth import CurrentUser, get_current_user, get_current_user_async
+from app.database import (
+    AsyncSessionLocal, DB_ASYNC, SessionLocal, to_async_url, track_queries
+)
+from app.pool import engine_options, instrument_engine
+
+logger = logging.getLogger(__name__)
+
+# URLs separadas por comas; vacío = todas las lecturas en la primaria
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+DB_REPLICA_CHECK_SECONDS = float(os.getenv("DB_REPLICA_CHECK_SECONDS", "5"))
+DB_REPLICA_PIN_SECONDS = float(os.getenv("DB_REPLICA_PIN_SECONDS", "5"))
+
+_PINS_KEY = "replica_pins"
+
+class Replica:
+    """Engine (y engine asíncrono con DB_ASYNC) de una réplica y su estado"""
+
+    def __init__(self, name: str, url: str):
+        self.name = name
+        self.engine = create_engine(url, **engine_options(url, name))
+        instrument_engine(self.engine, name)
+        self.async_engine = None
+        if DB_ASYNC:
+            from sqlalchemy.ext.asyncio import create_async_engine
+            async_url = to_async_url(url)
+            self.async_engine = create_async_engine(async_url, **engine_options(async_url, f"{name}_async"))
+            instrument_engine(self.async_engine, f"{name}_async")
+        if metrics.METRICS_ENABLED:
+            track_queries(self.engine)
+            if self.async_engine is not None:
+                track_queries(self.async_engine)
+        # Sin lecturas hasta que pase la primera comprobación
+        self.healthy = False
+        self.checked_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.failures = 0
+
+class ReplicaSet:
+    """Elige el engine de cada sesión de lectura y comprueba las réplicas"""
+
+    def __init__(self, urls: List[str], check_seconds: float = DB_REPLICA_CHECK_SECONDS,
+                 pin_seconds: float = DB_REPLICA_PIN_SECONDS):
+        self.replicas = [Replica(f"replica{index}", url) for index, url in enumerate(urls)]
+        self.check_seconds = check_seconds
+        self.pin_seconds = pin_seconds
+        self._pinned: Dict[int, float] = {}  # user_id -> fijado a la primaria hasta
+        self._pinned_limit = 1024
+        self._turn = count()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        for replica in self.replicas:
+            self._watch_errors(replica, replica.engine)
+            if replica.async_engine is not None:
+                self._watch_errors(replica, replica.async_engine.sync_engine)
+
+    def _watch_errors(self, replica: Replica, engine):
+        @event.listens_for(engine, "handle_error")
+        def _handle_error(exception_context):
+            # Conexión perdida o imposible de abrir: fuera hasta la próxima comprobación
+            if exception_context.is_disconnect or exception_context.connection is None:
+                self.mark_down(replica, exception_context.original_exception)
+
+    def pin(self, user_ids: Iterable[int]):
+        """Fija los usuarios a la primaria durante pin_seconds"""
+        if not self.replicas or self.pin_seconds <= 0:
+            return
+        until = time.monotonic() + self.pin_seconds
+        with self._lock:
+            for user_id in user_ids:
+                self._pinned[user_id] = until
+            if len(self._pinned) > self._pinned_limit:
+                # Se purgan las caducadas cuando el diccionario dobla su tamaño
+                now = time.monotonic()
+                self._pinned = {user_id: until for user_id, until in self._pinned.items() if until > now}
+                self._pinned_limit = max(1024, 2 * len(self._pinned))
+
+    def is_pinned(self, user_id: int) -> bool:
+        until = self._pinned.get(user_id)
+        return until is not None and until > time.monotonic()
+
+    def choose(self, user_id: Optional[int] = None) -> Optional[Replica]:
+        """Réplica para una lectura del usuario (None = primaria)"""
+        if not self.replicas:
+            return None
+        if user_id is not None and self.is_pinned(user_id):
+            metrics.db_read_sessions_total.inc(("pinned",))
+            return None
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        if not healthy:
+            metrics.db_read_sessions_total.inc(("primary",))
+            return None
+        metrics.db_read_sessions_total.inc(("replica",))
+        return healthy[next(self._turn) % len(healthy)]
+
+    def session(self, user_id: Optional[int] = None) -> Session:
+        replica = self.choose(user_id)
+        return SessionLocal() if replica is None else SessionLocal(bind=replica.engine)
+
+    def async_session(self, user_id: Optional[int] = None):
+        replica = self.choose(user_id)
+        return AsyncSessionLocal() if replica is None else AsyncSessionLocal(bind=replica.async_engine)
+
+    def mark_down(self, replica: Replica, error):
+        if replica.healthy:
+            logger.warning("Réplica %s fuera de servicio: %s", replica.name, error)
+        replica.healthy = False
+        replica.last_error = str(error)
+        self._wakeup.set()
+
+    def check(self):
+        """SELECT 1 en cada réplica; actualiza su estado"""
+        for replica in self.replicas:
+            try:
+                with replica.engine.connect() as conn:
+                    conn.execute(text("SELECT 1"))
+            except Exception as e:
+                replica.failures += 1
+                metrics.db_replica_check_failures_total.inc((replica.name,))
+                self.mark_down(replica, e)
+            else:
+                if not replica.healthy:
+                    logger.info("Réplica %s disponible", replica.name)
+                replica.healthy = True
+                replica.last_error = None
+            replica.checked_at = time.time()
+
+    def stats(self) -> dict:
+        return {
+            "pin_seconds": self.pin_seconds,
+            "pinned_users": sum(1 for until in list(self._pinned.values()) if until > time.monotonic()),
+            "replicas": [
+                {
+                    "name": replica.name,
+                    "healthy": replica.healthy,
+                    "checked_at": replica.checked_at,
+                    "failures": replica.failures,
+                    "last_error": replica.last_error,
+                }
+                for replica in self.replicas
+            ],
+        }
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wakeup.clear()
+            self.check()
+            self._wakeup.wait(self.check_seconds)
+
+    def start(self):
+        """Arranca el hilo de comprobaciones (si hay réplicas)"""
+        if not self.replicas or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="replica-checks", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5):
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+replica_set = ReplicaSet(DATABASE_REPLICA_URLS)
+
+def track_writes(db: Session, user_ids: Iterable[int]):
+    """Registra en la sesión los usuarios afectados; se fijan a la primaria tras el commit"""
+    if replica_set.replicas:
+        db.info.setdefault(_PINS_KEY, set()).update(user_ids)
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session):
+    user_ids = session.info.pop(_PINS_KEY, None)
+    if user_ids:
+        replica_set.pin(user_ids)
+
+@event.listens_for(Session, "after_rollback")
+def _after_rollback(session):
+    session.info.pop(_PINS_KEY, None)
+
+def get_read_db(current_user: CurrentUser = Depends(get_current_user)):
+    """Dependencia para las rutas de solo lectura: sesión en una réplica sana, o en
+    la primaria si el usuario acaba de escribir o no hay réplicas disponibles"""
+    db = replica_set.session(current_user.id)
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def get_async_read_db(current_user: CurrentUser = Depends(get_current_user_async)):
+    """Como get_read_db, con la sesión asíncrona"""
+    async with replica_set.async_session(current_user.id) as db:
+        yield db
@@ -1,39 +1,60 @@
 from datetime import timedelta
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
-from app import schemas, crud, models
+from starlette.concurrency import run_in_threadpool
+from app import schemas, crud
 from app.database import get_db
 from app.auth import (
-    authenticate_user,
+    authenticate_user_async,
     create_access_token,
+    get_password_hash_async,
+    HashingOverloaded,
     ACCESS_TOKEN_EXPIRE_MINUTES,
+    CurrentUser,
     get_current_user
 )
+from app.replicas import get_read_db
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
+def _overloaded_exception():
+    """Respuesta cuando el pool de hashing está saturado"""
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many authentication requests, try again later",
+        headers={"Retry-After": "1"},
+    )
+
 @router.post("/register", response_model=schemas.UserResponse, status_code=status.HTTP_201_CREATED)
-def register(user: schemas.UserCreate, db: Session = Depends(get_db)):
+async def register(user: schemas.UserCreate, db: Session = Depends(get_db)):
     """Endpoint para registrar un nuevo usuario"""
     # Verificar si el usuario ya existe
-    db_user = crud.get_user_by_email(db, email=user.email)
+    db_user = await run_in_threadpool(crud.get_user_by_email, db, user.email)
     if db_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
         )
+    # El hash se calcula en el pool de hashing, fuera de los hilos de peticiones
+    try:
+        hashed_password = await get_password_hash_async(user.password)
+    except HashingOverloaded:
+        raise _overloaded_exception()
     # Crear el usuario
-    return crud.create_user(db=db, user=user)
+    return await run_in_threadpool(crud.create_user, db, user, hashed_password)
 
 @router.post("/login", response_model=schemas.Token)
-def login(
+async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
     db: Session = Depends(get_db)
 ):
     """Endpoint para iniciar sesión"""
-    user = authenticate_user(db, form_data.username, form_data.password)
+    try:
+        user = await authenticate_user_async(db, form_data.username, form_data.password)
+    except HashingOverloaded:
+        raise _overloaded_exception()
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -46,13 +67,21 @@ def login(
     )
     return {"access_token": access_token, "token_type": "bearer"}
 
-@router.get("/users", response_model=List[schemas.UserResponse])
+@router.get("/users", response_model=schemas.UserPage)
 def get_users(
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    q: str = Query("", max_length=255, description="Prefijo del email"),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_read_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
-    """Obtiene la lista de usuarios (para compartir tareas)"""
-    from sqlalchemy.orm import Session
-    from app import models
-    users = db.query(models.User).all()
-    return [{"id": u.id, "email": u.email} for u in users if u.id != current_user.id]
+    """Busca usuarios por prefijo del email (para compartir tareas), por páginas.
+    
+    La respuesta es {"users": [...], "next_cursor": ...}; next_cursor se pasa en
+    `cursor` para pedir la página siguiente.
+    """
+    try:
+        users, next_cursor = crud.search_users(db, current_user.id, q.strip(), limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return {"users": users, "next_cursor": next_cursor}
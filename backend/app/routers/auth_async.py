@@ -0,0 +1,76 @@
+from datetime import timedelta
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy.ext.asyncio import AsyncSession
+from app import schemas, crud_async
+from app.database import get_async_db
+from app.auth import (
+    create_access_token,
+    get_password_hash_async,
+    verify_password_async,
+    HashingOverloaded,
+    ACCESS_TOKEN_EXPIRE_MINUTES,
+    CurrentUser,
+    get_current_user_async
+)
+from app.replicas import get_async_read_db
+from app.routers.auth import _overloaded_exception
+
+# Versión asíncrona de app.routers.auth (se usa con DB_ASYNC=true)
+router = APIRouter(prefix="/auth", tags=["auth"])
+
+@router.post("/register", response_model=schemas.UserResponse, status_code=status.HTTP_201_CREATED)
+async def register(user: schemas.UserCreate, db: AsyncSession = Depends(get_async_db)):
+    """Endpoint para registrar un nuevo usuario"""
+    # Verificar si el usuario ya existe
+    db_user = await crud_async.get_user_by_email(db, email=user.email)
+    if db_user:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Email already registered"
+        )
+    try:
+        hashed_password = await get_password_hash_async(user.password)
+    except HashingOverloaded:
+        raise _overloaded_exception()
+    # Crear el usuario
+    return await crud_async.create_user(db, user, hashed_password)
+
+@router.post("/login", response_model=schemas.Token)
+async def login(
+    form_data: OAuth2PasswordRequestForm = Depends(),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Endpoint para iniciar sesión"""
+    user = await crud_async.get_user_by_email(db, email=form_data.username)
+    try:
+        valid = bool(user) and await verify_password_async(form_data.password, user.hashed_password)
+    except HashingOverloaded:
+        raise _overloaded_exception()
+    if not valid:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Incorrect email or password",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    access_token = create_access_token(
+        data={"sub": user.email}, expires_delta=access_token_expires
+    )
+    return {"access_token": access_token, "token_type": "bearer"}
+
+@router.get("/users", response_model=schemas.UserPage)
+async def get_users(
+    q: str = Query("", max_length=255, description="Prefijo del email"),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: CurrentUser = Depends(get_current_user_async)
+):
+    """Busca usuarios por prefijo del email (para compartir tareas), por páginas"""
+    try:
+        users, next_cursor = await crud_async.search_users(db, current_user.id, q.strip(), limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return {"users": users, "next_cursor": next_cursor}
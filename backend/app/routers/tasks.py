@@ -1,45 +1,156 @@
-from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from fastapi.responses import JSONResponse, Response
+from typing import Iterator, List, Optional, Literal
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
+from fastapi.responses import Response, StreamingResponse
 from sqlalchemy.orm import Session
 from datetime import datetime
-import json
 import csv
+import hashlib
+import time
+import zlib
+from anyio import from_thread
+from starlette.concurrency import run_in_threadpool
 from io import StringIO
-from app import schemas, crud, models
-from app.database import get_db
-from app.auth import get_current_user
+from app import schemas, crud, importer, models, serialization, stream
+from app.database import get_db, SessionLocal
+from app.auth import CurrentUser, get_current_user, oauth2_scheme
+from app.replicas import get_read_db
+from app.cache import result_cache, task_list_key
 
 router = APIRouter(prefix="/tasks", tags=["tasks"])
 
-def serialize_task_for_response(task: models.Task) -> dict:
-    """Serializa una tarea para la respuesta, incluyendo tags como lista"""
-    # Obtener tags como lista
-    tags_list = []
-    if task.tags:
-        tags_list = [tag.strip() for tag in task.tags.split(',') if tag.strip()]
+def serialize_task_for_response(task: models.Task, shared_with_user_ids: Optional[List[int]] = None) -> dict:
+    """Serializa una tarea para la respuesta, incluyendo tags como lista.
     
-    result = {
-        "id": task.id,
-        "title": task.title,
-        "description": task.description,
-        "completed": task.completed,
-        "category": task.category,
-        "tags": tags_list,
-        "due_date": task.due_date.isoformat() if task.due_date else None,
-        "reminder_date": task.reminder_date.isoformat() if task.reminder_date else None,
-        "owner_id": task.owner_id,
-        "created_at": task.created_at.isoformat() if task.created_at else None,
-        "updated_at": task.updated_at.isoformat() if task.updated_at else None,
-        "shared_with_user_ids": [u.id for u in task.shared_with_users] if task.shared_with_users else []
-    }
-    return result
+    Si se indican `shared_with_user_ids` no se accede a `task.shared_with_users`
+    (permite serializar filas de consultas que no son entidades ORM).
+    """
+    return serialization.task_to_dict(task, shared_with_user_ids)
+
+# Lecturas condicionales (ETag)
+def make_etag(request: Request, user_id: int, version: int) -> str:
+    """ETag fuerte a partir de la versión de datos del usuario y la URL consultada"""
+    query = "&".join(sorted(f"{k}={v}" for k, v in request.query_params.multi_items()))
+    digest = hashlib.sha1(f"{request.url.path}?{query}".encode()).hexdigest()[:16]
+    return f'"{user_id}-{version}-{digest}"'
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    """Indica si el If-None-Match de la petición coincide con el ETag"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [value.strip() for value in header.split(",")]
+    return "*" in candidates or etag in candidates
+
+def not_modified_response(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+
+def set_etag(response: Response, etag: str):
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
+
+# El cliente debe revalidar siempre con If-None-Match
+CACHE_CONTROL = "private, no-cache"
+
+def cached_json_response(content: bytes, etag: str) -> Response:
+    """Respuesta con un cuerpo JSON ya serializado (de la caché de resultados)"""
+    return Response(
+        content=content,
+        media_type="application/json",
+        headers={"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    )
+
+def store_json_response(cache_key: str, content: bytes, etag: str) -> Response:
+    """Guarda el cuerpo ya serializado en la caché de resultados y lo devuelve"""
+    result_cache.set(cache_key, content)
+    return cached_json_response(content, etag)
+
+# Exportación en streaming
+EXPORT_CHUNK_SIZE = 64 * 1024
+CSV_HEADERS = ['ID', 'Título', 'Descripción', 'Completada', 'Categoría', 'Etiquetas',
+               'Fecha Vencimiento', 'Fecha Recordatorio', 'Fecha Creación', 'Fecha Actualización']
+
+def _buffered(parts: Iterator) -> Iterator[bytes]:
+    """Agrupa fragmentos pequeños (str o bytes) en bloques de ~EXPORT_CHUNK_SIZE bytes"""
+    buffer = []
+    size = 0
+    for part in parts:
+        data = part if isinstance(part, bytes) else part.encode('utf-8')
+        buffer.append(data)
+        size += len(data)
+        if size >= EXPORT_CHUNK_SIZE:
+            yield b''.join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield b''.join(buffer)
+
+def _gzipped(chunks: Iterator[bytes]) -> Iterator[bytes]:
+    """Comprime los bloques al vuelo en formato gzip"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+def _export_json_parts(rows) -> Iterator[bytes]:
+    """Genera el mismo documento que json.dumps(tareas, indent=2), tarea a tarea"""
+    first = True
+    for task, shared_ids in rows:
+        item = serialization.dumps_indented(serialization.task_row(task, shared_ids))
+        yield (b'[\n  ' if first else b',\n  ') + item.replace(b'\n', b'\n  ')
+        first = False
+    yield b'[]' if first else b'\n]'
+
+def _export_ndjson_parts(rows) -> Iterator[bytes]:
+    """Genera una tarea JSON (compacto) por línea"""
+    for task, shared_ids in rows:
+        yield serialization.dumps(serialization.task_row(task, shared_ids)) + b'\n'
+
+def _format_csv_date(value: Optional[datetime]) -> str:
+    return value.strftime('%Y-%m-%d %H:%M:%S') if value else ''
+
+def _export_csv_parts(rows) -> Iterator[str]:
+    """Genera el CSV fila a fila"""
+    output = StringIO()
+    writer = csv.writer(output)
+    writer.writerow(CSV_HEADERS)
+    for task, _ in rows:
+        writer.writerow([
+            task.id,
+            task.title,
+            task.description or '',
+            'Sí' if task.completed else 'No',
+            task.category or '',
+            task.tags or '',
+            _format_csv_date(task.due_date),
+            _format_csv_date(task.reminder_date),
+            _format_csv_date(task.created_at),
+            _format_csv_date(task.updated_at)
+        ])
+        yield output.getvalue()
+        output.seek(0)
+        output.truncate(0)
+    yield output.getvalue()
+
+def _export_response(parts: Iterator[str], media_type: str, filename: str, gzip: bool) -> StreamingResponse:
+    """Respuesta en streaming, opcionalmente comprimida como archivo .gz"""
+    chunks = _buffered(parts)
+    if gzip:
+        chunks = _gzipped(chunks)
+        media_type = "application/gzip"
+        filename += ".gz"
+    return StreamingResponse(
+        chunks,
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
 
 @router.post("", status_code=status.HTTP_201_CREATED)
 def create_task(
     task: schemas.TaskCreate,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """Crea una nueva tarea"""
     db_task = crud.create_task(db=db, task=task, owner_id=current_user.id)
@@ -47,38 +158,212 @@ def create_task(
 
 @router.get("")
 def read_tasks(
-    skip: int = 0,
-    limit: int = 100,
+    request: Request,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=crud.TASK_PAGE_MAX_LIMIT),
     search: Optional[str] = None,
     category: Optional[str] = None,
     tags: Optional[str] = None,  # Coma separada
+    tags_match: Literal["any", "all"] = "any",
     completed: Optional[bool] = None,
     due_date_from: Optional[datetime] = None,
     due_date_to: Optional[datetime] = None,
     include_shared: bool = True,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    cursor: Optional[str] = None,
+    order_by: Optional[str] = None,
+    db: Session = Depends(get_read_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
-    """Obtiene todas las tareas del usuario actual con filtros opcionales"""
+    """Obtiene todas las tareas del usuario actual con filtros opcionales.
+    
+    Si se indica `cursor` u `order_by` (updated_at | due_date) se usa paginación
+    por cursor y la respuesta es {"tasks": [...], "next_cursor": ...}.
+    Responde 304 si el If-None-Match coincide con la versión actual.
+    """
+    # La versión se lee antes que los datos: si cambia entre medias, el ETag es el antiguo
+    version = crud.get_user_version(db, current_user.id)
+    etag = make_etag(request, current_user.id, version)
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
     filters = schemas.TaskFilter(
         search=search,
         category=category,
         tags=tags.split(',') if tags else None,
+        tags_match=tags_match,
         completed=completed,
         due_date_from=due_date_from,
         due_date_to=due_date_to,
         include_shared=include_shared
     )
-    tasks = crud.get_tasks(db, owner_id=current_user.id, skip=skip, limit=limit, filters=filters)
-    return [serialize_task_for_response(task) for task in tasks]
+    cache_key = task_list_key(
+        current_user.id, version, filters,
+        skip=skip, limit=limit, cursor=cursor, order_by=order_by
+    )
+    cached = result_cache.get(cache_key)
+    if cached is not None:
+        return cached_json_response(cached, etag)
+    if cursor is not None or order_by is not None:
+        try:
+            tasks, next_cursor = crud.get_tasks_page(
+                db, owner_id=current_user.id, limit=limit, filters=filters,
+                cursor=cursor, order_by=order_by or "updated_at"
+            )
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
+        body = serialization.dumps({
+            "tasks": [serialization.task_row(task) for task in tasks],
+            "next_cursor": next_cursor
+        })
+    else:
+        tasks = crud.get_tasks(db, owner_id=current_user.id, skip=skip, limit=limit, filters=filters)
+        body = serialization.encode_tasks(tasks)
+    return store_json_response(cache_key, body, etag)
+
+@router.post("/batch")
+def batch_tasks(
+    batch: schemas.TaskBatchRequest,
+    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """Aplica varias creaciones, actualizaciones y borrados en una sola petición.
+    
+    Devuelve un resultado por operación (en el mismo orden) con un código de estado
+    propio; un fallo en una operación no afecta al resto.
+    """
+    results, tasks = crud.apply_task_batch(db, user_id=current_user.id, operations=batch.operations)
+    for result in results:
+        task = tasks.get(result["task_id"]) if result["status"] in (200, 201) else None
+        result["task"] = serialize_task_for_response(task) if task is not None else None
+    return {"results": results}
+
+def _request_chunks(request: Request) -> Iterator[bytes]:
+    """Lee el cuerpo en bloques desde el hilo de una ruta síncrona, sin cargarlo entero"""
+    stream = request.stream().__aiter__()
+    while True:
+        try:
+            chunk = from_thread.run(stream.__anext__)
+        except StopAsyncIteration:
+            return
+        if chunk:
+            yield chunk
+
+@router.post("/import")
+def import_tasks(
+    request: Request,
+    format: Optional[Literal["json", "ndjson", "csv"]] = None,
+    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """Importa tareas desde el cuerpo de la petición (mismos formatos que las exportaciones).
+    
+    El formato se toma de `format` o del Content-Type (application/json,
+    application/x-ndjson, text/csv); admite Content-Encoding: gzip. Las filas inválidas
+    se omiten y se informan con su línea; el resto se inserta en una sola transacción.
+    """
+    import_format = importer.detect_format(format, request.headers.get("content-type"))
+    if import_format is None:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Unknown import format, use ?format=json|ndjson|csv"
+        )
+    chunks = _request_chunks(request)
+    if request.headers.get("content-encoding", "").lower() == "gzip":
+        chunks = importer.gunzip(chunks)
+    start = time.perf_counter()
+    try:
+        result = crud.import_tasks(db, owner_id=current_user.id, rows=importer.parse(import_format, chunks))
+    except importer.ImportFormatError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Nothing imported, {e}"
+        )
+    except zlib.error:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Nothing imported, invalid gzip body"
+        )
+    elapsed = time.perf_counter() - start
+    result["seconds"] = round(elapsed, 3)
+    result["rows_per_second"] = round(result["imported"] / elapsed, 1) if elapsed > 0 else 0.0
+    return result
+
+@router.get("/changes")
+def get_task_changes(
+    since: Optional[str] = None,
+    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """Devuelve los cambios desde un token de sincronización.
+    
+    `tasks` trae las tareas visibles creadas o modificadas y `deleted` las que dejaron
+    de ser visibles. Se debe guardar `sync_token` para la siguiente llamada. Sin
+    `since` se devuelven todas las tareas visibles.
+    """
+    try:
+        tasks, tombstones, sync_token = crud.get_changes(db, user_id=current_user.id, since=since)
+    except crud.SyncTokenExpired:
+        raise HTTPException(
+            status_code=status.HTTP_410_GONE,
+            detail="Sync token expired, a full sync is required"
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    return {
+        "tasks": [serialize_task_for_response(task) for task in tasks],
+        "deleted": [
+            {
+                "task_id": t.task_id,
+                "reason": t.reason,
+                "deleted_at": t.deleted_at.isoformat()
+            }
+            for t in tombstones
+        ],
+        "sync_token": sync_token,
+        "full": since is None
+    }
+
+def _stream_user_id(token: str) -> int:
+    # Sesión propia que se cierra enseguida: la del Depends(get_db) duraría toda la conexión
+    db = SessionLocal()
+    try:
+        return get_current_user(token, db).id
+    finally:
+        db.close()
+
+@router.get("/stream")
+async def stream_task_changes(token: str = Depends(oauth2_scheme)):
+    """Cambios de las tareas propias y compartidas en tiempo real (Server-Sent Events).
+    
+    Cada evento `data` es un JSON compacto: `upsert` con la tarea, `delete` con su id,
+    `resync` si hay que recargar la lista y `ready` al conectar (ver app/stream.py).
+    """
+    user_id = await run_in_threadpool(_stream_user_id, token)
+    subscription = stream.broker.subscribe(user_id)
+    return StreamingResponse(
+        stream.events(subscription),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 @router.get("/{task_id}")
 def read_task(
     task_id: int,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_read_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """Obtiene una tarea específica"""
+    etag = make_etag(request, current_user.id, crud.get_user_version(db, current_user.id))
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+    set_etag(response, etag)
     task = crud.get_task(db, task_id=task_id, user_id=current_user.id)
     if task is None:
         raise HTTPException(
@@ -92,7 +377,7 @@ def update_task(
     task_id: int,
     task_update: schemas.TaskUpdate,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """Actualiza una tarea"""
     task = crud.update_task(db, task_id=task_id, task_update=task_update, user_id=current_user.id)
@@ -107,7 +392,7 @@ def update_task(
 def delete_task(
     task_id: int,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """Elimina una tarea"""
     success = crud.delete_task(db, task_id=task_id, owner_id=current_user.id)
@@ -123,7 +408,7 @@ def share_task(
     task_id: int,
     share_request: schemas.ShareTaskRequest,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """Comparte una tarea con otros usuarios"""
     task = crud.share_task(db, task_id=task_id, owner_id=current_user.id, user_ids=share_request.user_ids)
@@ -136,68 +421,68 @@ def share_task(
 
 @router.get("/categories/list")
 def get_categories(
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_read_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """Obtiene todas las categorías del usuario"""
+    etag = make_etag(request, current_user.id, crud.get_user_version(db, current_user.id))
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+    set_etag(response, etag)
     categories = crud.get_categories(db, user_id=current_user.id)
     return {"categories": categories}
 
 @router.get("/tags/list")
 def get_tags(
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_read_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """Obtiene todas las etiquetas del usuario"""
+    etag = make_etag(request, current_user.id, crud.get_user_version(db, current_user.id))
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+    set_etag(response, etag)
     tags = crud.get_all_tags(db, user_id=current_user.id)
     return {"tags": tags}
 
+@router.get("/summary/stats")
+def get_summary(
+    db: Session = Depends(get_read_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """Obtiene los totales de tareas del usuario (total, completadas, pendientes y vencidas)"""
+    return crud.get_task_summary(db, user_id=current_user.id)
+
 @router.get("/export/json")
 def export_tasks_json(
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    gzip: bool = False,
+    db: Session = Depends(get_read_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """Exporta todas las tareas del usuario en formato JSON"""
-    tasks = crud.get_tasks(db, owner_id=current_user.id, skip=0, limit=10000)
-    tasks_data = [serialize_task_for_response(task) for task in tasks]
-    return Response(
-        content=json.dumps(tasks_data, indent=2, ensure_ascii=False),
-        media_type="application/json",
-        headers={"Content-Disposition": "attachment; filename=tareas.json"}
-    )
+    rows = crud.iter_tasks_for_export(db, owner_id=current_user.id)
+    return _export_response(_export_json_parts(rows), "application/json", "tareas.json", gzip)
+
+@router.get("/export/ndjson")
+def export_tasks_ndjson(
+    gzip: bool = False,
+    db: Session = Depends(get_read_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """Exporta todas las tareas del usuario en formato NDJSON (una tarea por línea)"""
+    rows = crud.iter_tasks_for_export(db, owner_id=current_user.id)
+    return _export_response(_export_ndjson_parts(rows), "application/x-ndjson", "tareas.ndjson", gzip)
 
 @router.get("/export/csv")
 def export_tasks_csv(
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    gzip: bool = False,
+    db: Session = Depends(get_read_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """Exporta todas las tareas del usuario en formato CSV"""
-    tasks = crud.get_tasks(db, owner_id=current_user.id, skip=0, limit=10000)
-    
-    output = StringIO()
-    writer = csv.writer(output)
-    
-    # Encabezados
-    writer.writerow(['ID', 'Título', 'Descripción', 'Completada', 'Categoría', 'Etiquetas', 
-                     'Fecha Vencimiento', 'Fecha Recordatorio', 'Fecha Creación', 'Fecha Actualización'])
-    
-    # Datos
-    for task in tasks:
-        writer.writerow([
-            task.id,
-            task.title,
-            task.description or '',
-            'Sí' if task.completed else 'No',
-            task.category or '',
-            task.tags or '',
-            task.due_date.strftime('%Y-%m-%d %H:%M:%S') if task.due_date else '',
-            task.reminder_date.strftime('%Y-%m-%d %H:%M:%S') if task.reminder_date else '',
-            task.created_at.strftime('%Y-%m-%d %H:%M:%S') if task.created_at else '',
-            task.updated_at.strftime('%Y-%m-%d %H:%M:%S') if task.updated_at else ''
-        ])
-    
-    return Response(
-        content=output.getvalue(),
-        media_type="text/csv",
-        headers={"Content-Disposition": "attachment; filename=tareas.csv"}
-    )
+    rows = crud.iter_tasks_for_export(db, owner_id=current_user.id)
+    return _export_response(_export_csv_parts(rows), "text/csv", "tareas.csv", gzip)
@@ -0,0 +1,198 @@
+from typing import Optional, Literal
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import datetime
+from app import schemas, crud, crud_async, serialization
+from app.database import get_async_db
+from app.auth import CurrentUser, get_current_user_async
+from app.replicas import get_async_read_db
+from app.routers.tasks import (
+    serialize_task_for_response,
+    make_etag,
+    is_not_modified,
+    not_modified_response,
+    set_etag,
+    cached_json_response,
+    store_json_response
+)
+from app.cache import result_cache, task_list_key
+
+# Versión asíncrona de app.routers.tasks (se usa con DB_ASYNC=true).
+# Los endpoints que no están aquí (exportaciones) los sigue atendiendo el router síncrono.
+router = APIRouter(prefix="/tasks", tags=["tasks"])
+
+@router.post("", status_code=status.HTTP_201_CREATED)
+async def create_task(
+    task: schemas.TaskCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user_async)
+):
+    """Crea una nueva tarea"""
+    db_task = await crud_async.create_task(db, task=task, owner_id=current_user.id)
+    return serialize_task_for_response(db_task)
+
+@router.get("")
+async def read_tasks(
+    request: Request,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=crud.TASK_PAGE_MAX_LIMIT),
+    search: Optional[str] = None,
+    category: Optional[str] = None,
+    tags: Optional[str] = None,  # Coma separada
+    tags_match: Literal["any", "all"] = "any",
+    completed: Optional[bool] = None,
+    due_date_from: Optional[datetime] = None,
+    due_date_to: Optional[datetime] = None,
+    include_shared: bool = True,
+    cursor: Optional[str] = None,
+    order_by: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: CurrentUser = Depends(get_current_user_async)
+):
+    """Obtiene todas las tareas del usuario actual con filtros opcionales"""
+    version = await crud_async.get_user_version(db, current_user.id)
+    etag = make_etag(request, current_user.id, version)
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+    filters = schemas.TaskFilter(
+        search=search,
+        category=category,
+        tags=tags.split(',') if tags else None,
+        tags_match=tags_match,
+        completed=completed,
+        due_date_from=due_date_from,
+        due_date_to=due_date_to,
+        include_shared=include_shared
+    )
+    cache_key = task_list_key(
+        current_user.id, version, filters,
+        skip=skip, limit=limit, cursor=cursor, order_by=order_by
+    )
+    cached = result_cache.get(cache_key)
+    if cached is not None:
+        return cached_json_response(cached, etag)
+    if cursor is not None or order_by is not None:
+        try:
+            tasks, next_cursor = await crud_async.get_tasks_page(
+                db, owner_id=current_user.id, limit=limit, filters=filters,
+                cursor=cursor, order_by=order_by or "updated_at"
+            )
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
+        body = serialization.dumps({
+            "tasks": [serialization.task_row(task) for task in tasks],
+            "next_cursor": next_cursor
+        })
+    else:
+        tasks = await crud_async.get_tasks(db, owner_id=current_user.id, skip=skip, limit=limit, filters=filters)
+        body = serialization.encode_tasks(tasks)
+    return store_json_response(cache_key, body, etag)
+
+@router.get("/{task_id}")
+async def read_task(
+    task_id: int,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: CurrentUser = Depends(get_current_user_async)
+):
+    """Obtiene una tarea específica"""
+    etag = make_etag(request, current_user.id, await crud_async.get_user_version(db, current_user.id))
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+    set_etag(response, etag)
+    task = await crud_async.get_task(db, task_id=task_id, user_id=current_user.id)
+    if task is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Task not found"
+        )
+    return serialize_task_for_response(task)
+
+@router.put("/{task_id}")
+async def update_task(
+    task_id: int,
+    task_update: schemas.TaskUpdate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user_async)
+):
+    """Actualiza una tarea"""
+    task = await crud_async.update_task(db, task_id=task_id, task_update=task_update, user_id=current_user.id)
+    if task is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Task not found"
+        )
+    return serialize_task_for_response(task)
+
+@router.delete("/{task_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_task(
+    task_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user_async)
+):
+    """Elimina una tarea"""
+    success = await crud_async.delete_task(db, task_id=task_id, owner_id=current_user.id)
+    if not success:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Task not found"
+        )
+    return None
+
+@router.post("/{task_id}/share", response_model=schemas.TaskResponse)
+async def share_task(
+    task_id: int,
+    share_request: schemas.ShareTaskRequest,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user_async)
+):
+    """Comparte una tarea con otros usuarios"""
+    task = await crud_async.share_task(db, task_id=task_id, owner_id=current_user.id, user_ids=share_request.user_ids)
+    if task is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Task not found"
+        )
+    return serialize_task_for_response(task)
+
+@router.get("/categories/list")
+async def get_categories(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: CurrentUser = Depends(get_current_user_async)
+):
+    """Obtiene todas las categorías del usuario"""
+    etag = make_etag(request, current_user.id, await crud_async.get_user_version(db, current_user.id))
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+    set_etag(response, etag)
+    categories = await crud_async.get_categories(db, user_id=current_user.id)
+    return {"categories": categories}
+
+@router.get("/tags/list")
+async def get_tags(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: CurrentUser = Depends(get_current_user_async)
+):
+    """Obtiene todas las etiquetas del usuario"""
+    etag = make_etag(request, current_user.id, await crud_async.get_user_version(db, current_user.id))
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+    set_etag(response, etag)
+    tags = await crud_async.get_all_tags(db, user_id=current_user.id)
+    return {"tags": tags}
+
+@router.get("/summary/stats")
+async def get_summary(
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: CurrentUser = Depends(get_current_user_async)
+):
+    """Obtiene los totales de tareas del usuario (total, completadas, pendientes y vencidas)"""
+    return await crud_async.get_task_summary(db, user_id=current_user.id)
@@ -1,20 +1,36 @@
-from pydantic import BaseModel, EmailStr
-from typing import Optional, List
-from datetime import datetime
+from pydantic import BaseModel, EmailStr, Field, field_validator
+from typing import Any, Dict, Optional, List, Literal
+from datetime import datetime, timezone
+
+def naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Fechas con zona horaria a UTC sin zona, como se guardan en la BD"""
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
 
 # Schemas para User
 class UserBase(BaseModel):
     email: EmailStr
 
+def lower_email(value: str) -> str:
+    """Los emails se guardan en minúsculas: búsqueda por prefijo y login sin distinguir mayúsculas"""
+    return value.lower()
+
 class UserCreate(UserBase):
     password: str
 
+    _email_lower = field_validator("email")(lower_email)
+
 class UserResponse(UserBase):
     id: int
 
     class Config:
         from_attributes = True
 
+class UserPage(BaseModel):
+    users: List[UserResponse]
+    next_cursor: Optional[str] = None
+
 # Schemas para Task
 class TaskBase(BaseModel):
     title: str
@@ -25,6 +41,9 @@ class TaskBase(BaseModel):
     due_date: Optional[datetime] = None
     reminder_date: Optional[datetime] = None
 
+    # El programador de recordatorios compara reminder_date con el reloj en UTC
+    _reminder_date_utc = field_validator("reminder_date")(naive_utc)
+
 class TaskCreate(TaskBase):
     shared_with_user_ids: Optional[List[int]] = None
 
@@ -38,6 +57,8 @@ class TaskUpdate(BaseModel):
     reminder_date: Optional[datetime] = None
     shared_with_user_ids: Optional[List[int]] = None
 
+    _reminder_date_utc = field_validator("reminder_date")(naive_utc)
+
 class TaskResponse(TaskBase):
     id: int
     owner_id: int
@@ -53,11 +74,24 @@ class TaskFilter(BaseModel):
     search: Optional[str] = None
     category: Optional[str] = None
     tags: Optional[List[str]] = None
+    tags_match: Literal["any", "all"] = "any"  # any: alguna etiqueta, all: todas
     completed: Optional[bool] = None
     due_date_from: Optional[datetime] = None
     due_date_to: Optional[datetime] = None
     include_shared: bool = True
 
+# Schemas para operaciones por lotes
+BATCH_MAX_OPERATIONS = 500
+
+class TaskBatchOperation(BaseModel):
+    op: Literal["create", "update", "delete"]
+    task_id: Optional[int] = None  # Obligatorio en update y delete
+    data: Optional[Dict[str, Any]] = None  # Campos de TaskCreate o TaskUpdate
+    client_id: Optional[str] = None  # Identificador del cliente, se devuelve en el resultado
+
+class TaskBatchRequest(BaseModel):
+    operations: List[TaskBatchOperation] = Field(..., max_length=BATCH_MAX_OPERATIONS)
+
 # Schema para compartir tarea
 class ShareTaskRequest(BaseModel):
     user_ids: List[int]
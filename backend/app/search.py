@@ -0,0 +1,169 @@
+"""Búsqueda de texto completo sobre el título y la descripción de las tareas.
+
+- MySQL: índice FULLTEXT (title, description) con MATCH ... AGAINST en modo booleano.
+  El índice está declarado en models.Task y lo crea la migración e7b87954e330
+- SQLite: tabla virtual FTS5 `tasks_fts` sincronizada con `tasks` mediante triggers,
+  con índices de prefijos de 2, 3 y 4 bytes y una tabla fts5vocab para expandir los
+  prefijos más largos a términos exactos
+- Otros motores (o términos que el índice no puede resolver): LIKE como respaldo
+
+En SQLite, las búsquedas sin orden por relevancia (páginas con cursor) comprueban el
+MATCH solo sobre las tareas candidatas del usuario (rowid = tasks.id), así que su
+coste depende de las tareas del usuario y no del total. Con orden por relevancia el
+MATCH se resuelve una vez sobre todas las tareas: bm25 necesita la frecuencia global
+de cada término, que FTS5 recalcula en cada cursor (uno por fila candidata si se
+comprobara fila a fila). En MySQL, InnoDB resuelve siempre MATCH sobre el índice
+entero antes de aplicar el filtro por propietario.
+"""
+import re
+import unicodedata
+from sqlalchemy import (
+    bindparam, column, exists, false, literal_column, or_, table, text, Integer, Float
+)
+from sqlalchemy.dialects.mysql import match
+from app import models
+
+FTS_TABLE = "tasks_fts"
+FTS_VOCAB_TABLE = "tasks_fts_vocab"
+fts_table = table(FTS_TABLE, column("rowid"))
+
+# Longitudes (en bytes) de los índices de prefijos de FTS5
+FTS_PREFIX_LENGTHS = (2, 3, 4)
+# Los prefijos de otras longitudes se expanden a lo sumo a este número de términos
+FTS_MAX_PREFIX_TERMS = 32
+
+# Longitud mínima de palabra indexada por InnoDB (innodb_ft_min_token_size)
+MYSQL_MIN_TOKEN_SIZE = 3
+
+SQLITE_FTS_DDL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        title, description,
+        content='tasks', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3 4'
+    )""",
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_VOCAB_TABLE} USING fts5vocab({FTS_TABLE}, 'row')",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON tasks BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON tasks BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF title, description ON tasks BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO {FTS_TABLE}(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END""",
+]
+
+def tokenize(term: str):
+    """Divide el término de búsqueda en palabras"""
+    return re.findall(r"\w+", term.lower())
+
+def _fold(token: str) -> str:
+    """Quita los diacríticos como el tokenizador de FTS5 (remove_diacritics 2)"""
+    return "".join(c for c in unicodedata.normalize("NFD", token) if not unicodedata.combining(c))
+
+def ensure_search_index(engine):
+    """Crea la tabla FTS5 y sus triggers en SQLite si todavía no existen.
+
+    Una tabla creada sin índices de prefijos se vuelve a crear con ellos. create_all
+    no crea tablas virtuales. En MySQL no hace nada: el índice FULLTEXT es DDL de
+    migración y no debe lanzarlo cada proceso al arrancar.
+    """
+    if engine.dialect.name == "sqlite":
+        with engine.begin() as conn:
+            existing = conn.execute(
+                text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                {"name": FTS_TABLE}
+            ).scalar()
+            if existing is not None and "prefix=" not in existing:
+                conn.execute(text(f"DROP TABLE {FTS_TABLE}"))
+                existing = None
+            for statement in SQLITE_FTS_DDL:
+                conn.execute(text(statement))
+            if existing is None:
+                # Indexar las tareas que ya existían
+                conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+
+def _sqlite_phrase(db, token: str):
+    """Frase FTS5 para un prefijo: "tok"* si lo cubre un índice de prefijos; si no,
+    los términos exactos que empiezan por él (de tasks_fts_vocab).
+
+    Devuelve (frase, barata fila a fila) o (None, True) si ningún término coincide.
+    """
+    token = _fold(token)
+    if len(token.encode()) in FTS_PREFIX_LENGTHS:
+        return f'"{token}"*', True
+    upper = token[:-1] + chr(ord(token[-1]) + 1)
+    terms = db.execute(
+        text(f"SELECT term FROM {FTS_VOCAB_TABLE} WHERE term >= :low AND term < :high LIMIT :limit"),
+        {"low": token, "high": upper, "limit": FTS_MAX_PREFIX_TERMS + 1}
+    ).scalars().all()
+    if not terms:
+        return None, True
+    if len(terms) > FTS_MAX_PREFIX_TERMS:
+        # Demasiados términos: FTS5 expande el prefijo (coste según el índice entero)
+        return f'"{token}"*', False
+    return "(" + " OR ".join(f'"{term}"' for term in terms) + ")", True
+
+def _like_search(query, term: str):
+    """Búsqueda con LIKE (sin índice)"""
+    search_term = f"%{term}%"
+    return query.filter(
+        or_(
+            models.Task.title.like(search_term),
+            models.Task.description.like(search_term)
+        )
+    )
+
+def apply_search(query, dialect: str, term: str, rank: bool = True):
+    """Aplica el filtro de búsqueda a una consulta de tareas.
+
+    Cada palabra del término se busca como prefijo y todas deben aparecer.
+    Si `rank` es True los resultados se ordenan por relevancia. En SQLite se consulta
+    tasks_fts_vocab con la sesión de `query`.
+    """
+    tokens = tokenize(term)
+    if not tokens:
+        return _like_search(query, term)
+
+    if dialect == "mysql":
+        if min(len(token) for token in tokens) < MYSQL_MIN_TOKEN_SIZE:
+            # InnoDB no indexa palabras tan cortas
+            return _like_search(query, term)
+        against = " ".join(f"+{token}*" for token in tokens)
+        relevance = match(
+            models.Task.title, models.Task.description, against=against
+        ).in_boolean_mode()
+        query = query.filter(relevance)
+        if rank:
+            query = query.order_by(relevance.desc(), models.Task.id)
+        return query
+
+    if dialect == "sqlite":
+        phrases = [_sqlite_phrase(query.session, token) for token in tokens]
+        if any(phrase is None for phrase, _ in phrases):
+            return query.filter(false())
+        fts_query = " AND ".join(phrase for phrase, _ in phrases)
+        if not rank and all(cheap for _, cheap in phrases):
+            # MATCH correlacionado por rowid: solo se comprueban las tareas candidatas
+            # del usuario (ya filtradas por propietario o task_access)
+            return query.filter(exists().where(
+                literal_column(FTS_TABLE).op("MATCH")(bindparam("fts_query", fts_query)),
+                fts_table.c.rowid == models.Task.id,
+            ))
+        matches = text(
+            f"SELECT rowid AS task_id, bm25({FTS_TABLE}) AS rank "
+            f"FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :fts_query"
+        ).bindparams(fts_query=fts_query).columns(task_id=Integer, rank=Float).subquery("fts")
+        query = query.join(matches, matches.c.task_id == models.Task.id)
+        if rank:
+            # bm25 devuelve valores menores para los resultados más relevantes
+            query = query.order_by(matches.c.rank, models.Task.id)
+        return query
+
+    return _like_search(query, term)
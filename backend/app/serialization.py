@@ -0,0 +1,112 @@
+"""Serialización JSON de las tareas.
+
+Por defecto se usa el módulo json de la librería estándar con los mismos
+parámetros que JSONResponse. Con FAST_JSON=1 se usa orjson, que genera
+exactamente los mismos bytes: mismas claves y orden, UTF-8 sin escapar y fechas en
+formato ISO (orjson las formatea igual que datetime.isoformat() para fechas sin
+zona horaria, que son las que devuelve la BD).
+
+Las filas se leen con un único attrgetter sobre las columnas necesarias, de modo
+que sirven igual entidades ORM que filas de consultas Core (exportación).
+"""
+from operator import attrgetter
+from typing import Iterable, List, Optional
+import json
+import os
+from fastapi.responses import JSONResponse
+
+FAST_JSON = os.getenv("FAST_JSON", "").lower() in ("1", "true", "yes")
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson es opcional
+    orjson = None
+
+if FAST_JSON and orjson is None:
+    raise RuntimeError("FAST_JSON requires the 'orjson' package")
+
+TASK_COLUMNS = ("id", "title", "description", "completed", "category", "tags",
+                "due_date", "reminder_date", "owner_id", "created_at", "updated_at")
+_task_values = attrgetter(*TASK_COLUMNS)
+
+def split_tags(tags: Optional[str]) -> List[str]:
+    """Convierte la copia separada por comas en una lista"""
+    if not tags:
+        return []
+    return [tag.strip() for tag in tags.split(',') if tag.strip()]
+
+def _shared_ids(task, shared_with_user_ids: Optional[List[int]]) -> List[int]:
+    if shared_with_user_ids is not None:
+        return shared_with_user_ids
+    return [u.id for u in task.shared_with_users] if task.shared_with_users else []
+
+def task_to_dict(task, shared_with_user_ids: Optional[List[int]] = None) -> dict:
+    """Tarea como dict con las fechas ya convertidas a texto ISO"""
+    (id_, title, description, completed, category, tags,
+     due_date, reminder_date, owner_id, created_at, updated_at) = _task_values(task)
+    return {
+        "id": id_,
+        "title": title,
+        "description": description,
+        "completed": completed,
+        "category": category,
+        "tags": split_tags(tags),
+        "due_date": due_date.isoformat() if due_date else None,
+        "reminder_date": reminder_date.isoformat() if reminder_date else None,
+        "owner_id": owner_id,
+        "created_at": created_at.isoformat() if created_at else None,
+        "updated_at": updated_at.isoformat() if updated_at else None,
+        "shared_with_user_ids": _shared_ids(task, shared_with_user_ids),
+    }
+
+def task_to_native(task, shared_with_user_ids: Optional[List[int]] = None) -> dict:
+    """Tarea como dict con las fechas como datetime (solo para orjson)"""
+    (id_, title, description, completed, category, tags,
+     due_date, reminder_date, owner_id, created_at, updated_at) = _task_values(task)
+    return {
+        "id": id_,
+        "title": title,
+        "description": description,
+        "completed": completed,
+        "category": category,
+        "tags": split_tags(tags),
+        "due_date": due_date or None,
+        "reminder_date": reminder_date or None,
+        "owner_id": owner_id,
+        "created_at": created_at or None,
+        "updated_at": updated_at or None,
+        "shared_with_user_ids": _shared_ids(task, shared_with_user_ids),
+    }
+
+def _std_dumps(content) -> bytes:
+    # Mismos parámetros que starlette.responses.JSONResponse.render
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None,
+                      separators=(",", ":")).encode("utf-8")
+
+def _std_dumps_indented(content) -> bytes:
+    return json.dumps(content, ensure_ascii=False, indent=2).encode("utf-8")
+
+def _orjson_dumps(content) -> bytes:
+    return orjson.dumps(content)
+
+def _orjson_dumps_indented(content) -> bytes:
+    return orjson.dumps(content, option=orjson.OPT_INDENT_2)
+
+if FAST_JSON:
+    task_row = task_to_native
+    dumps = _orjson_dumps
+    dumps_indented = _orjson_dumps_indented
+else:
+    task_row = task_to_dict
+    dumps = _std_dumps
+    dumps_indented = _std_dumps_indented
+
+def encode_tasks(tasks: Iterable) -> bytes:
+    """Lista de tareas (entidades ORM) serializada como JSON"""
+    return dumps([task_row(task) for task in tasks])
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse que serializa con el codificador configurado"""
+
+    def render(self, content) -> bytes:
+        return dumps(content)
@@ -0,0 +1,164 @@
+"""Flujo de cambios de tareas en tiempo real (GET /tasks/stream, Server-Sent Events).
+
+Las escrituras de crud.py registran en la sesión un evento por tarea cambiada con sus
+destinatarios (propietario y usuarios compartidos). Tras el commit, el evento se
+serializa una vez y se reparte en memoria a las conexiones abiertas de esos usuarios,
+así los clientes actualizan su estado sin volver a pedir la lista. Si una operación
+de un lote se deshace (savepoint), sus eventos se descartan.
+
+Eventos (campo `data`, JSON):
+- {"type": "upsert", "task": {...}}: tarea creada o modificada, como en GET /tasks
+- {"type": "delete", "id": N}: la tarea se ha borrado o ha dejado de ser visible
+- {"type": "resync"}: hay que recargar la lista (importación o cola desbordada)
+- {"type": "ready"}: al conectar; el cliente debe recargar si es una reconexión
+
+El reparto es por proceso: con varios workers cada conexión solo recibe los cambios
+hechos en su worker.
+"""
+from collections import defaultdict
+from typing import Dict, Iterable, List, Set
+import asyncio
+import os
+import threading
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from app import models, serialization
+
+STREAM_QUEUE_SIZE = int(os.getenv("STREAM_QUEUE_SIZE", "256"))
+STREAM_PING_SECONDS = float(os.getenv("STREAM_PING_SECONDS", "15"))
+
+_EVENTS_KEY = "stream_events"
+_SAVEPOINTS_KEY = "stream_savepoints"
+
+# Columnas que se serializan; si alguna está expirada tras el commit se pide recargar
+_REQUIRED_ATTRIBUTES = set(serialization.TASK_COLUMNS) | {"shared_with_users"}
+
+def _format(data: dict) -> bytes:
+    return b"data: " + serialization.dumps(data) + b"\n\n"
+
+READY = b"retry: 3000\n" + _format({"type": "ready"})
+RESYNC = _format({"type": "resync"})
+PING = b": ping\n\n"
+
+class Subscription:
+    """Conexión abierta de un usuario: cola acotada en el event loop del servidor"""
+
+    def __init__(self, user_id: int, queue_size: int):
+        self.user_id = user_id
+        self.loop = asyncio.get_running_loop()
+        self.queue: asyncio.Queue = asyncio.Queue(queue_size)
+
+    def _put(self, data: bytes):
+        try:
+            self.queue.put_nowait(data)
+        except asyncio.QueueFull:
+            # Cliente lento: se descartan los pendientes y se le pide recargar
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC)
+
+    def send(self, data: bytes):
+        """Encola desde cualquier hilo"""
+        self.loop.call_soon_threadsafe(self._put, data)
+
+class ChangeBroker:
+    """Conexiones abiertas por usuario y reparto de eventos"""
+
+    def __init__(self, queue_size: int = STREAM_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._subscriptions: Dict[int, Set[Subscription]] = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, user_id: int) -> Subscription:
+        """Abre una suscripción (desde el event loop)"""
+        subscription = Subscription(user_id, self.queue_size)
+        with self._lock:
+            self._subscriptions[user_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.user_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.user_id]
+
+    def publish(self, user_ids: Iterable[int], data: bytes):
+        with self._lock:
+            targets = [s for user_id in set(user_ids) for s in self._subscriptions.get(user_id, ())]
+        for subscription in targets:
+            subscription.send(data)
+
+    def connections(self) -> int:
+        with self._lock:
+            return sum(len(subscriptions) for subscriptions in self._subscriptions.values())
+
+broker = ChangeBroker()
+
+def _record(db: Session, item: tuple):
+    db.info.setdefault(_EVENTS_KEY, []).append(item)
+
+def task_changed(db: Session, task: models.Task, user_ids: List[int], removed_ids: List[int] = ()):
+    """Tarea creada o modificada: upsert a `user_ids` y delete a `removed_ids`"""
+    _record(db, ("upsert", task, list(user_ids)))
+    if removed_ids:
+        _record(db, ("delete", task.id, list(removed_ids)))
+
+def task_deleted(db: Session, task_id: int, user_ids: List[int]):
+    _record(db, ("delete", task_id, list(user_ids)))
+
+def resync(db: Session, user_ids: List[int]):
+    """Cambios en bloque (importación): los clientes recargan la lista"""
+    _record(db, ("resync", None, list(user_ids)))
+
+def _encode(kind: str, subject) -> bytes:
+    if kind == "resync":
+        return RESYNC
+    if kind == "delete":
+        return _format({"type": "delete", "id": subject})
+    if _REQUIRED_ATTRIBUTES & inspect(subject).unloaded:
+        # Sesión con expire_on_commit: no se puede leer sin otra consulta
+        return RESYNC
+    return _format({"type": "upsert", "task": serialization.task_to_dict(subject)})
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session):
+    session.info.pop(_SAVEPOINTS_KEY, None)
+    events = session.info.pop(_EVENTS_KEY, None)
+    if not events:
+        return
+    for kind, subject, user_ids in events:
+        broker.publish(user_ids, _encode(kind, subject))
+
+@event.listens_for(Session, "after_rollback")
+def _after_rollback(session):
+    session.info.pop(_EVENTS_KEY, None)
+    session.info.pop(_SAVEPOINTS_KEY, None)
+
+@event.listens_for(Session, "after_transaction_create")
+def _after_transaction_create(session, transaction):
+    if transaction.nested:
+        session.info.setdefault(_SAVEPOINTS_KEY, {})[id(transaction)] = len(session.info.get(_EVENTS_KEY, ()))
+
+@event.listens_for(Session, "after_soft_rollback")
+def _after_soft_rollback(session, previous_transaction):
+    if previous_transaction.nested:
+        mark = session.info.get(_SAVEPOINTS_KEY, {}).pop(id(previous_transaction), None)
+        if mark is not None and _EVENTS_KEY in session.info:
+            del session.info[_EVENTS_KEY][mark:]
+
+async def events(subscription: Subscription):
+    """Cuerpo de la respuesta SSE; cierra la suscripción al desconectarse el cliente"""
+    try:
+        yield READY
+        while True:
+            try:
+                data = await asyncio.wait_for(subscription.queue.get(), STREAM_PING_SECONDS)
+            except asyncio.TimeoutError:
+                # Mantiene viva la conexión en proxies y detecta clientes caídos
+                yield PING
+                continue
+            yield data
+    finally:
+        broker.unsubscribe(subscription)
@@ -0,0 +1,207 @@
+"""Resumen por usuario: número de tareas, completadas, y uso de categorías y etiquetas.
+
+Se mantiene de forma incremental en la misma transacción que cada escritura de
+tareas (ver los _apply_task_* de crud.py), así listar categorías o etiquetas es una
+lectura indexada por user_id. Si los contadores se desajustan (p. ej. por cambios
+hechos directamente en la BD), se reconstruyen con:
+
+    python -m app.summary rebuild [--user-id ID]
+"""
+from collections import Counter, namedtuple
+from datetime import datetime
+from typing import List, Optional
+import argparse
+from sqlalchemy import and_, case, delete, func, insert, or_, select
+from sqlalchemy.orm import Session
+from app import models
+
+TaskSnapshot = namedtuple("TaskSnapshot", ["owner_id", "completed", "category", "tag_ids"])
+
+def snapshot(task: models.Task) -> TaskSnapshot:
+    """Estado de la tarea relevante para el resumen"""
+    return TaskSnapshot(
+        owner_id=task.owner_id,
+        completed=bool(task.completed),
+        category=task.category or None,
+        tag_ids=frozenset(tag.id for tag in task.tag_items),
+    )
+
+def _upsert_add(db: Session, model, key_columns: List[str], rows: List[dict]):
+    """INSERT ... ON CONFLICT/DUPLICATE KEY UPDATE sumando los deltas.
+    
+    Una sola sentencia (executemany) para todas las filas, así el número de consultas
+    no depende del número de etiquetas o categorías que cambian.
+    """
+    if not rows:
+        return
+    table = model.__table__
+    delta_columns = [column for column in rows[0] if column not in key_columns]
+    dialect = db.get_bind().dialect.name
+    if dialect == "mysql":
+        from sqlalchemy.dialects.mysql import insert as dialect_insert
+        stmt = dialect_insert(table)
+        stmt = stmt.on_duplicate_key_update({
+            column: table.c[column] + stmt.inserted[column] for column in delta_columns
+        })
+    else:
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        stmt = dialect_insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=key_columns,
+            set_={column: table.c[column] + stmt.excluded[column] for column in delta_columns}
+        )
+    db.execute(stmt, rows)
+
+def _adjust_counts(db: Session, model, key_columns: List[str], deltas: Counter):
+    """Suma cada delta a su contador ({clave: delta}) y elimina las filas que llegan a cero"""
+    keys = sorted(key for key, delta in deltas.items() if delta)  # Orden fijo para evitar interbloqueos
+    _upsert_add(db, model, key_columns, [dict(zip(key_columns, key), count=deltas[key]) for key in keys])
+    emptied = [key for key in keys if deltas[key] < 0]
+    if emptied:
+        db.execute(delete(model).where(model.count <= 0, or_(*[
+            and_(*[getattr(model, column) == value for column, value in zip(key_columns, key)])
+            for key in emptied
+        ])))
+
+def apply_change(db: Session, before: Optional[TaskSnapshot], after: Optional[TaskSnapshot]):
+    """Actualiza el resumen por el cambio de una tarea.
+    
+    `before` es None al crear y `after` es None al borrar.
+    """
+    if before is not None and after is not None and before.owner_id != after.owner_id:
+        apply_change(db, before, None)
+        apply_change(db, None, after)
+        return
+    owner_id = (after or before).owner_id
+
+    total_delta = (after is not None) - (before is not None)
+    completed_delta = (after is not None and after.completed) - (before is not None and before.completed)
+    if total_delta or completed_delta:
+        _upsert_add(db, models.UserTaskSummary, ["user_id"],
+                    [{"user_id": owner_id, "total": total_delta, "completed": completed_delta}])
+
+    categories = Counter()
+    old_category = before.category if before else None
+    new_category = after.category if after else None
+    if old_category != new_category:
+        if old_category:
+            categories[(owner_id, old_category)] -= 1
+        if new_category:
+            categories[(owner_id, new_category)] += 1
+    _adjust_counts(db, models.UserCategoryCount, ["user_id", "category"], categories)
+
+    old_tags = before.tag_ids if before else frozenset()
+    new_tags = after.tag_ids if after else frozenset()
+    tags = Counter({(owner_id, tag_id): -1 for tag_id in old_tags - new_tags})
+    tags.update({(owner_id, tag_id): 1 for tag_id in new_tags - old_tags})
+    _adjust_counts(db, models.UserTagCount, ["user_id", "tag_id"], tags)
+
+def apply_created(db: Session, snapshots: List[TaskSnapshot]):
+    """Suma al resumen un lote de tareas nuevas con una actualización por tabla"""
+    totals = Counter()
+    completed = Counter()
+    categories = Counter()
+    tags = Counter()
+    for snap in snapshots:
+        totals[snap.owner_id] += 1
+        completed[snap.owner_id] += snap.completed
+        if snap.category:
+            categories[(snap.owner_id, snap.category)] += 1
+        for tag_id in snap.tag_ids:
+            tags[(snap.owner_id, tag_id)] += 1
+    _upsert_add(db, models.UserTaskSummary, ["user_id"], [
+        {"user_id": owner_id, "total": totals[owner_id], "completed": completed[owner_id]}
+        for owner_id in sorted(totals)
+    ])
+    _adjust_counts(db, models.UserCategoryCount, ["user_id", "category"], categories)
+    _adjust_counts(db, models.UserTagCount, ["user_id", "tag_id"], tags)
+
+def get_categories(db: Session, user_id: int):
+    """Categorías en uso por el usuario"""
+    rows = db.query(models.UserCategoryCount.category).filter(
+        models.UserCategoryCount.user_id == user_id,
+        models.UserCategoryCount.count > 0
+    ).order_by(models.UserCategoryCount.category).all()
+    return [row[0] for row in rows]
+
+def get_tags(db: Session, user_id: int):
+    """Etiquetas en uso por el usuario"""
+    rows = db.query(models.Tag.name).join(
+        models.UserTagCount, models.UserTagCount.tag_id == models.Tag.id
+    ).filter(
+        models.UserTagCount.user_id == user_id,
+        models.UserTagCount.count > 0
+    ).order_by(models.Tag.name).all()
+    return [row[0] for row in rows]
+
+def get_summary(db: Session, user_id: int, now: Optional[datetime] = None) -> dict:
+    """Totales del usuario. Las vencidas dependen de la hora actual, por eso se cuentan
+    con una consulta indexada en lugar de mantenerse como contador."""
+    row = db.get(models.UserTaskSummary, user_id)
+    total = row.total if row else 0
+    completed = row.completed if row else 0
+    overdue = db.query(func.count(models.Task.id)).filter(
+        models.Task.owner_id == user_id,
+        models.Task.completed == False,  # noqa: E712
+        models.Task.due_date < (now or datetime.utcnow())
+    ).scalar()
+    return {
+        "total": total,
+        "completed": completed,
+        "pending": total - completed,
+        "overdue": overdue,
+    }
+
+def rebuild(db: Session, user_id: Optional[int] = None):
+    """Recalcula el resumen desde las tablas de tareas (de un usuario o de todos)"""
+    summary_models = (models.UserTaskSummary, models.UserCategoryCount, models.UserTagCount)
+    for model in summary_models:
+        stmt = delete(model)
+        if user_id is not None:
+            stmt = stmt.where(model.user_id == user_id)
+        db.execute(stmt)
+
+    task = models.Task
+    owner_filter = [task.owner_id == user_id] if user_id is not None else []
+    db.execute(insert(models.UserTaskSummary).from_select(
+        ["user_id", "total", "completed"],
+        select(
+            task.owner_id,
+            func.count(task.id),
+            func.coalesce(func.sum(case((task.completed == True, 1), else_=0)), 0)  # noqa: E712
+        ).where(*owner_filter).group_by(task.owner_id)
+    ))
+    db.execute(insert(models.UserCategoryCount).from_select(
+        ["user_id", "category", "count"],
+        select(task.owner_id, task.category, func.count(task.id)).where(
+            *owner_filter, task.category.isnot(None), task.category != ""
+        ).group_by(task.owner_id, task.category)
+    ))
+    db.execute(insert(models.UserTagCount).from_select(
+        ["user_id", "tag_id", "count"],
+        select(task.owner_id, models.task_tags.c.tag_id, func.count(task.id)).join(
+            models.task_tags, models.task_tags.c.task_id == task.id
+        ).where(*owner_filter).group_by(task.owner_id, models.task_tags.c.tag_id)
+    ))
+    db.commit()
+
+def main():
+    parser = argparse.ArgumentParser(description="Mantenimiento del resumen de tareas por usuario")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    rebuild_parser = subparsers.add_parser("rebuild", help="Recalcula los contadores")
+    rebuild_parser.add_argument("--user-id", type=int, help="Solo este usuario")
+    args = parser.parse_args()
+
+    from app.database import SessionLocal
+    db = SessionLocal()
+    try:
+        rebuild(db, user_id=args.user_id)
+    finally:
+        db.close()
+    print("Resumen reconstruido")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Utilidades compartidas por los benchmarks: servidor local, cliente HTTP y estadísticas"""
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+@contextmanager
+def local_server(database_url: Optional[str] = None, env: Optional[Dict[str, str]] = None,
+                 workers: int = 1):
+    """Arranca uvicorn con la app en un puerto libre y devuelve su URL base.
+    
+    Sin `database_url` se usa una base de datos SQLite temporal.
+    """
+    tmpdir = None
+    if database_url is None:
+        tmpdir = tempfile.TemporaryDirectory()
+        database_url = f"sqlite:///{os.path.join(tmpdir.name, 'bench.db')}"
+    port = _free_port()
+    server_env = dict(os.environ, DATABASE_URL=database_url, **(env or {}))
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1",
+         "--port", str(port), "--workers", str(workers), "--log-level", "warning",
+         "--timeout-graceful-shutdown", "5"],
+        cwd=BACKEND_DIR, env=server_env
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        deadline = time.time() + 30
+        while True:
+            try:
+                request("GET", base_url + "/")
+                break
+            except OSError:
+                if process.poll() is not None or time.time() > deadline:
+                    raise RuntimeError("No se pudo arrancar el servidor")
+                time.sleep(0.2)
+        yield base_url
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+        if tmpdir is not None:
+            tmpdir.cleanup()
+
+def request(method: str, url: str, token: Optional[str] = None, json_body=None,
+            form: Optional[dict] = None, params: Optional[dict] = None, timeout: float = 60):
+    """Hace una petición HTTP y devuelve (status, cuerpo en bytes, segundos)"""
+    if params:
+        url += "?" + urllib.parse.urlencode(params)
+    headers = {}
+    data = None
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+    if json_body is not None:
+        data = json.dumps(json_body).encode()
+        headers["Content-Type"] = "application/json"
+    elif form is not None:
+        data = urllib.parse.urlencode(form).encode()
+        headers["Content-Type"] = "application/x-www-form-urlencoded"
+    req = urllib.request.Request(url, data=data, headers=headers, method=method)
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as response:
+            body = response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        body = e.read()
+        status = e.code
+    return status, body, time.perf_counter() - start
+
+def register_and_login(base_url: str, email: str, password: str) -> str:
+    """Registra un usuario (si no existe) y devuelve su token"""
+    request("POST", base_url + "/auth/register", json_body={"email": email, "password": password})
+    status, body, _ = request("POST", base_url + "/auth/login",
+                              form={"username": email, "password": password})
+    if status != 200:
+        raise RuntimeError(f"Login fallido para {email}: {status} {body!r}")
+    return json.loads(body)["access_token"]
+
+def percentile(values: List[float], p: float) -> float:
+    """Percentil p (0-100) por interpolación lineal"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * p / 100
+    low = int(k)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (k - low)
+
+def summarize(latencies: List[float], elapsed: float) -> dict:
+    """Resumen de latencias (ms) y rendimiento (peticiones/s)"""
+    return {
+        "requests": len(latencies),
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed > 0 else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+    }
@@ -0,0 +1,83 @@
+"""Benchmark de inicio de sesión.
+
+Lanza una ráfaga de logins concurrentes mientras otro cliente consulta GET /tasks
+en bucle, y mide el rendimiento de los logins y la latencia de /tasks antes y
+durante la ráfaga.
+
+    python -m benchmarks.login --logins 400 --concurrency 32
+    AUTH_HASH_WORKERS=0 python -m benchmarks.login   # bcrypt en el pool de hilos
+"""
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import json
+import threading
+import time
+from benchmarks.common import local_server, register_and_login, request, summarize
+
+PASSWORD = "benchmark-password"
+
+def _poll_tasks(base_url: str, token: str, stop: threading.Event, latencies: list):
+    while not stop.is_set():
+        _, _, elapsed = request("GET", base_url + "/tasks", token=token)
+        latencies.append(elapsed)
+
+def run(base_url: str, users: int, logins: int, concurrency: int) -> dict:
+    emails = [f"bench-login-{i}@example.com" for i in range(users)]
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        tokens = list(pool.map(lambda email: register_and_login(base_url, email, PASSWORD), emails))
+    token = tokens[0]
+    for i in range(20):
+        request("POST", base_url + "/tasks", token=token, json_body={"title": f"Tarea {i}"})
+
+    # Latencia de /tasks sin carga de logins
+    idle = []
+    stop = threading.Event()
+    poller = threading.Thread(target=_poll_tasks, args=(base_url, token, stop, idle))
+    poller.start()
+    time.sleep(2)
+    stop.set()
+    poller.join()
+
+    # Ráfaga de logins con /tasks en paralelo
+    busy = []
+    stop = threading.Event()
+    poller = threading.Thread(target=_poll_tasks, args=(base_url, token, stop, busy))
+    poller.start()
+    statuses = []
+
+    def login(i):
+        status, _, elapsed = request("POST", base_url + "/auth/login",
+                                     form={"username": emails[i % users], "password": PASSWORD})
+        statuses.append(status)
+        return elapsed
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = list(pool.map(login, range(logins)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    poller.join()
+
+    ok = [lat for lat, status in zip(latencies, statuses) if status == 200]
+    return {
+        "login": dict(summarize(ok, elapsed), shed=statuses.count(503)),
+        "tasks_idle": summarize(idle, 2),
+        "tasks_during_logins": summarize(busy, elapsed),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="URL de un servidor ya arrancado (por defecto, uno local con SQLite)")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+    if args.url:
+        result = run(args.url, args.users, args.logins, args.concurrency)
+    else:
+        with local_server() as base_url:
+            result = run(base_url, args.users, args.logins, args.concurrency)
+    print(json.dumps(result, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""Presupuesto de consultas de las rutas de tareas.
+
+Lanza GET /tasks (listado, cursor y como usuario compartido), las tres
+exportaciones y GET, PUT, DELETE y POST /share sobre /tasks/{task_id} con la app en
+el mismo proceso (TestClient). Cada petición se ejecuta dentro de
+app.query_counter.assert_max_queries con su presupuesto; termina con código 1 si
+alguna lo supera. Cada escenario se repite con pocas y con muchas tareas, etiquetas
+y usuarios compartidos: el número de consultas no debe depender de ellos.
+
+    python -m benchmarks.query_budget
+    DB_ASYNC=true python -m benchmarks.query_budget -v
+
+También se ejecuta con pytest (test_query_budgets), así una regresión hace fallar
+la suite:
+
+    python -m pytest
+
+Las comprobaciones de acceso se hacen en SQL, así que una tarea ajena cuesta lo
+mismo que una inexistente. El usuario ya está en la caché de autenticación, por lo
+que esas consultas no cuentan.
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+# Consultas máximas por escenario
+QUERY_BUDGETS = {
+    "list": 3,               # versión (ETag), tareas con etiquetas, usuarios compartidos (IN)
+    "list_cursor": 3,
+    "list_shared": 3,
+    "export_json": 1,        # una consulta (tareas LEFT JOIN compartidos) leída por bloques
+    "export_ndjson": 1,
+    "export_csv": 1,
+    "read": 3,               # versión (ETag), tarea con acceso, usuarios compartidos
+    "read_shared": 3,
+    "read_forbidden": 2,
+    "update_title": 5,       # tarea, compartidos, etiquetas, data_version, UPDATE ... RETURNING
+    "update_fields": 8,      # + resumen y categorías
+    "update_tags": 10,       # + etiquetas existentes, contadores y task_tags
+    "update_sharing": 11,    # + usuarios, tombstones, task_access y task_shared_with
+    "update_forbidden": 1,
+    "share": 7,              # tarea, compartidos, usuarios, task_access, data_version, UPDATE, INSERT
+    "share_forbidden": 1,
+    # Fijo: carga (tarea, etiquetas, compartidos), tombstones, task_access, 4 del resumen
+    # (totales, categoría y etiquetas con su limpieza), data_version y un DELETE por
+    # tabla (task_shared_with, task_tags, tasks)
+    "delete": 14,
+    "delete_forbidden": 1,
+}
+
+# (tareas del listado, etiquetas, usuarios compartidos) de cada pasada
+SHAPES = [(1, 1, 1), (30, 8, 6)]
+
+def _client():
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    return TestClient(app)
+
+def _user(client, email: str):
+    password = "budget-password"
+    user = client.post("/auth/register", json={"email": email, "password": password}).json()
+    token = client.post("/auth/login", data={"username": email, "password": password}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    client.get("/tasks/summary/stats", headers=headers)  # Calienta la caché de autenticación
+    return headers, user["id"]
+
+def run(verbose: bool = False) -> list:
+    """Ejecuta los escenarios y devuelve [(escenario, forma, consultas, presupuesto, sentencias)]"""
+    from app.query_counter import assert_max_queries
+
+    client = _client()
+    results = []
+    for shape_index, (task_count, tag_count, share_count) in enumerate(SHAPES):
+        prefix = f"budget-{shape_index}"
+        owner, _ = _user(client, f"{prefix}-owner@example.com")
+        shared, shared_id = _user(client, f"{prefix}-shared@example.com")
+        stranger, _ = _user(client, f"{prefix}-stranger@example.com")
+        others = [_user(client, f"{prefix}-other-{i}@example.com")[1] for i in range(share_count + 1)]
+        tags = [f"{prefix}-tag-{i}" for i in range(tag_count * 2)]
+
+        def new_task():
+            return client.post("/tasks", headers=owner, json={
+                "title": "budget", "category": "a", "tags": tags[:tag_count],
+                "shared_with_user_ids": [shared_id] + others[:share_count - 1],
+            }).json()["id"]
+
+        # Las etiquetas nuevas se crean fuera de la medición (update_tags usa etiquetas existentes)
+        client.delete(f"/tasks/{client.post('/tasks', headers=owner, json={'title': 'x', 'tags': tags}).json()['id']}",
+                      headers=owner)
+        for _ in range(task_count - 1):
+            new_task()
+        # La última escritura cambia la versión: los listados no salen de la caché
+        task_id = new_task()
+        scenarios = [
+            ("list", lambda: client.get("/tasks", headers=owner)),
+            ("list_cursor", lambda: client.get("/tasks", headers=owner,
+                                               params={"order_by": "updated_at", "limit": task_count})),
+            ("list_shared", lambda: client.get("/tasks", headers=shared)),
+            ("export_json", lambda: client.get("/tasks/export/json", headers=owner)),
+            ("export_ndjson", lambda: client.get("/tasks/export/ndjson", headers=owner)),
+            ("export_csv", lambda: client.get("/tasks/export/csv", headers=owner)),
+            ("read", lambda: client.get(f"/tasks/{task_id}", headers=owner)),
+            ("read_shared", lambda: client.get(f"/tasks/{task_id}", headers=shared)),
+            ("read_forbidden", lambda: client.get(f"/tasks/{task_id}", headers=stranger)),
+            ("update_title", lambda: client.put(f"/tasks/{task_id}", headers=shared, json={"title": "t2"})),
+            ("update_fields", lambda: client.put(f"/tasks/{task_id}", headers=owner,
+                                                 json={"completed": True, "category": "b"})),
+            ("update_tags", lambda: client.put(f"/tasks/{task_id}", headers=owner,
+                                               json={"tags": tags[tag_count:]})),
+            ("update_sharing", lambda: client.put(f"/tasks/{task_id}", headers=owner,
+                                                  json={"shared_with_user_ids": [shared_id] + others[1:]})),
+            ("update_forbidden", lambda: client.put(f"/tasks/{task_id}", headers=stranger, json={"title": "x"})),
+            ("share", lambda: client.post(f"/tasks/{task_id}/share", headers=owner, json={"user_ids": others[:1]})),
+            ("share_forbidden", lambda: client.post(f"/tasks/{task_id}/share", headers=shared, json={"user_ids": others})),
+            ("delete_forbidden", lambda: client.delete(f"/tasks/{task_id}", headers=shared)),
+            ("delete", lambda: client.delete(f"/tasks/{task_id}", headers=owner)),
+        ]
+
+        for name, call in scenarios:
+            budget = QUERY_BUDGETS[name]
+            try:
+                with assert_max_queries(budget) as counter:
+                    response = call()
+            except AssertionError:
+                pass  # Se informa abajo con las sentencias
+            expected = 404 if name.endswith("_forbidden") else (204 if name == "delete" else 200)
+            if response.status_code != expected:
+                raise RuntimeError(f"{name}: {response.status_code} {response.text}")
+            if name.startswith("list") and len(response.json() if name != "list_cursor" else response.json()["tasks"]) != task_count:
+                raise RuntimeError(f"{name}: se esperaban {task_count} tareas")
+            count = counter.count
+            results.append((name, f"{task_count}/{tag_count}/{share_count}", count, budget, counter.statements))
+            marker = "FAIL" if count > budget else "ok  "
+            print(f"{marker} {name:18} tareas/etiquetas/compartidos={task_count}/{tag_count}/{share_count}"
+                  f"  consultas={count}  presupuesto={budget}")
+            if verbose or count > budget:
+                for statement in counter.statements:
+                    print("       " + " ".join(statement.split())[:140])
+    return results
+
+def test_query_budgets(tmp_path):
+    """Versión pytest: falla con las sentencias de cada escenario que supera su presupuesto"""
+    # La app lee DATABASE_URL al importarse
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{tmp_path / 'budget.db'}")
+    over = [r for r in run() if r[2] > r[3]]
+    assert not over, "\n".join(
+        f"{name} ({shape}): {count} consultas, presupuesto {budget}\n  " + "\n  ".join(statements)
+        for name, shape, count, budget, statements in over
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", help="Por defecto, una BD SQLite temporal")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Muestra las sentencias de cada petición")
+    args = parser.parse_args()
+    # La app lee DATABASE_URL al importarse
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'budget.db')}"
+
+    results = run(args.verbose)
+    over = [r for r in results if r[2] > r[3]]
+    if over:
+        print(f"\n{len(over)} escenarios superan su presupuesto de consultas")
+        sys.exit(1)
+    print("\nTodas las rutas están dentro de su presupuesto")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+"""Rendimiento y precisión del programador de recordatorios (app/reminders.py).
+
+Siembra N recordatorios pendientes (por defecto 1.000.000) repartidos en --days días
+y una ráfaga de --due recordatorios que vencen durante los próximos --duration
+segundos, y mide:
+
+1. Precisión (reloj real): arranca el programador en su hilo, mueve y cancela parte
+   de la ráfaga con escrituras normales (crud avisa tras el commit) y comprueba en
+   notification_outbox que cada recordatorio vigente se dispara una sola vez, que
+   ninguno movido o cancelado se dispara, y el retraso p50/p99/máximo.
+2. Rendimiento (reloj simulado): recorre todos los recordatorios avanzando el reloj
+   media ventana cada vez; informa filas cargadas/s, avisos escritos/s y el tamaño
+   máximo del montículo (solo la ventana, no todos los pendientes).
+
+Termina con código 1 si falta o sobra algún aviso o el p99 supera --max-lag-ms.
+
+    python -m benchmarks.reminders
+    python -m benchmarks.reminders --reminders 100000 --due 2000 --duration 5
+"""
+from datetime import datetime, timedelta
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from sqlalchemy import create_engine, func, insert, select, update
+from sqlalchemy.orm import sessionmaker
+from benchmarks.common import percentile
+from benchmarks.seed import _batches
+
+def _seed(engine, reminders: int, days: int, due: int, lead: float, duration: float, rng: random.Random):
+    """Inserta las tareas; devuelve {task_id: remind_at} de la ráfaga"""
+    from app import models
+
+    with engine.begin() as conn:
+        conn.execute(insert(models.User.__table__), [
+            {"id": i + 1, "email": f"reminder-user-{i}@example.com", "hashed_password": "-"} for i in range(100)
+        ])
+    now = datetime.utcnow()
+    far = (
+        {"title": "recordatorio", "completed": False, "owner_id": rng.randint(1, 100),
+         "created_at": now, "updated_at": now,
+         "reminder_date": now + timedelta(hours=1, seconds=rng.uniform(0, days * 86400))}
+        for _ in range(reminders - due)
+    )
+    with engine.begin() as conn:
+        for batch in _batches(far, 10000):
+            conn.execute(insert(models.Task.__table__), batch)
+    # La ráfaga se fecha al terminar de sembrar, para que no venza antes de arrancar
+    start = datetime.utcnow() + timedelta(seconds=lead)
+    burst = [
+        {"title": "ráfaga", "completed": False, "owner_id": rng.randint(1, 100),
+         "created_at": now, "updated_at": now,
+         "reminder_date": start + timedelta(seconds=rng.uniform(0, duration))}
+        for _ in range(due)
+    ]
+    with engine.begin() as conn:
+        first_id = (conn.execute(select(func.max(models.Task.id))).scalar() or 0) + 1
+        for offset, row in enumerate(burst):
+            row["id"] = first_id + offset
+        for batch in _batches(burst, 10000):
+            conn.execute(insert(models.Task.__table__), batch)
+    return {row["id"]: row["reminder_date"] for row in burst}, start
+
+def _mutate(session_factory, expected: dict, start: datetime, duration: float, rng: random.Random, count: int):
+    """Mueve y cancela recordatorios de la segunda mitad de la ráfaga como lo haría crud"""
+    from app import models, reminders
+
+    late = [task_id for task_id, remind_at in expected.items()
+            if remind_at > start + timedelta(seconds=duration / 2)]
+    chosen = rng.sample(late, min(count, len(late)))
+    with session_factory() as db:
+        for index, task_id in enumerate(chosen):
+            if index % 4 == 0:
+                db.execute(update(models.Task).where(models.Task.id == task_id).values(completed=True))
+                reminders.track(db, task_id, None)
+                del expected[task_id]
+            else:
+                remind_at = start + timedelta(seconds=rng.uniform(duration / 2, duration))
+                db.execute(update(models.Task).where(models.Task.id == task_id).values(reminder_date=remind_at))
+                reminders.track(db, task_id, remind_at)
+                expected[task_id] = remind_at
+            if index % 100 == 99:
+                db.commit()
+        db.commit()
+    return len(chosen)
+
+def run_accuracy(engine, session_factory, expected: dict, start: datetime, duration: float,
+                 mutations: int, rng: random.Random, window_seconds: int) -> dict:
+    from app import models, reminders
+
+    scheduler = reminders.ReminderScheduler(session_factory, window_seconds=window_seconds)
+    reminders.scheduler = scheduler
+    load_start = time.perf_counter()
+    scheduler.start()
+    while scheduler.stats["windows"] == 0:
+        time.sleep(0.01)
+    load_seconds = time.perf_counter() - load_start
+    mutated = _mutate(session_factory, expected, start, duration, rng, mutations)
+    remaining = (start + timedelta(seconds=duration) - datetime.utcnow()).total_seconds()
+    time.sleep(max(remaining, 0) + 1)
+    scheduler.stop()
+    reminders.scheduler = None
+
+    with engine.connect() as conn:
+        rows = conn.execute(select(
+            models.NotificationOutbox.task_id, models.NotificationOutbox.remind_at,
+            models.NotificationOutbox.fired_at
+        )).all()
+    fired = {}
+    duplicates = 0
+    for task_id, remind_at, fired_at in rows:
+        duplicates += task_id in fired
+        fired[task_id] = (remind_at, fired_at)
+    missing = [task_id for task_id, remind_at in expected.items()
+               if task_id not in fired or fired[task_id][0] != remind_at]
+    unexpected = [task_id for task_id in fired if task_id not in expected]
+    lags = [(fired_at - remind_at).total_seconds() for remind_at, fired_at in fired.values()]
+    return {
+        "first_window_s": round(load_seconds, 3),
+        "mutations": mutated,
+        "expected": len(expected),
+        "fired": len(fired),
+        "missing": len(missing),
+        "unexpected": len(unexpected),
+        "duplicates": duplicates,
+        "lag_p50_ms": round(percentile(lags, 50) * 1000, 2),
+        "lag_p99_ms": round(percentile(lags, 99) * 1000, 2),
+        "lag_max_ms": round(max(lags, default=0) * 1000, 2),
+    }
+
+def run_throughput(engine, session_factory, days: int, window_seconds: int) -> dict:
+    """Recorre todos los pendientes con un reloj simulado"""
+    from app import models, reminders
+
+    with engine.begin() as conn:
+        conn.execute(models.NotificationOutbox.__table__.delete())
+        last = conn.execute(select(func.max(models.Task.reminder_date))).scalar()
+    now = datetime.utcnow()
+    scheduler = reminders.ReminderScheduler(session_factory, window_seconds=window_seconds,
+                                            catchup_seconds=days * 86400)
+    step = timedelta(seconds=window_seconds / 2)
+    peak = 0
+    load_seconds = 0.0
+    fire_seconds = 0.0
+    start = time.perf_counter()
+    while now <= last + step:
+        # Carga y disparo por separado para medir cada parte
+        tick = time.perf_counter()
+        with session_factory() as db:
+            if scheduler._loaded_until is None:
+                scheduler._load(db, now - scheduler.catchup, now + scheduler.window)
+            elif scheduler._loaded_until - now < scheduler.window / 2:
+                scheduler._load(db, scheduler._loaded_until, now + scheduler.window)
+        load_seconds += time.perf_counter() - tick
+        peak = max(peak, len(scheduler))
+        tick = time.perf_counter()
+        scheduler.run_pending(now)
+        fire_seconds += time.perf_counter() - tick
+        now += step
+    elapsed = time.perf_counter() - start
+    return {
+        "windows": scheduler.stats["windows"],
+        "loaded": scheduler.stats["loaded"],
+        "fired": scheduler.stats["fired"],
+        "load_rows_per_s": round(scheduler.stats["loaded"] / load_seconds) if load_seconds else 0,
+        "fire_rows_per_s": round(scheduler.stats["fired"] / fire_seconds) if fire_seconds else 0,
+        "peak_heap": peak,
+        "seconds": round(elapsed, 1),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", help="Por defecto, una BD SQLite temporal (debe estar vacía)")
+    parser.add_argument("--reminders", type=int, default=1000000, help="Recordatorios pendientes en total")
+    parser.add_argument("--days", type=int, default=30, help="Días en los que se reparten")
+    parser.add_argument("--due", type=int, default=5000, help="Recordatorios de la ráfaga")
+    parser.add_argument("--duration", type=float, default=10, help="Segundos en los que vence la ráfaga")
+    parser.add_argument("--mutations", type=int, default=1000, help="Cambios sobre la ráfaga ya cargada")
+    parser.add_argument("--window-seconds", type=int, default=300)
+    parser.add_argument("--max-lag-ms", type=float, default=1000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    database_url = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'reminders.db')}"
+    os.environ.setdefault("DATABASE_URL", database_url)
+    from app import models  # noqa: F401 (registra las tablas)
+    from app.database import Base
+
+    engine = create_engine(database_url)
+    Base.metadata.create_all(engine)
+    session_factory = sessionmaker(bind=engine, expire_on_commit=False)
+    rng = random.Random(args.seed)
+
+    tick = time.perf_counter()
+    expected, start = _seed(engine, args.reminders, args.days, args.due, 3, args.duration, rng)
+    print(f"Sembrados {args.reminders} recordatorios en {time.perf_counter() - tick:.1f}s")
+
+    accuracy = run_accuracy(engine, session_factory, expected, start, args.duration,
+                            args.mutations, rng, args.window_seconds)
+    print("Precisión:", accuracy)
+    throughput = run_throughput(engine, session_factory, args.days, args.window_seconds)
+    print("Rendimiento:", throughput)
+    engine.dispose()
+
+    failed = accuracy["missing"] or accuracy["unexpected"] or accuracy["duplicates"] \
+        or accuracy["lag_p99_ms"] > args.max_lag_ms
+    if failed:
+        print("\nEl programador ha perdido, duplicado o retrasado avisos")
+        sys.exit(1)
+    print("\nTodos los recordatorios se han disparado a tiempo")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""Enrutado de lecturas a réplicas y read-your-writes (app/replicas.py).
+
+Arranca la API con una BD SQLite primaria y una segunda BD SQLite como réplica de
+solo lectura. La "replicación" es una copia de la primaria (API de backup de
+sqlite3), así que el retraso de la réplica se controla desde aquí:
+
+1. Comprobaciones: sin réplica (el fichero aún no existe) las lecturas van a la
+   primaria; tras la primera copia, la comprobación la marca como sana.
+2. Enrutado: tras una escritura, el usuario la ve al momento (fijado a la primaria);
+   pasada la ventana lee de la réplica, que aún no tiene la tarea, y la ve en
+   cuanto se replica.
+3. Réplica con retraso: se copia cada --lag segundos mientras --users usuarios
+   escriben y releen al momento GET /tasks y GET /tasks/{id}, y otro usuario solo
+   lee (sus lecturas deben ir a la réplica). Cuenta las lecturas que no ven la
+   propia escritura, con la ventana de DB_REPLICA_PIN_SECONDS y,
+   como control, sin ella (DB_REPLICA_PIN_SECONDS=0).
+
+Termina con código 1 si falla alguna comprobación o alguna lectura con la ventana
+activa no ve la escritura del usuario.
+
+    python -m benchmarks.replicas
+    python -m benchmarks.replicas --writes 500 --lag 1
+"""
+import argparse
+import json
+import os
+import re
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from benchmarks.common import local_server, register_and_login, request
+
+class Replicator(threading.Thread):
+    """Copia la primaria en la réplica cada `lag` segundos"""
+
+    def __init__(self, primary: str, replica: str, lag: float):
+        super().__init__(daemon=True)
+        self.primary = primary
+        self.replica = replica
+        self.lag = lag
+        self.copies = 0
+        self._stopped = threading.Event()
+
+    def copy(self):
+        source = sqlite3.connect(self.primary)
+        target = sqlite3.connect(self.replica)
+        try:
+            source.backup(target)
+        finally:
+            source.close()
+            target.close()
+        self.copies += 1
+
+    def run(self):
+        while not self._stopped.wait(self.lag):
+            self.copy()
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+
+def _replica_url(path: str) -> str:
+    # Solo lectura y sin crear el fichero si no existe (como una réplica caída)
+    return f"sqlite:///file:{path}?mode=ro&uri=true"
+
+def _titles(base_url: str, token: str) -> set:
+    status, body, _ = request("GET", base_url + "/tasks", token=token, params={"limit": 1000})
+    if status != 200:
+        raise RuntimeError(f"GET /tasks: {status}")
+    return {task["title"] for task in json.loads(body)}
+
+def _healthy(base_url: str, token: str) -> bool:
+    status, body, _ = request("GET", base_url + "/replicas/stats", token=token)
+    if status != 200:
+        raise RuntimeError(f"GET /replicas/stats: {status}")
+    return all(replica["healthy"] for replica in json.loads(body)["replicas"])
+
+def _read_sessions(base_url: str) -> dict:
+    text = request("GET", base_url + "/metrics")[1].decode()
+    return {target: int(float(value))
+            for target, value in re.findall(r'db_read_sessions_total\{target="(\w+)"\} (\S+)', text)}
+
+def _wait(condition, timeout: float = 10) -> bool:
+    deadline = time.time() + timeout
+    while not condition():
+        if time.time() > deadline:
+            return False
+        time.sleep(0.05)
+    return True
+
+def run_checks(base_url: str, replicator: Replicator, pin_seconds: float) -> dict:
+    """Fases 1 y 2: estado de la réplica y a qué BD va cada lectura"""
+    token = register_and_login(base_url, "replica-check@example.com", "replica-password")
+    checks = {}
+    checks["down_while_missing"] = not _healthy(base_url, token)
+    checks["reads_without_replica"] = _titles(base_url, token) == set()
+    replicator.copy()
+    checks["healthy_after_copy"] = _wait(lambda: _healthy(base_url, token))
+
+    request("POST", base_url + "/tasks", token=token, json_body={"title": "sin replicar"})
+    checks["own_write_visible"] = "sin replicar" in _titles(base_url, token)
+    time.sleep(pin_seconds + 0.2)
+    checks["stale_replica_after_window"] = "sin replicar" not in _titles(base_url, token)
+    replicator.copy()
+    checks["visible_after_replication"] = "sin replicar" in _titles(base_url, token)
+    return checks
+
+def run_lag(base_url: str, replicator: Replicator, users: int, writes: int) -> dict:
+    """Fase 3: escrituras y relecturas inmediatas con la réplica copiándose de fondo"""
+    tokens = [register_and_login(base_url, f"replica-user-{i}@example.com", "replica-password")
+              for i in range(users)]
+    reader = register_and_login(base_url, "replica-reader@example.com", "replica-password")
+    replicator.copy()
+    _wait(lambda: _healthy(base_url, reader))
+    before = _read_sessions(base_url)
+    replicator.start()
+    stale = 0
+    task_ids = {}
+    for i in range(writes):
+        user = i % users
+        token = tokens[user]
+        title = f"u{user}-w{i}"
+        if user in task_ids and i % 2:
+            status, body, _ = request("PUT", f"{base_url}/tasks/{task_ids[user]}", token=token,
+                                      json_body={"title": title})
+        else:
+            status, body, _ = request("POST", base_url + "/tasks", token=token, json_body={"title": title})
+        if status >= 400:
+            raise RuntimeError(f"Escritura {i}: {status}")
+        task_ids[user] = json.loads(body)["id"]
+        if title not in _titles(base_url, token):
+            stale += 1
+        status, body, _ = request("GET", f"{base_url}/tasks/{task_ids[user]}", token=token)
+        if status != 200 or json.loads(body)["title"] != title:
+            stale += 1
+        _titles(base_url, reader)
+    replicator.stop()
+    after = _read_sessions(base_url)
+    return {
+        "writes": writes,
+        "reads": 3 * writes,
+        "stale_reads": stale,
+        "copies": replicator.copies,
+        "read_sessions": {target: after.get(target, 0) - before.get(target, 0) for target in after},
+    }
+
+def run_server(pin_seconds: float, users: int, writes: int, lag: float, checks: bool) -> dict:
+    with tempfile.TemporaryDirectory() as tmpdir:
+        primary = os.path.join(tmpdir, "primary.db")
+        replica = os.path.join(tmpdir, "replica.db")
+        env = {
+            "DATABASE_REPLICA_URLS": _replica_url(replica),
+            "DB_REPLICA_CHECK_SECONDS": "0.2",
+            "DB_REPLICA_PIN_SECONDS": str(pin_seconds),
+            "STATS_ENABLED": "true",
+        }
+        with local_server(f"sqlite:///{primary}", env=env) as base_url:
+            result = {}
+            if checks:
+                result["checks"] = run_checks(base_url, Replicator(primary, replica, lag), pin_seconds)
+            result["lag"] = run_lag(base_url, Replicator(primary, replica, lag), users, writes)
+            return result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=5)
+    parser.add_argument("--writes", type=int, default=200)
+    parser.add_argument("--lag", type=float, default=0.5, help="Segundos entre copias a la réplica")
+    parser.add_argument("--pin-seconds", type=float, default=1, help="DB_REPLICA_PIN_SECONDS (debe superar --lag)")
+    args = parser.parse_args()
+
+    pinned = run_server(args.pin_seconds, args.users, args.writes, args.lag, checks=True)
+    print("Comprobaciones:", pinned["checks"])
+    print("Con ventana:", pinned["lag"])
+    control = run_server(0, args.users, args.writes, args.lag, checks=False)
+    print("Sin ventana (control):", control["lag"])
+
+    failed = [name for name, ok in pinned["checks"].items() if not ok]
+    if failed or pinned["lag"]["stale_reads"]:
+        print(f"\nFallos: {failed}, lecturas sin la propia escritura: {pinned['lag']['stale_reads']}")
+        sys.exit(1)
+    print("\nCada usuario lee sus escrituras y el resto de lecturas van a la réplica")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Benchmark de serialización de tareas.
+
+Compara, sobre filas sintéticas, el camino genérico (dict -> jsonable_encoder ->
+json de la librería estándar, como una ruta que devuelve un dict) con el
+codificador de filas de app.serialization, con json estándar y con orjson.
+Comprueba además que todos generan exactamente los mismos bytes.
+
+    python -m benchmarks.serialization --page-size 100 --pages 200 --export-rows 20000
+"""
+from collections import namedtuple
+from datetime import datetime, timedelta
+import argparse
+import json
+import random
+import time
+from fastapi.encoders import jsonable_encoder
+from app import serialization
+
+Row = namedtuple("Row", serialization.TASK_COLUMNS)
+
+WORDS = ["informe", "reunión", "compra", "niño", "café", "deploy", "revisión", "日本", "emoji 🚀",
+         'comillas "dobles"', "barra \\ invertida", "salto\nde línea", "tab\tulado"]
+
+def make_rows(count: int, seed: int = 1):
+    """Filas como las de la exportación: (fila, ids compartidos)"""
+    rng = random.Random(seed)
+    base = datetime(2026, 1, 1)
+    rows = []
+    for i in range(1, count + 1):
+        created = base + timedelta(seconds=rng.randint(0, 10_000_000),
+                                   microseconds=rng.choice([0, rng.randint(1, 999_999)]))
+        row = Row(
+            id=i,
+            title=" ".join(rng.sample(WORDS, 3)),
+            description=rng.choice([None, "", " ".join(rng.sample(WORDS, 5))]),
+            completed=rng.random() < 0.3,
+            category=rng.choice([None, "work", "home", "estudios"]),
+            tags=rng.choice([None, "", "a,b", "urgente, trabajo", "x"]),
+            due_date=rng.choice([None, created + timedelta(days=rng.randint(1, 30))]),
+            reminder_date=rng.choice([None, created + timedelta(hours=rng.randint(1, 48))]),
+            owner_id=rng.randint(1, 50),
+            created_at=created,
+            updated_at=created + timedelta(minutes=rng.randint(0, 600)),
+        )
+        rows.append((row, rng.sample(range(1, 50), rng.choice([0, 0, 1, 3]))))
+    return rows
+
+def generic_page(rows) -> bytes:
+    content = jsonable_encoder([serialization.task_to_dict(row, shared) for row, shared in rows])
+    return serialization._std_dumps(content)
+
+def std_page(rows) -> bytes:
+    return serialization._std_dumps([serialization.task_to_dict(row, shared) for row, shared in rows])
+
+def orjson_page(rows) -> bytes:
+    return serialization._orjson_dumps([serialization.task_to_native(row, shared) for row, shared in rows])
+
+def std_export(rows) -> bytes:
+    return b",\n".join(serialization._std_dumps_indented(serialization.task_to_dict(row, shared))
+                       for row, shared in rows)
+
+def orjson_export(rows) -> bytes:
+    return b",\n".join(serialization._orjson_dumps_indented(serialization.task_to_native(row, shared))
+                       for row, shared in rows)
+
+def _time(fn, arg, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(arg)
+    return time.perf_counter() - start
+
+def run(page_size: int, pages: int, export_rows: int) -> dict:
+    page = make_rows(page_size)
+    export = make_rows(export_rows, seed=2)
+    candidates = {"generic": generic_page, "std_encoder": std_page}
+    if serialization.orjson is not None:
+        candidates["orjson_encoder"] = orjson_page
+    exports = {"std_encoder": std_export}
+    if serialization.orjson is not None:
+        exports["orjson_encoder"] = orjson_export
+
+    # Los bytes deben ser idénticos al camino genérico
+    reference = generic_page(export)
+    for name, fn in candidates.items():
+        assert fn(export) == reference, f"{name} output differs from the generic path"
+    reference_export = std_export(export)
+    for name, fn in exports.items():
+        assert fn(export) == reference_export, f"{name} export output differs"
+
+    result = {"page_size": page_size, "pages": pages, "export_rows": export_rows, "pages_per_sec": {},
+              "export_rows_per_sec": {}}
+    for name, fn in candidates.items():
+        elapsed = _time(fn, page, pages)
+        result["pages_per_sec"][name] = round(pages / elapsed, 1)
+    for name, fn in exports.items():
+        elapsed = _time(fn, export, 1)
+        result["export_rows_per_sec"][name] = round(export_rows / elapsed)
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--export-rows", type=int, default=20000)
+    args = parser.parse_args()
+    print(json.dumps(run(args.page_size, args.pages, args.export_rows), indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""Entrega de eventos de GET /tasks/stream (Server-Sent Events).
+
+Abre --connections conexiones (repartidas entre el propietario y los usuarios con
+los que comparte), hace --writes escrituras (crear, editar, completar, dejar de
+compartir y borrar) y comprueba que cada conexión recibe su evento. Informa la
+latencia desde que empieza la escritura hasta que llega el evento, los bytes por
+evento frente a lo que descargaría cada pestaña al recargar tareas, categorías y
+etiquetas tras cada escritura (como hacía el dashboard), y termina
+con código 1 si alguna conexión no recibe algún evento.
+
+    python -m benchmarks.stream
+    python -m benchmarks.stream --connections 50 --writes 200
+"""
+from urllib.parse import urlparse
+import argparse
+import http.client
+import json
+import socket
+import sys
+import threading
+import time
+from benchmarks.common import local_server, percentile, register_and_login, request
+
+class StreamReader(threading.Thread):
+    """Lee una conexión SSE y guarda (hora de llegada, evento, bytes)"""
+
+    def __init__(self, base_url: str, token: str):
+        super().__init__(daemon=True)
+        url = urlparse(base_url)
+        self.connection = http.client.HTTPConnection(url.hostname, url.port, timeout=60)
+        self.connection.request("GET", "/tasks/stream", headers={"Authorization": f"Bearer {token}"})
+        self.sock = self.connection.sock
+        self.response = self.connection.getresponse()
+        if self.response.status != 200:
+            raise RuntimeError(f"/tasks/stream: {self.response.status}")
+        self.events = []
+        self.ready = threading.Event()
+
+    def run(self):
+        try:
+            for line in self.response.fp:
+                if not line.startswith(b"data: "):
+                    continue
+                event = json.loads(line[6:])
+                if event["type"] == "ready":
+                    self.ready.set()
+                self.events.append((time.perf_counter(), event, len(line) + 1))
+        except (OSError, ValueError):
+            pass
+
+    def close(self):
+        # Cerrar el socket desbloquea la lectura del hilo
+        self.sock.shutdown(socket.SHUT_RDWR)
+        self.join(5)
+        self.connection.close()
+
+def _key(event: dict):
+    if event["type"] == "upsert":
+        return ("upsert", event["task"]["id"], event["task"]["title"])
+    if event["type"] == "delete":
+        return ("delete", event["id"], None)
+    return (event["type"], None, None)
+
+def run(base_url: str, connections: int, writes: int, collaborators: int, tasks: int) -> dict:
+    password = "stream-password"
+    owner = register_and_login(base_url, "stream-owner@example.com", password)
+    others = [register_and_login(base_url, f"stream-user-{i}@example.com", password) for i in range(collaborators)]
+    other_ids = [json.loads(request("GET", base_url + "/auth/users", token=owner,
+                                    params={"q": f"stream-user-{i}@"})[1])["users"][0]["id"]
+                 for i in range(collaborators)]
+    # Tareas de fondo para que la recarga que sustituyen los eventos tenga un tamaño realista
+    for i in range(tasks):
+        request("POST", base_url + "/tasks", token=owner, json_body={
+            "title": f"fondo {i}", "description": "tarea de fondo", "category": f"c{i % 3}", "tags": ["fondo"]})
+    tokens = [owner] + others
+    readers = [StreamReader(base_url, tokens[i % len(tokens)]) for i in range(connections)]
+    for reader in readers:
+        reader.start()
+    for reader in readers:
+        reader.ready.wait(10)
+
+    # (inicio de la escritura, evento esperado, lectores que deben recibirlo)
+    expected = []
+    everyone = list(range(connections))
+    owner_only = [i for i in everyone if i % len(tokens) == 0]
+    task_id = None
+    for i in range(writes):
+        title = f"w{i}"
+        step = i % 5
+        start = time.perf_counter()
+        if step == 0:
+            status, body, _ = request("POST", base_url + "/tasks", token=owner, json_body={
+                "title": title, "category": f"c{i % 3}", "tags": ["stream"], "shared_with_user_ids": other_ids})
+            task_id = json.loads(body)["id"]
+            expected.append((start, ("upsert", task_id, title), everyone))
+        elif step in (1, 2):
+            body = {"title": title} if step == 1 else {"title": title, "completed": True}
+            status, _, _ = request("PUT", f"{base_url}/tasks/{task_id}", token=owner, json_body=body)
+            expected.append((start, ("upsert", task_id, title), everyone))
+        elif step == 3:
+            status, _, _ = request("PUT", f"{base_url}/tasks/{task_id}", token=owner,
+                                   json_body={"title": title, "shared_with_user_ids": []})
+            expected.append((start, ("upsert", task_id, title), owner_only))
+            expected.append((start, ("delete", task_id, None),
+                             [r for r in everyone if r not in owner_only]))
+        else:
+            status, _, _ = request("DELETE", f"{base_url}/tasks/{task_id}", token=owner)
+            expected.append((start, ("delete", task_id, None), owner_only))
+        if status >= 400:
+            raise RuntimeError(f"Escritura {i}: {status}")
+
+    # SQLite reutiliza los ids borrados: el n-ésimo evento esperado con una clave se
+    # empareja con la n-ésima llegada con esa clave
+    deadline = time.time() + 10
+    while True:
+        received = []
+        for reader in readers:
+            arrivals = {}
+            for at, event, _ in list(reader.events):
+                arrivals.setdefault(_key(event), []).append(at)
+            received.append(arrivals)
+        latencies = []
+        missing = 0
+        seen = [{} for _ in readers]
+        for start, key, targets in expected:
+            for r in targets:
+                n = seen[r].get(key, 0)
+                seen[r][key] = n + 1
+                if n < len(received[r].get(key, ())):
+                    latencies.append(received[r][key][n] - start)
+                else:
+                    missing += 1
+        if not missing or time.time() > deadline:
+            break
+        time.sleep(0.1)
+
+    event_bytes = [size for reader in readers for _, event, size in reader.events if event["type"] != "ready"]
+    refetch_bytes_per_write = sum(len(request("GET", base_url + path, token=owner)[1])
+                        for path in ("/tasks", "/tasks/categories/list", "/tasks/tags/list"))
+    for reader in readers:
+        reader.close()
+    return {
+        "connections": connections,
+        "writes": writes,
+        "deliveries": len(latencies),
+        "missing": missing,
+        "latency_p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "latency_p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "bytes_per_event": round(sum(event_bytes) / len(event_bytes)) if event_bytes else 0,
+        "refetch_bytes_per_write": refetch_bytes_per_write,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="API ya arrancada (por defecto se arranca una local)")
+    parser.add_argument("--connections", type=int, default=20)
+    parser.add_argument("--writes", type=int, default=100)
+    parser.add_argument("--collaborators", type=int, default=3)
+    parser.add_argument("--tasks", type=int, default=50, help="Tareas de fondo del propietario")
+    args = parser.parse_args()
+
+    if args.url:
+        result = run(args.url, args.connections, args.writes, args.collaborators, args.tasks)
+    else:
+        with local_server() as base_url:
+            result = run(base_url, args.connections, args.writes, args.collaborators, args.tasks)
+    print(json.dumps(result, indent=2))
+    if result["missing"]:
+        print(f"\n{result['missing']} eventos no entregados")
+        sys.exit(1)
+    print("\nTodas las conexiones han recibido sus eventos")
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 import React, { useState } from 'react';
+import { localInputToIso } from '../utils/dates';
 
 const TaskForm = ({ onSubmit, categories = [], existingTags = [] }) => {
   const [title, setTitle] = useState('');
@@ -17,7 +18,7 @@ const TaskForm = ({ onSubmit, categories = [], existingTags = [] }) => {
         category: category.trim() || null,
         tags: tags.split(',').map(t => t.trim()).filter(t => t.length > 0),
         due_date: dueDate || null,
-        reminder_date: reminderDate || null,
+        reminder_date: localInputToIso(reminderDate),
       };
       onSubmit(taskData);
       setTitle('');
@@ -1,4 +1,5 @@
 import React, { useState } from 'react';
+import { localInputToIso, parseUtcDate, toLocalInputValue } from '../utils/dates';
 
 const TaskItem = ({ task, onToggleComplete, onDelete, onEdit, categories = [], existingTags = [] }) => {
   const [isEditing, setIsEditing] = useState(false);
@@ -7,7 +8,7 @@ const TaskItem = ({ task, onToggleComplete, onDelete, onEdit, categories = [], e
   const [editCategory, setEditCategory] = useState(task.category || '');
   const [editTags, setEditTags] = useState(Array.isArray(task.tags) ? task.tags.join(', ') : (task.tags || ''));
   const [editDueDate, setEditDueDate] = useState(task.due_date ? new Date(task.due_date).toISOString().slice(0, 16) : '');
-  const [editReminderDate, setEditReminderDate] = useState(task.reminder_date ? new Date(task.reminder_date).toISOString().slice(0, 16) : '');
+  const [editReminderDate, setEditReminderDate] = useState(toLocalInputValue(task.reminder_date));
 
   const formatDate = (dateString) => {
     if (!dateString) return null;
@@ -34,7 +35,7 @@ const TaskItem = ({ task, onToggleComplete, onDelete, onEdit, categories = [], e
         category: editCategory.trim() || null,
         tags: editTags.split(',').map(t => t.trim()).filter(t => t.length > 0),
         due_date: editDueDate || null,
-        reminder_date: editReminderDate || null,
+        reminder_date: localInputToIso(editReminderDate),
       });
       setIsEditing(false);
     } else {
@@ -48,7 +49,7 @@ const TaskItem = ({ task, onToggleComplete, onDelete, onEdit, categories = [], e
     setEditCategory(task.category || '');
     setEditTags(Array.isArray(task.tags) ? task.tags.join(', ') : (task.tags || ''));
     setEditDueDate(task.due_date ? new Date(task.due_date).toISOString().slice(0, 16) : '');
-    setEditReminderDate(task.reminder_date ? new Date(task.reminder_date).toISOString().slice(0, 16) : '');
+    setEditReminderDate(toLocalInputValue(task.reminder_date));
     setIsEditing(false);
   };
 
@@ -182,7 +183,7 @@ const TaskItem = ({ task, onToggleComplete, onDelete, onEdit, categories = [], e
                       )}
                       {task.reminder_date && (
                         <span className="px-2 py-1 bg-purple-100 dark:bg-purple-900 text-purple-800 dark:text-purple-200 text-xs rounded-full">
-                          Recordatorio: {formatDate(task.reminder_date)}
+                          Recordatorio: {formatDate(parseUtcDate(task.reminder_date))}
                         </span>
                       )}
                     </div>
@@ -3,6 +3,8 @@ import { useAuth } from '../context/AuthContext';
 import { useTheme } from '../context/ThemeContext';
 import { useNavigate } from 'react-router-dom';
 import api from '../services/api';
+import { subscribeTaskStream } from '../services/taskStream';
+import { parseUtcDate } from '../utils/dates';
 import TaskForm from '../components/TaskForm';
 import TaskList from '../components/TaskList';
 import TaskFilters from '../components/TaskFilters';
@@ -24,6 +26,14 @@ const DashboardPage = () => {
   const navigate = useNavigate();
   const searchTimeoutRef = useRef(null);
   const isInitialLoad = useRef(true);
+  // Filtros actuales para los eventos del stream (su callback no se vuelve a crear)
+  const filtersRef = useRef({});
+  filtersRef.current = { search, category, selectedTags, completed };
+  // Tareas actuales, para comparar con las que llegan del stream o de la API
+  const tasksRef = useRef([]);
+  tasksRef.current = tasks;
+  const refreshTimeoutRef = useRef(null);
+  const fetchTasksRef = useRef(null);
 
   useEffect(() => {
     if (!isAuthenticated) {
@@ -88,6 +98,8 @@ const DashboardPage = () => {
     }
   };
 
+  fetchTasksRef.current = fetchTasks;
+
   const fetchCategories = async () => {
     try {
       const response = await api.get('/tasks/categories/list');
@@ -106,6 +118,108 @@ const DashboardPage = () => {
     }
   };
 
+  // Recarga diferida (y agrupada) de lo que no se puede actualizar en local
+  const scheduleRefresh = () => {
+    if (refreshTimeoutRef.current) return;
+    refreshTimeoutRef.current = setTimeout(() => {
+      refreshTimeoutRef.current = null;
+      if (filtersRef.current.search) fetchTasksRef.current();
+      fetchCategories();
+      fetchTags();
+    }, 2000);
+  };
+
+  // Indica si la tarea entra en la lista con los filtros actuales
+  // (null con búsqueda de texto: solo lo sabe el backend)
+  const matchesFilters = (task) => {
+    const filters = filtersRef.current;
+    if (filters.search) return null;
+    if (filters.category && task.category !== filters.category) return false;
+    if (filters.selectedTags.length > 0 &&
+        !filters.selectedTags.some((tag) => (task.tags || []).includes(tag))) return false;
+    if (filters.completed !== null && task.completed !== filters.completed) return false;
+    return true;
+  };
+
+  // Indica si cambian la categoría o las etiquetas respecto a la copia local
+  const labelsChanged = (previous, task) => {
+    if ((previous.category || null) !== (task.category || null)) return true;
+    const before = [...(previous.tags || [])].sort().join('\n');
+    const after = [...(task.tags || [])].sort().join('\n');
+    return before !== after;
+  };
+
+  // Aplica una tarea creada o modificada al estado local
+  const applyTask = (task) => {
+    const previous = tasksRef.current.find((t) => t.id === task.id);
+    if (previous && labelsChanged(previous, task)) {
+      // La categoría o etiquetas anteriores pueden haber quedado sin uso
+      scheduleRefresh();
+    }
+    const matches = matchesFilters(task);
+    if (matches === null) {
+      scheduleRefresh();
+      return;
+    }
+    setTasks((prev) => {
+      const index = prev.findIndex((t) => t.id === task.id);
+      if (index === -1) {
+        return matches ? [...prev, task] : prev;
+      }
+      // Un evento más antiguo que lo que ya tenemos no debe pisarlo
+      if (prev[index].updated_at && task.updated_at && prev[index].updated_at > task.updated_at) {
+        return prev;
+      }
+      if (!matches) {
+        return prev.filter((t) => t.id !== task.id);
+      }
+      const next = [...prev];
+      next[index] = task;
+      return next;
+    });
+    if (task.category) {
+      setCategories((prev) => (prev.includes(task.category) ? prev : [...prev, task.category].sort()));
+    }
+    const newTags = task.tags || [];
+    setTags((prev) => {
+      const missing = newTags.filter((tag) => !prev.includes(tag));
+      return missing.length > 0 ? [...prev, ...missing].sort() : prev;
+    });
+  };
+
+  const removeTask = (taskId) => {
+    setTasks((prev) => prev.filter((t) => t.id !== taskId));
+    // Las categorías y etiquetas pueden haber quedado sin uso
+    scheduleRefresh();
+  };
+
+  // Cambios en tiempo real de las tareas propias y compartidas (GET /tasks/stream)
+  useEffect(() => {
+    if (!isAuthenticated) return;
+    let connected = false;
+    const unsubscribe = subscribeTaskStream((event) => {
+      if (event.type === 'upsert') {
+        applyTask(event.task);
+      } else if (event.type === 'delete') {
+        removeTask(event.id);
+      } else if (event.type === 'resync' || (event.type === 'ready' && connected)) {
+        // Importación, cola desbordada o reconexión: pudimos perder eventos
+        fetchTasksRef.current();
+        fetchCategories();
+        fetchTags();
+      }
+      if (event.type === 'ready') connected = true;
+    });
+    return () => {
+      unsubscribe();
+      if (refreshTimeoutRef.current) {
+        clearTimeout(refreshTimeoutRef.current);
+        refreshTimeoutRef.current = null;
+      }
+    };
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [isAuthenticated]);
+
   // Los filtros se aplican en el backend, solo actualizamos la lista
   useEffect(() => {
     setFilteredTasks(tasks);
@@ -113,12 +227,10 @@ const DashboardPage = () => {
 
   const handleCreateTask = async (taskData) => {
     try {
-      await api.post('/tasks', taskData);
+      const response = await api.post('/tasks', taskData);
       setError('');
-      // Recargar tareas y actualizar categorías y tags
-      fetchTasks();
-      fetchCategories();
-      fetchTags();
+      // El stream envía el mismo cambio; aplicarlo ya evita esperar al evento
+      applyTask(response.data);
     } catch (err) {
       setError('Error al crear la tarea');
       console.error(err);
@@ -128,12 +240,11 @@ const DashboardPage = () => {
   const handleToggleComplete = async (taskId) => {
     try {
       const task = tasks.find((t) => t.id === taskId);
-      await api.put(`/tasks/${taskId}`, {
+      const response = await api.put(`/tasks/${taskId}`, {
         completed: !task.completed,
       });
       setError('');
-      // Recargar tareas para mantener consistencia con filtros
-      fetchTasks();
+      applyTask(response.data);
     } catch (err) {
       setError('Error al actualizar la tarea');
       console.error(err);
@@ -142,12 +253,9 @@ const DashboardPage = () => {
 
   const handleEditTask = async (taskId, taskData) => {
     try {
-      await api.put(`/tasks/${taskId}`, taskData);
+      const response = await api.put(`/tasks/${taskId}`, taskData);
       setError('');
-      // Recargar tareas y actualizar categorías y tags
-      fetchTasks();
-      fetchCategories();
-      fetchTags();
+      applyTask(response.data);
     } catch (err) {
       setError('Error al editar la tarea');
       console.error(err);
@@ -161,10 +269,7 @@ const DashboardPage = () => {
     try {
       await api.delete(`/tasks/${taskId}`);
       setError('');
-      // Recargar tareas y actualizar categorías y tags
-      fetchTasks();
-      fetchCategories();
-      fetchTags();
+      removeTask(taskId);
     } catch (err) {
       setError('Error al eliminar la tarea');
       console.error(err);
@@ -217,7 +322,7 @@ const DashboardPage = () => {
       const now = new Date();
       tasks.forEach(task => {
         if (task.reminder_date && !task.completed) {
-          const reminderDate = new Date(task.reminder_date);
+          const reminderDate = parseUtcDate(task.reminder_date);
           const diff = reminderDate - now;
           // Notificar si el recordatorio es en los próximos 5 minutos
           if (diff > 0 && diff <= 5 * 60 * 1000) {
@@ -0,0 +1,60 @@
+import { API_URL } from './api';
+
+const RETRY_MS = 3000;
+const MAX_RETRY_MS = 30000;
+
+// Suscripción a GET /tasks/stream (Server-Sent Events).
+// Se usa fetch en lugar de EventSource para poder enviar el token en la cabecera
+// Authorization. Reconecta solo; devuelve una función para cerrar la conexión.
+export const subscribeTaskStream = (onEvent) => {
+  const controller = new AbortController();
+  let retryMs = RETRY_MS;
+
+  const connect = async () => {
+    while (!controller.signal.aborted) {
+      try {
+        const response = await fetch(`${API_URL}/tasks/stream`, {
+          headers: { Authorization: `Bearer ${localStorage.getItem('token')}` },
+          signal: controller.signal,
+        });
+        if (response.status === 401) {
+          return;
+        }
+        if (!response.ok || !response.body) {
+          throw new Error(`Stream no disponible (${response.status})`);
+        }
+        retryMs = RETRY_MS;
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        while (true) {
+          const { value, done } = await reader.read();
+          if (done) break;
+          buffer += decoder.decode(value, { stream: true });
+          // Los eventos terminan con una línea en blanco
+          const parts = buffer.split('\n\n');
+          buffer = parts.pop();
+          parts.forEach((part) => {
+            const data = part
+              .split('\n')
+              .filter((line) => line.startsWith('data: '))
+              .map((line) => line.slice(6))
+              .join('\n');
+            if (data) {
+              onEvent(JSON.parse(data));
+            }
+          });
+        }
+      } catch (err) {
+        if (controller.signal.aborted) return;
+        console.error('Error en el stream de tareas:', err);
+      }
+      // Conexión cerrada o caída: reintentar con espera creciente
+      await new Promise((resolve) => setTimeout(resolve, retryMs));
+      retryMs = Math.min(retryMs * 2, MAX_RETRY_MS);
+    }
+  };
+
+  connect();
+  return () => controller.abort();
+};
@@ -0,0 +1,22 @@
+// reminder_date se guarda en UTC sin zona horaria; los formularios usan
+// inputs datetime-local, que trabajan en la hora local del navegador.
+
+const HAS_OFFSET = /(Z|[+-]\d{2}:?\d{2})$/i;
+
+// Fecha UTC de la API (sin zona) como Date
+export const parseUtcDate = (value) => {
+  if (!value) return null;
+  return new Date(HAS_OFFSET.test(value) ? value : `${value}Z`);
+};
+
+// Fecha UTC de la API como valor de un input datetime-local (hora local)
+export const toLocalInputValue = (value) => {
+  const date = parseUtcDate(value);
+  if (!date) return '';
+  const pad = (n) => String(n).padStart(2, '0');
+  return `${date.getFullYear()}-${pad(date.getMonth() + 1)}-${pad(date.getDate())}` +
+    `T${pad(date.getHours())}:${pad(date.getMinutes())}`;
+};
+
+// Valor de un input datetime-local como ISO con zona (lo convierte la API a UTC)
+export const localInputToIso = (value) => (value ? new Date(value).toISOString() : null);